@@ -0,0 +1,111 @@
+# benchmarks/bench_dedup.py
+"""Duplicados: MinHash/LSH (dedup.py) vs. Jaccard contra todos da categoria.
+
+Os registros sintéticos variam rua, número e complemento do título; uma parte
+é reenvio de um registro anterior com o texto levemente mudado (abreviação,
+palavra a mais, erro de digitação), que é o que o índice deve achar.
+
+    python benchmarks/bench_dedup.py [registros]   # padrão: 100000
+"""
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from dedup import DuplicateIndex, jaccard, shingles  # noqa: E402
+from models import Categoria, Problema, Status  # noqa: E402
+
+PROBLEMAS = [
+    "Poste apagado", "Buraco na calçada", "Lixo acumulado", "Lâmpada queimada", "Árvore caída",
+    "Vazamento de água", "Semáforo quebrado", "Praça sem manutenção", "Bueiro entupido", "Muro pichado",
+]
+COMPLEMENTOS = ["", "perto da escola", "em frente ao mercado", "na esquina", "ao lado da padaria", "há semanas"]
+NOMES = ["José", "Maria", "Antônio", "Francisco", "Ana", "Paulo", "Carlos", "Luiza", "Pedro", "Rita", "João", "Teresa"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Pereira", "Lima", "Costa", "Ribeiro", "Almeida", "Barbosa", "Moura"]
+TIPOS = ["Rua", "Avenida", "Travessa", "Alameda"]
+ABREVIACOES = {"Rua": "R.", "Avenida": "Av.", "Travessa": "Tv.", "Alameda": "Al."}
+LIMIAR = 0.5
+
+
+def variar(rnd, texto):
+    """Reenvio do mesmo problema: abreviação, palavra a mais ou erro de digitação."""
+    for longo, curto in ABREVIACOES.items():
+        if longo in texto and rnd.random() < 0.5:
+            return texto.replace(longo, curto)
+    if rnd.random() < 0.5:
+        return texto + " " + rnd.choice(["urgente", "de novo", "ainda", "por favor"])
+    i = rnd.randrange(1, len(texto) - 1)
+    return texto[:i] + texto[i + 1:]
+
+
+def fake_records(n, seed=7):
+    rnd = random.Random(seed)
+    ruas = [f"{rnd.choice(TIPOS)} {rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)}" for _ in range(n // 20 + 10)]
+    registros, reenvios = [], []
+    for i in range(n):
+        reg_id = str(uuid.UUID(int=rnd.getrandbits(128)))
+        if registros and rnd.random() < 0.05:
+            original = rnd.choice(registros)
+            registro = Problema(
+                id=reg_id, categoria=original.categoria, status=Status.PENDENTE,
+                titulo=variar(rnd, original.titulo), descricao_local=variar(rnd, original.descricao_local),
+            )
+            reenvios.append((registro, original))
+        else:
+            registro = Problema(
+                id=reg_id, categoria=rnd.choice(list(Categoria)), status=rnd.choice(list(Status)),
+                titulo=f"{rnd.choice(PROBLEMAS)} {rnd.choice(COMPLEMENTOS)}".strip(),
+                descricao_local=f"{rnd.choice(ruas)}, {rnd.randrange(1, 3000)}",
+            )
+        registro.created_at = f"2024-01-01 00:00:{i % 60:02d}"
+        registros.append(registro)
+    return registros, reenvios
+
+
+def linear(registros, registro):
+    alvo = shingles(registro)
+    achados = []
+    for p in registros:
+        if p.categoria == registro.categoria and p.id != registro.id:
+            similaridade = jaccard(alvo, shingles(p))
+            if similaridade >= LIMIAR:
+                achados.append((similaridade, p))
+    return achados
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    registros, reenvios = fake_records(n)
+    indice = DuplicateIndex()
+    start = time.perf_counter()
+    indice.on_reset(registros)
+    print(f"registros={n}  montagem do índice {(time.perf_counter() - start) * 1000:.0f} ms, {len(indice._buckets)} buckets")
+
+    amostra = random.Random(3).sample(reenvios, min(200, len(reenvios)))
+    if not amostra:
+        print("  nenhum reenvio gerado: use mais registros")
+        return
+    candidatos = 0
+    start = time.perf_counter()
+    for registro, _ in amostra:
+        candidatos += len(indice.candidatos(registro))
+        indice.similares(registro, limiar=LIMIAR)
+    t_indice = (time.perf_counter() - start) / len(amostra) * 1000
+
+    achados = esperados = 0
+    start = time.perf_counter()
+    for registro, _ in amostra[:5]:
+        linear(registros, registro)
+    t_linear = (time.perf_counter() - start) / len(amostra[:5]) * 1000
+    for registro, original in amostra:
+        if jaccard(shingles(registro), shingles(original)) >= LIMIAR:
+            esperados += 1
+            achados += any(p.id == original.id for _, p in indice.similares(registro, LIMIAR, limite=50))
+    print(f"  consulta: índice {t_indice:.2f} ms ({candidatos / len(amostra):.0f} candidatos)   varredura {t_linear:.0f} ms")
+    print(f"  reenvios com Jaccard >= {LIMIAR}: {achados}/{esperados} encontrados")
+
+
+if __name__ == "__main__":
+    main()
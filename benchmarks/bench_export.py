@@ -0,0 +1,61 @@
+# benchmarks/bench_export.py
+"""/exportar: escrita em blocos (export.py) vs. montar o arquivo inteiro na memória.
+
+Mede tempo e pico de memória alocada durante a exportação (tracemalloc), com
+os registros já carregados num MemoryRepository.
+
+    python benchmarks/bench_export.py [registros]   # padrão: 100000
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench_search import fake_records  # noqa: E402
+import export  # noqa: E402
+from repository import MemoryRepository  # noqa: E402
+
+
+def em_blocos(repo, formato, comprimir):
+    exportacao = export.Exportacao(formato, comprimir)
+    try:
+        for pagina in export.paginas(repo, 1000):
+            exportacao.escrever(pagina)
+        return exportacao.fechar()
+    finally:
+        exportacao.descartar()
+
+
+def inteiro(repo, formato):
+    writer = export.WRITERS[formato]()
+    registros = repo.page(limit=len(repo))[0]
+    return len(writer.inicio() + writer.bloco(registros) + writer.fim())
+
+
+def medir(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    resultado = fn()
+    tempo = (time.perf_counter() - start) * 1000
+    pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return tempo, pico, resultado
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repo = MemoryRepository()
+    repo._reset(fake_records(n))
+    print(f"registros={n}")
+    for formato in export.FORMATOS:
+        for comprimir in (False, True):
+            tempo, pico, tamanho = medir(lambda: em_blocos(repo, formato, comprimir))
+            rotulo = formato + (".gz" if comprimir else "")
+            print(f"  {rotulo:<11} blocos  {tempo:6.0f} ms  pico {pico:5.1f} MB  arquivo {tamanho / 1024 / 1024:5.1f} MB")
+        tempo, pico, _ = medir(lambda: inteiro(repo, formato))
+        print(f"  {formato:<11} inteiro {tempo:6.0f} ms  pico {pico:5.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
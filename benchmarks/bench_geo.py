@@ -0,0 +1,63 @@
+# benchmarks/bench_geo.py
+"""Perto de mim: grade espacial (geo.py) vs. haversine em todos os pontos.
+
+    python benchmarks/bench_geo.py [pontos]   # padrão: 100000
+"""
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from geo import GridIndex, haversine  # noqa: E402
+
+# Região metropolitana de São Paulo, aprox. 60 x 60 km
+CENTRO = (-23.55, -46.63)
+ESPALHAMENTO = 0.27
+
+
+def fake_points(n, seed=7):
+    rnd = random.Random(seed)
+    return [
+        (CENTRO[0] + rnd.uniform(-ESPALHAMENTO, ESPALHAMENTO), CENTRO[1] + rnd.uniform(-ESPALHAMENTO, ESPALHAMENTO))
+        for _ in range(n)
+    ]
+
+
+def linear(pontos, lat, lon, k, raio):
+    distancias = ((haversine(lat, lon, plat, plon), i) for i, (plat, plon) in enumerate(pontos))
+    return heapq.nsmallest(k, (d for d in distancias if d[0] <= raio))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    pontos = fake_points(n)
+    indice = GridIndex()
+    start = time.perf_counter()
+    for i, (lat, lon) in enumerate(pontos):
+        indice.add(i, lat, lon)
+    print(f"pontos={n}  montagem da grade {(time.perf_counter() - start) * 1000:.0f} ms, {len(indice._cells)} células")
+
+    consultas = fake_points(200, seed=11)
+    for k, raio in [(5, 500), (5, 2000), (20, 2000), (5, 10000)]:
+        start = time.perf_counter()
+        for lat, lon in consultas:
+            indice.nearest(lat, lon, k=k, radius_m=raio)
+        t_grade = (time.perf_counter() - start) / len(consultas) * 1000
+        start = time.perf_counter()
+        for lat, lon in consultas[:10]:
+            esperado = linear(pontos, lat, lon, k, raio)
+            assert indice.nearest(lat, lon, k=k, radius_m=raio) == esperado
+        t_linear = (time.perf_counter() - start) / 10 * 1000
+        print(f"  k={k:<3} raio={raio:>6} m   grade {t_grade:7.3f} ms   varredura {t_linear:8.1f} ms")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        indice.add(n + i, *consultas[i % len(consultas)])
+        indice.remove(n + i)
+    print(f"  add+remove {(time.perf_counter() - start) * 1000:.1f} us por registro")
+
+
+if __name__ == "__main__":
+    main()
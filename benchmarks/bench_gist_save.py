@@ -0,0 +1,84 @@
+# benchmarks/bench_gist_save.py
+"""Latência de updates de outros chats enquanto saves no Gist estão em andamento.
+
+Compara o caminho antigo (requests bloqueante dentro do handler) com o GistStore
+assíncrono. O Gist é simulado com latência fixa, sem acesso à rede.
+
+    python benchmarks/bench_gist_save.py [latencia_s] [saves] [registros]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from storage import GistStore  # noqa: E402
+
+UPDATE_INTERVAL = 0.005
+
+
+def fake_records(n):
+    return [
+        {"id": str(i), "titulo": f"Registro {i}", "descricao": "x" * 80, "created_at": "2024-01-01 00:00:00"}
+        for i in range(n)
+    ]
+
+
+async def other_chats(stop, lateness):
+    # Cada "update" deveria ser tratado UPDATE_INTERVAL após o anterior
+    while not stop.is_set():
+        expected = time.perf_counter() + UPDATE_INTERVAL
+        await asyncio.sleep(UPDATE_INTERVAL)
+        lateness.append(time.perf_counter() - expected)
+
+
+async def run(save_once, saves):
+    stop = asyncio.Event()
+    lateness = []
+    ticker = asyncio.create_task(other_chats(stop, lateness))
+    await asyncio.sleep(0.05)
+    for _ in range(saves):
+        await save_once()
+    stop.set()
+    await ticker
+    return lateness
+
+
+def report(label, lateness):
+    lateness = sorted(lateness)
+    p50 = statistics.median(lateness) * 1000
+    p99 = lateness[round(0.99 * (len(lateness) - 1))] * 1000
+    print(f"{label:<10} updates={len(lateness):>5}  p50={p50:8.2f}ms  p99={p99:8.2f}ms  max={lateness[-1] * 1000:8.2f}ms")
+
+
+async def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    saves = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    records = fake_records(int(sys.argv[3]) if len(sys.argv) > 3 else 1000)
+
+    async def blocking_save():
+        # Equivalente ao antigo requests.patch(..., timeout=15) no handler
+        import json
+        json.dumps(records, ensure_ascii=False, indent=2)
+        time.sleep(latency)
+
+    async def gist_handler(request):
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={})
+
+    store = GistStore("token", "gist", "registros.json", transport=httpx.MockTransport(gist_handler))
+
+    async def async_save():
+        await store.save(records)
+
+    print(f"latência Gist={latency * 1000:.0f}ms saves={saves} registros={len(records)}")
+    report("bloqueante", await run(blocking_save, saves))
+    report("assíncrono", await run(async_save, saves))
+    await store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
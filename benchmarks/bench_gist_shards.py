@@ -0,0 +1,92 @@
+# benchmarks/bench_gist_shards.py
+"""Bytes e latência por gravação: arquivo único vs. um shard por mês.
+
+Cada gravação adiciona um registro no mês corrente e força o flush da réplica.
+O Gist é simulado (sem rede) com latência = base + bytes enviados / banda.
+
+    python benchmarks/bench_gist_shards.py [registros] [meses] [gravacoes]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from models import Problema  # noqa: E402
+from repository import MemoryRepository  # noqa: E402
+from storage import GistReplica, GistStore, ShardedGistReplica  # noqa: E402
+
+BASE_LATENCY = 0.05
+BANDWIDTH = 2 * 1024 * 1024  # bytes/s de upload
+
+
+def fake_records(n, meses):
+    registros = []
+    for i in range(n):
+        mes = i * meses // n
+        ano, m = 2022 + mes // 12, mes % 12 + 1
+        registros.append(Problema.from_dict({
+            "id": f"{i:08d}",
+            "titulo": f"Registro {i}",
+            "descricao": "x" * 80,
+            "categoria": "Outro",
+            "status": "pendente",
+            "created_at": f"{ano:04d}-{m:02d}-{i % 28 + 1:02d} 12:00:00",
+        }))
+    return registros
+
+
+async def run(replica, registros, gravacoes):
+    enviados = []
+
+    async def gist_handler(request):
+        enviados.append(len(request.content))
+        await asyncio.sleep(BASE_LATENCY + len(request.content) / BANDWIDTH)
+        return httpx.Response(200, json={"files": {}})
+
+    replica.store._transport = httpx.MockTransport(gist_handler)
+    repo = MemoryRepository(replica)
+    repo._reset(registros)
+    ultimo = registros[-1].created_at[:7]
+    latencias = []
+    for i in range(gravacoes):
+        await repo.add(Problema.from_dict({
+            "id": f"novo{i}", "titulo": "Novo", "descricao": "y" * 80, "created_at": f"{ultimo}-28 23:00:{i % 60:02d}"
+        }))
+        start = time.perf_counter()
+        await replica.writer.close()
+        latencias.append(time.perf_counter() - start)
+    await replica.store.close()
+    return enviados[-gravacoes:], latencias
+
+
+def report(label, enviados, latencias):
+    latencias = sorted(latencias)
+    p50 = statistics.median(latencias) * 1000
+    p99 = latencias[round(0.99 * (len(latencias) - 1))] * 1000
+    print(
+        f"{label:<12} bytes/PATCH={statistics.mean(enviados) / 1024:9.1f}KiB  "
+        f"p50={p50:8.1f}ms  p99={p99:8.1f}ms"
+    )
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    meses = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    gravacoes = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    registros = fake_records(n, meses)
+    print(f"registros={n} meses={meses} gravações={gravacoes} latência base={BASE_LATENCY * 1000:.0f}ms")
+
+    unico = GistReplica(GistStore("token", "gist", "registros.json"), window=0)
+    report("arquivo único", *await run(unico, list(registros), gravacoes))
+
+    shards = ShardedGistReplica(GistStore("token", "gist", "registros.json"), window=0)
+    shards.manifest = {"version": 1, "shard_by": "month", "shards": {}}
+    report("shards/mês", *await run(shards, list(registros), gravacoes))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
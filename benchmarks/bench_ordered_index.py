@@ -0,0 +1,68 @@
+# benchmarks/bench_ordered_index.py
+"""OrderedIndex vs. sorted() sobre o store inteiro a cada listagem.
+
+    python benchmarks/bench_ordered_index.py [tamanhos...]   # padrão: 10000 100000
+"""
+import os
+import random
+import sys
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from indexes import OrderedIndex  # noqa: E402
+from models import Problema  # noqa: E402
+
+PAGE = 5
+
+
+def fake_records(n):
+    rnd = random.Random(42)
+    registros = []
+    for _ in range(n):
+        dia, seg = rnd.randrange(1, 29), rnd.randrange(86400)
+        registros.append(Problema(
+            id=str(uuid.UUID(int=rnd.getrandbits(128))),
+            created_at=f"2024-02-{dia:02d} {seg // 3600:02d}:{seg // 60 % 60:02d}:{seg % 60:02d}",
+        ))
+    return registros
+
+
+def per_op(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=3)) / number * 1e6
+
+
+def bench(n):
+    registros = fake_records(n)
+    index = OrderedIndex()
+    index.rebuild(registros)
+    meio = index.page(limit=n // 2)[0][-1]
+    novo = Problema(id=str(uuid.uuid4()), created_at="2024-02-15 12:00:00")
+
+    def sort_listing():
+        sorted(registros, key=lambda x: x.created_at, reverse=True)[:PAGE]
+
+    def index_first_page():
+        index.page(limit=PAGE)
+
+    def index_middle_page():
+        index.page(before=(meio.created_at, meio.id), limit=PAGE)
+
+    def index_add_remove():
+        index.add(novo)
+        index.remove(novo)
+
+    def rebuild():
+        OrderedIndex().rebuild(registros)
+
+    print(f"n={n}")
+    print(f"  sorted() por listagem      {per_op(sort_listing, 5):12.1f} µs")
+    print(f"  índice: primeira página    {per_op(index_first_page, 10000):12.1f} µs")
+    print(f"  índice: página do meio     {per_op(index_middle_page, 10000):12.1f} µs")
+    print(f"  índice: insert + remove    {per_op(index_add_remove, 1000):12.1f} µs")
+    print(f"  índice: rebuild (load)     {per_op(rebuild, 3):12.1f} µs")
+
+
+if __name__ == "__main__":
+    for n in [int(a) for a in sys.argv[1:]] or [10_000, 100_000]:
+        bench(n)
@@ -0,0 +1,79 @@
+# benchmarks/bench_record_memory.py
+"""Memória por registro: dict carregado do JSON vs. Problema (__slots__ + enums).
+
+Os registros passam por json.dumps/json.loads como no carregamento do Gist,
+então nenhuma string é compartilhada por acaso entre os dicts.
+
+    python benchmarks/bench_record_memory.py [registros]   # padrão: 100000
+"""
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from models import Categoria, Problema, Status, format_created_at  # noqa: E402
+
+
+def fake_json(n):
+    rnd = random.Random(42)
+    categorias = [c.value for c in Categoria]
+    status = [s.value for s in Status]
+    registros = []
+    for i in range(n):
+        dia, seg = rnd.randrange(1, 29), rnd.randrange(86400)
+        created_at = f"2024-02-{dia:02d} {seg // 3600:02d}:{seg // 60 % 60:02d}:{seg % 60:02d}"
+        registros.append({
+            "categoria": rnd.choice(categorias),
+            "status": rnd.choice(status),
+            "titulo": f"Poste apagado {i}",
+            "descricao": "Poste sem luz há vários dias, rua fica totalmente escura à noite.",
+            "photo_file_id": None,
+            "descricao_local": f"Rua {i % 500}, em frente ao número {i % 97}",
+            "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+            "user_id": rnd.randrange(10**9),
+            "chat_id": rnd.randrange(10**9),
+            "latitude": None,
+            "longitude": None,
+            "created_at": created_at,
+            "created_at_formatted": format_created_at(created_at),
+            "updated_at": created_at,
+        })
+    return json.dumps(registros, ensure_ascii=False)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    objetos = build()
+    gc.collect()
+    usado = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objetos, usado
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    texto = fake_json(n)
+
+    dicts, antes = measure(lambda: json.loads(texto))
+    del dicts
+
+    def build_objects():
+        # json.loads dentro da medição, mas só os Problema sobrevivem
+        return [Problema.from_dict(d) for d in json.loads(texto)]
+
+    objetos, depois = measure(build_objects)
+    assert objetos[0].to_dict() == json.loads(texto)[0]
+
+    print(f"registros={n}")
+    print(f"  dict (json.loads)         {antes / n:8.0f} bytes/registro  ({antes / 2**20:7.1f} MiB)")
+    print(f"  Problema (__slots__)      {depois / n:8.0f} bytes/registro  ({depois / 2**20:7.1f} MiB)")
+    print(f"  redução                   {100 * (1 - depois / antes):7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
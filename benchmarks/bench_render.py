@@ -0,0 +1,65 @@
+# benchmarks/bench_render.py
+"""Montagem de teclados e cards: por chamada (antes) vs. render.py.
+
+    python benchmarks/bench_render.py [iterações]   # padrão: 20000
+"""
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import render  # noqa: E402
+from models import Categoria, Problema, Status  # noqa: E402
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup  # noqa: E402
+
+CATEGORIAS = [c.label for c in Categoria]
+
+
+def teclado_categorias():
+    botoes = []
+    for cat in CATEGORIAS:
+        botoes.append([InlineKeyboardButton(cat, callback_data=f"cat:{cat}")])
+    botoes.append([InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")])
+    return InlineKeyboardMarkup(botoes)
+
+
+def card_antigo(p, i):
+    return (
+        f"*{i}. {p.categoria_label}*\n"
+        f"📝 *Título:* {p.titulo or '-'}\n"
+        f"📄 *Descrição:* {p.descricao or '-'}\n"
+        f"📍 *Local:* {p.descricao_local or '-'}\n"
+        f"📅 *Criado:* {p.created_at_formatted}\n"
+        f"📊 *Status:* {p.status_label}\n"
+    )
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    pagina = [
+        Problema(
+            id=str(uuid.UUID(int=i)), categoria=Categoria.ILUMINACAO,
+            status=Status.PENDENTE, titulo=f"Poste apagado {i}",
+            descricao="Poste sem luz há vários dias, rua fica totalmente escura à noite.",
+            descricao_local=f"Rua {i}", created_at="2024-02-10 12:00:00", updated_at="2024-02-10 12:00:00",
+        )
+        for i in range(5)
+    ]
+    print(f"iterações={n}")
+    print(f"  teclado de categorias   antes {per_call(teclado_categorias, n):6.1f} us   agora {per_call(lambda: render.CATEGORIAS, n):6.2f} us")
+    antes = per_call(lambda: [card_antigo(p, i) for i, p in enumerate(pagina, 1)], n)
+    agora = per_call(lambda: [render.card_listagem(p, i) for i, p in enumerate(pagina, 1)], n)
+    print(f"  página de 5 cards       antes {antes:6.1f} us   agora {agora:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_search.py
+"""Busca: índice invertido (search.py) vs. varredura linear normalizando o texto.
+
+    python benchmarks/bench_search.py [registros]   # padrão: 100000
+"""
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from models import Categoria, Problema, Status  # noqa: E402
+from search import SearchIndex, normalizar, tokens  # noqa: E402
+
+TITULOS = [
+    "Poste apagado", "Buraco na calçada", "Lixo acumulado", "Iluminação queimada", "Árvore caída",
+    "Vazamento de água", "Semáforo quebrado", "Praça sem manutenção", "Bueiro entupido", "Muro pichado",
+]
+DESCRICOES = [
+    "Poste sem luz há vários dias, rua fica totalmente escura à noite.",
+    "Buraco grande que já causou acidentes com motos.",
+    "Lixo não é recolhido há uma semana e atrai ratos.",
+    "Criança quase caiu, precisa de reparo urgente na calçada.",
+    "Galhos bloqueiam a passagem de pedestres na esquina.",
+]
+RUAS = ["Rua das Flores", "Avenida Brasil", "Travessa São João", "Rua Conceição", "Alameda Ipê"]
+
+
+def fake_records(n):
+    rnd = random.Random(7)
+    return [
+        Problema(
+            id=str(uuid.UUID(int=rnd.getrandbits(128))),
+            categoria=rnd.choice(list(Categoria)),
+            status=rnd.choice(list(Status)),
+            titulo=f"{rnd.choice(TITULOS)} {i}",
+            descricao=rnd.choice(DESCRICOES),
+            descricao_local=f"{rnd.choice(RUAS)}, {rnd.randrange(2000)}",
+            created_at=f"2024-{rnd.randrange(1, 13):02d}-{rnd.randrange(1, 29):02d} 12:00:00",
+        )
+        for i in range(n)
+    ]
+
+
+def linear(registros, consulta):
+    termos = tokens(consulta)
+    achados = []
+    for p in registros:
+        texto = normalizar(" ".join(filter(None, (p.titulo, p.descricao, p.descricao_local))))
+        if all(t in texto for t in termos):
+            achados.append(p)
+    return achados
+
+
+def best_of(fn, repeat=5):
+    melhor = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resultado = fn()
+        melhor = min(melhor, time.perf_counter() - start)
+    return melhor * 1000, resultado
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    registros = fake_records(n)
+    indice = SearchIndex()
+    start = time.perf_counter()
+    indice.on_reset(registros)
+    print(f"registros={n}  montagem do índice {(time.perf_counter() - start) * 1000:.0f} ms, {len(indice._vocab)} termos")
+
+    for consulta in ["iluminacao", "Iluminação queimada", "poste", "bueiro flores", "sao joao 1999", "inexistente"]:
+        t_indice, (ids, total) = best_of(lambda: indice.search(consulta, limit=5))
+        t_linear, achados = best_of(lambda: linear(registros, consulta), repeat=1)
+        print(f"  {consulta!r:<24} {total:6d} resultados  índice {t_indice:7.2f} ms   varredura {t_linear:8.1f} ms")
+
+    novo = fake_records(1)[0]
+    novo.id = "novo"
+    t_add, _ = best_of(lambda: indice.on_add(novo))
+    t_rem, _ = best_of(lambda: (indice.on_remove(novo), indice.on_add(novo)))
+    print(f"  on_add {t_add * 1000:.0f} us   on_remove+on_add {t_rem * 1000:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
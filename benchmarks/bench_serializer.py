@@ -0,0 +1,79 @@
+# benchmarks/bench_serializer.py
+"""Codificação/decodificação do store: formato antigo vs. serializer.
+
+Compara json indent=2 (formato antigo), json compacto e orjson (se instalado),
+mais o snapshot do MemoryRepository com o cache por mês depois de uma única
+mutação.
+
+    python benchmarks/bench_serializer.py [tamanhos...]   # padrão: 10000 100000
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import serializer  # noqa: E402
+from models import Categoria, Problema, Status, to_json  # noqa: E402
+from repository import MemoryRepository  # noqa: E402
+
+
+def fake_records(n):
+    rnd = random.Random(42)
+    registros = []
+    for i in range(n):
+        mes, dia, seg = rnd.randrange(1, 13), rnd.randrange(1, 29), rnd.randrange(86400)
+        created_at = f"2024-{mes:02d}-{dia:02d} {seg // 3600:02d}:{seg // 60 % 60:02d}:{seg % 60:02d}"
+        registros.append(Problema(
+            id=str(uuid.UUID(int=rnd.getrandbits(128))),
+            categoria=rnd.choice(list(Categoria)),
+            status=rnd.choice(list(Status)),
+            titulo=f"Poste apagado {i}",
+            descricao="Poste sem luz há vários dias, rua fica totalmente escura à noite.",
+            descricao_local=f"Rua {i % 500}, em frente ao número {i % 97}",
+            user_id=rnd.randrange(10**9),
+            chat_id=rnd.randrange(10**9),
+            created_at=created_at,
+            updated_at=created_at,
+        ))
+    return registros
+
+
+def best_of(fn, repeat=3):
+    melhor = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        melhor = min(melhor, time.perf_counter() - start)
+    return melhor * 1000
+
+
+def bench(n):
+    registros = fake_records(n)
+    antigo = json.dumps(registros, ensure_ascii=False, indent=2, default=to_json)
+    compacto = serializer.dumps(registros)
+    print(f"n={n}  tamanho: indent=2 {len(antigo.encode()) / 2**20:.1f} MiB, compacto {len(compacto.encode()) / 2**20:.1f} MiB")
+
+    print(f"  encode json indent=2        {best_of(lambda: json.dumps(registros, ensure_ascii=False, indent=2, default=to_json)):9.1f} ms")
+    print(f"  encode json compacto        {best_of(lambda: json.dumps(registros, ensure_ascii=False, separators=(',', ':'), default=to_json)):9.1f} ms")
+    print(f"  encode serializer ({serializer.BACKEND:<6})  {best_of(lambda: serializer.dumps(registros)):9.1f} ms")
+    print(f"  decode json.loads           {best_of(lambda: json.loads(antigo)):9.1f} ms")
+    print(f"  decode serializer ({serializer.BACKEND:<6})  {best_of(lambda: serializer.loads(compacto)):9.1f} ms")
+
+    repo = MemoryRepository()
+    repo._reset(registros)
+
+    async def snapshot_after_mutation():
+        await repo.add(Problema(id=str(uuid.uuid4()), created_at="2024-06-15 12:00:00"))
+        return await repo._snapshot_content()
+
+    asyncio.run(repo._snapshot_content())  # aquece o cache
+    print(f"  snapshot após 1 mutação     {best_of(lambda: asyncio.run(snapshot_after_mutation())):9.1f} ms  (cache por mês)")
+
+
+if __name__ == "__main__":
+    for n in [int(a) for a in sys.argv[1:]] or [10_000, 100_000]:
+        bench(n)
@@ -0,0 +1,47 @@
+# benchmarks/bench_stats.py
+"""/stats: contadores incrementais (stats.py) vs. contar varrendo os registros.
+
+    python benchmarks/bench_stats.py [registros]   # padrão: 100000
+"""
+import collections
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench_search import best_of, fake_records  # noqa: E402
+import render  # noqa: E402
+from stats import StatsCollector  # noqa: E402
+
+HOJE = date(2024, 12, 31)
+
+
+def varredura(registros):
+    return (
+        collections.Counter(p.categoria for p in registros),
+        collections.Counter(p.status for p in registros),
+        collections.Counter((p.created_at or "")[:10] for p in registros),
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    registros = fake_records(n)
+    stats = StatsCollector()
+    t_reset, _ = best_of(lambda: stats.on_reset(registros), repeat=3)
+    print(f"registros={n}  on_reset {t_reset:.0f} ms")
+
+    t_painel, texto = best_of(lambda: render.painel_stats(stats, HOJE, 14))
+    t_scan, contagens = best_of(lambda: varredura(registros), repeat=3)
+    assert contagens == (stats.por_categoria, stats.por_status, stats.por_dia)
+    print(f"  /stats (contadores) {t_painel:.3f} ms   varredura {t_scan:.1f} ms   ({len(texto)} caracteres)")
+
+    novo = fake_records(1)[0]
+    novo.id = "novo"
+    t_add, _ = best_of(lambda: [stats.on_add(novo) for _ in range(1000)])
+    t_rem, _ = best_of(lambda: [(stats.on_remove(novo), stats.on_add(novo)) for _ in range(1000)])
+    print(f"  on_add (substituição) {t_add:.2f} us   on_remove+on_add {t_rem:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# benchmarks/fake_telegram.py
+"""Harness local: um "Telegram" falso entrega updates ao webhook com retries.
+
+Sobe uma Bot API falsa (sendMessage com latência configurável) e o webhook do
+bot, e entrega updates como o Telegram: se a resposta não chega dentro do
+timeout, ou não é 2xx, o mesmo update é reenviado. Compara o modo
+"inline" (handler roda antes da resposta, como antes) com a fila
+(UpdateIngestor).
+
+    python benchmarks/fake_telegram.py [updates] [chats] [latencia_api_s] [timeout_s]
+"""
+import asyncio
+import collections
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+import tornado.httpserver
+import tornado.netutil
+import tornado.web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from concurrency import PerChatUpdateProcessor  # noqa: E402
+from webhook import UpdateIngestor, build_webhook_app  # noqa: E402
+
+from telegram import Update  # noqa: E402
+from telegram.ext import ApplicationBuilder, MessageHandler, filters  # noqa: E402
+
+TOKEN = "123:fake"
+ARRIVAL_INTERVAL = 0.002
+MAX_TENTATIVAS = 5
+
+
+class FakeBotApi(tornado.web.RequestHandler):
+    def initialize(self, latency, calls):
+        self.latency = latency
+        self.calls = calls
+
+    async def post(self, method):
+        self.calls[method] += 1
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "fake", "username": "fake_bot"}
+        elif method == "sendMessage":
+            await asyncio.sleep(self.latency)
+            chat_id = int(self.get_body_argument("chat_id", "0"))
+            result = {"message_id": self.calls[method], "date": 0, "chat": {"id": chat_id, "type": "private"}}
+        else:
+            result = True
+        self.write({"ok": True, "result": result})
+
+
+class InlineWebhook(tornado.web.RequestHandler):
+    """Modo antigo: o handler do bot roda antes da resposta HTTP."""
+
+    def initialize(self, app, em_curso):
+        self.app = app
+        self.em_curso = em_curso
+
+    async def post(self):
+        update = Update.de_json(json.loads(self.request.body), self.app.bot)
+        self.em_curso["n"] += 1
+        try:
+            await self.app.update_processor.process_update(update, self.app.process_update(update))
+        finally:
+            self.em_curso["n"] -= 1
+        self.set_status(200)
+
+
+def serve(app):
+    sockets = tornado.netutil.bind_sockets(0, "127.0.0.1")
+    server = tornado.httpserver.HTTPServer(app)
+    server.add_sockets(sockets)
+    return server, sockets[0].getsockname()[1]
+
+
+def fake_update(i, chat):
+    return {
+        "update_id": i,
+        "message": {
+            "message_id": i, "date": 0, "text": "oi",
+            "chat": {"id": chat, "type": "private"},
+            "from": {"id": chat, "is_bot": False, "first_name": "u"},
+        },
+    }
+
+
+async def deliver(url, n, chats, timeout):
+    """Entrega como o Telegram: reenvia em timeout ou resposta != 2xx.
+
+    Desiste depois de ``MAX_TENTATIVAS`` (o update conta como perdido).
+    """
+    acks, reenvios, perdidos = [], 0, 0
+    client = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=None))
+
+    async def um(i):
+        nonlocal reenvios, perdidos
+        corpo = fake_update(i, i % chats)
+        for _ in range(MAX_TENTATIVAS):
+            start = time.perf_counter()
+            try:
+                resp = await client.post(url, json=corpo)
+                if resp.status_code == 200:
+                    acks.append(time.perf_counter() - start)
+                    return
+            except httpx.TimeoutException:
+                pass
+            reenvios += 1
+            await asyncio.sleep(0.2)
+        perdidos += 1
+
+    tasks = []
+    for i in range(n):
+        tasks.append(asyncio.create_task(um(i)))
+        await asyncio.sleep(ARRIVAL_INTERVAL)
+    await asyncio.gather(*tasks)
+    await client.aclose()
+    return acks, reenvios, perdidos
+
+
+async def run(modo, n, chats, latency, timeout):
+    calls = collections.Counter()
+    api, api_port = serve(tornado.web.Application([(r"/bot[^/]+/(\w+)", FakeBotApi, {"latency": latency, "calls": calls})]))
+
+    processados = collections.Counter()
+
+    async def eco(update, context):
+        processados[update.update_id] += 1
+        await context.bot.send_message(update.effective_chat.id, "ok")
+
+    app = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .base_url(f"http://127.0.0.1:{api_port}/bot")
+        .concurrent_updates(PerChatUpdateProcessor(64))
+        .updater(None)
+        .build()
+    )
+    app.add_handler(MessageHandler(filters.TEXT, eco))
+    await app.initialize()
+    await app.start()
+
+    ingestor = None
+    em_curso = {"n": 0}
+    if modo == "fila":
+        ingestor = UpdateIngestor(app, maxsize=1000, workers=32)
+        ingestor.start()
+        webhook, port = serve(build_webhook_app(ingestor, app.bot, "hook"))
+    else:
+        webhook, port = serve(tornado.web.Application([(r"/hook", InlineWebhook, {"app": app, "em_curso": em_curso})]))
+
+    start = time.perf_counter()
+    acks, reenvios, perdidos = await deliver(f"http://127.0.0.1:{port}/hook", n, chats, timeout)
+    if ingestor is not None:
+        await ingestor.queue.join()
+    while em_curso["n"]:
+        # handlers inline cujo cliente já desistiu ainda rodam
+        await asyncio.sleep(0.05)
+    total = time.perf_counter() - start
+
+    acks.sort()
+    repetidos = sum(c - 1 for c in processados.values())
+    print(
+        f"{modo:<7} ack p50={statistics.median(acks) * 1000:7.1f}ms p99={acks[round(0.99 * (len(acks) - 1))] * 1000:7.1f}ms  "
+        f"reenvios={reenvios:4d}  perdidos={perdidos}  processados={len(processados)}  duplicados={repetidos}  "
+        f"sendMessage={calls['sendMessage']}  total={total:.2f}s"
+    )
+    if ingestor is not None:
+        m = ingestor.metrics
+        print(
+            f"        fila: max={m['max_depth']} descartados={m['duplicates']} recusados={m['rejected']} "
+            f"espera média={m['wait_total'] / max(m['processed'], 1) * 1000:.1f}ms"
+        )
+        await ingestor.stop()
+    webhook.stop()
+    await app.stop()
+    await app.shutdown()
+    api.stop()
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.3
+    timeout = float(sys.argv[4]) if len(sys.argv) > 4 else 1.0
+    print(f"updates={n} chats={chats} latência sendMessage={latency * 1000:.0f}ms timeout do Telegram={timeout:.1f}s")
+    await run("inline", n, chats, latency, timeout)
+    await run("fila", n, chats, latency, timeout)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
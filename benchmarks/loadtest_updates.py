@@ -0,0 +1,106 @@
+# benchmarks/loadtest_updates.py
+"""Replay de updates sintéticos: latência dos handlers sequencial vs. por chat.
+
+Reproduz o que o Application faz com cada update (uma task por update e o
+processador decidindo a concorrência). Os handlers simulam o bot: a maioria
+responde rápido, alguns fazem um send_photo lento e uma fração grava no
+repositório. Verifica também que a ordem dentro de cada chat é preservada.
+
+    python benchmarks/loadtest_updates.py [updates] [chats] [concorrencia]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from concurrency import PerChatUpdateProcessor  # noqa: E402
+from models import Problema  # noqa: E402
+from repository import MemoryRepository  # noqa: E402
+
+from telegram.ext import SimpleUpdateProcessor  # noqa: E402
+
+
+def make_updates(n, chats, seed=7):
+    rnd = random.Random(seed)
+    updates = []
+    for i in range(n):
+        chat = rnd.randrange(chats)
+        # 2% send_photo lento, 10% grava registro, resto resposta rápida
+        r = rnd.random()
+        custo = 0.2 if r < 0.02 else rnd.uniform(0.001, 0.005)
+        updates.append(types.SimpleNamespace(
+            update_id=i,
+            effective_chat=types.SimpleNamespace(id=chat),
+            effective_user=types.SimpleNamespace(id=chat),
+            custo=custo,
+            grava=r > 0.9,
+            chegada=i * 0.0005,
+        ))
+    return updates
+
+
+async def replay(processor, updates, sequential):
+    repo = MemoryRepository()
+    vistos = {}
+    fora_de_ordem = 0
+    latencias = []
+    inicio = time.perf_counter()
+
+    async def handler(u, enfileirado):
+        nonlocal fora_de_ordem
+        chat = u.effective_chat.id
+        if vistos.get(chat, -1) > u.update_id:
+            fora_de_ordem += 1
+        vistos[chat] = u.update_id
+        await asyncio.sleep(u.custo)
+        if u.grava:
+            await repo.add(Problema(id=str(u.update_id), created_at=f"{u.update_id:012d}"))
+        latencias.append(time.perf_counter() - enfileirado)
+
+    await processor.initialize()
+    tasks = []
+    for u in updates:
+        atraso = inicio + u.chegada - time.perf_counter()
+        if atraso > 0:
+            await asyncio.sleep(atraso)
+        # Latência conta desde a chegada prevista, incluindo o tempo na fila
+        enfileirado = inicio + u.chegada
+        if sequential:
+            await processor.process_update(u, handler(u, enfileirado))
+        else:
+            tasks.append(asyncio.create_task(processor.process_update(u, handler(u, enfileirado))))
+    await asyncio.gather(*tasks)
+    await processor.shutdown()
+    total = time.perf_counter() - inicio
+
+    gravados = sum(u.grava for u in updates)
+    assert len(repo) == gravados, (len(repo), gravados)
+    return sorted(latencias), fora_de_ordem, total
+
+
+def pct(valores, p):
+    return valores[round(p * (len(valores) - 1))] * 1000
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    concorrencia = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    updates = make_updates(n, chats)
+    print(f"updates={n} chats={chats} concorrência={concorrencia}")
+    for nome, processor, sequential in (
+        ("sequencial", SimpleUpdateProcessor(1), True),
+        ("por chat", PerChatUpdateProcessor(concorrencia), False),
+    ):
+        lat, fora, total = await replay(processor, updates, sequential)
+        print(
+            f"{nome:<11} p50={pct(lat, 0.5):9.1f}ms  p99={pct(lat, 0.99):9.1f}ms  "
+            f"total={total:6.2f}s  fora de ordem={fora}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
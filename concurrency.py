@@ -0,0 +1,79 @@
+# concurrency.py
+import asyncio
+import collections
+import logging
+
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def update_key(update):
+    """Chave de ordenação do update: o chat, ou o usuário quando não há chat."""
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return ("chat", chat.id)
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return ("user", user.id)
+    return None
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Processa updates de chats diferentes em paralelo e, dentro de um chat, em ordem.
+
+    Cada chat tem uma fila; o primeiro update de um chat ocioso vira o
+    drenador e processa, com a vaga do semáforo que já tem, os que chegarem
+    enquanto isso. Os demais updates do chat só entram na fila e devolvem a
+    vaga na hora, então um chat movimentado ocupa uma vaga só e não segura os
+    outros chats. O Application cria as tasks na ordem de chegada e o
+    semáforo da classe base é FIFO, então a ordem por chat é mantida
+    (inclusive para os ConversationHandlers, cujo estado é por chat/usuário).
+    """
+
+    def __init__(self, max_concurrent_updates=64):
+        super().__init__(max_concurrent_updates)
+        # chave -> updates aguardando o drenador do chat; removido ao esvaziar
+        self._filas = {}
+
+    @property
+    def active_chats(self):
+        return len(self._filas)
+
+    async def do_process_update(self, update, coroutine):
+        key = update_key(update)
+        if key is None:
+            await coroutine
+            return
+
+        fila = self._filas.get(key)
+        if fila is not None:
+            fila.append(coroutine)
+            return
+
+        fila = self._filas[key] = collections.deque()
+        try:
+            await self._rodar(coroutine)
+            while fila:
+                await self._rodar(fila.popleft())
+        finally:
+            del self._filas[key]
+            # Cancelado no meio da fila: fecha o que não chegou a rodar
+            for pendente in fila:
+                pendente.close()
+
+    @staticmethod
+    async def _rodar(coroutine):
+        try:
+            await coroutine
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # O erro de um update não pode parar a fila do chat
+            logger.error("Erro ao processar update: %s", e)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
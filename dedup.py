@@ -0,0 +1,172 @@
+# dedup.py
+"""Detecção de registros quase duplicados: MinHash + LSH por categoria.
+
+O texto comparado é título + local, normalizado como na busca (sem acentos,
+minúsculas, sem stopwords) e quebrado em trigramas de caracteres, então
+"Poste apagado na R. das Flores" e "poste apagado rua das flores" ficam
+próximos. A assinatura é um MinHash de uma passada só (one permutation
+hashing: cada trigrama cai num dos ``bandas * linhas`` compartimentos e o
+compartimento guarda o menor hash).
+
+O LSH agrupa a assinatura em ``bandas`` faixas de ``linhas`` valores; dois
+registros da mesma categoria viram candidatos se alguma faixa coincide. Só os
+candidatos têm a similaridade (Jaccard dos trigramas) calculada, então a
+consulta não depende do número de registros. Com 16 x 3, pares com Jaccard
+0,5 viram candidatos ~88% das vezes e pares com 0,7, ~99,9%.
+"""
+from models import Problema
+from search import tokens
+
+SHINGLE = 3
+
+
+def shingles(registro):
+    """Trigramas de caracteres de título + local normalizados."""
+    return _shingles(registro.titulo, registro.descricao_local)
+
+
+def _shingles(titulo, local):
+    texto = " ".join(tokens(titulo) + tokens(local))
+    if len(texto) <= SHINGLE:
+        return {texto} if texto else set()
+    return {texto[i:i + SHINGLE] for i in range(len(texto) - SHINGLE + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class DuplicateIndex:
+    """Buckets LSH ``hash(categoria, faixa, valores) -> id(s)``; ouvinte de um ``Repository``.
+
+    Um bucket com um só registro guarda o id direto (sem ``set``): é o caso
+    comum e economiza memória com muitos registros. Buckets com mais de
+    ``max_bucket`` ids não entram na consulta, o que limita os candidatos a
+    ``bandas * max_bucket`` qualquer que seja o total de registros.
+
+    O índice guarda também título, local, status e ``created_at`` de cada
+    registro (referências às mesmas strings): a consulta compara os
+    candidatos sem ir ao repositório, o que no SQLite seria uma query por
+    candidato no event loop.
+    """
+
+    def __init__(self, bandas=16, linhas=3, max_bucket=128):
+        self.bandas = bandas
+        self.linhas = linhas
+        self.max_bucket = max_bucket
+        self._buckets = {}
+        # id -> chaves dos buckets, para remoção
+        self._chaves = {}
+        # id -> (categoria, status, titulo, descricao_local, created_at)
+        self._dados = {}
+
+    def __len__(self):
+        return len(self._chaves)
+
+    def assinatura(self, conjunto):
+        """MinHash de uma passada: menor hash() de cada um dos ``bandas * linhas`` compartimentos.
+
+        Compartimento sem trigrama (texto curto) fica None. O hash() de str
+        muda entre processos, o que não importa: o índice é refeito na carga.
+        """
+        n = self.bandas * self.linhas
+        # Em ordem decrescente o último hash de cada compartimento é o menor
+        minimos = {h % n: h for h in sorted(map(hash, conjunto), reverse=True)}
+        return list(map(minimos.get, range(n)))
+
+    def _bucket_keys(self, registro, conjunto=None):
+        assinatura = self.assinatura(shingles(registro) if conjunto is None else conjunto)
+        vazia = (None,) * self.linhas
+        categoria = hash(registro.categoria)
+        faixas = zip(*[iter(assinatura)] * self.linhas)
+        # Faixa toda vazia não é evidência de nada: juntaria todos os textos curtos
+        return tuple(hash((categoria, b, faixa)) for b, faixa in enumerate(faixas) if faixa != vazia)
+
+    def _add(self, registro):
+        chaves = self._bucket_keys(registro)
+        if not chaves:
+            return
+        self._chaves[registro.id] = chaves
+        self._dados[registro.id] = (
+            registro.categoria, registro.status, registro.titulo, registro.descricao_local, registro.created_at
+        )
+        buckets = self._buckets
+        for chave in chaves:
+            atual = buckets.get(chave)
+            if atual is None:
+                buckets[chave] = registro.id
+            elif isinstance(atual, set):
+                atual.add(registro.id)
+            elif atual != registro.id:
+                buckets[chave] = {atual, registro.id}
+
+    def _remove(self, reg_id):
+        chaves = self._chaves.pop(reg_id, None)
+        if chaves is None:
+            return
+        del self._dados[reg_id]
+        buckets = self._buckets
+        for chave in chaves:
+            atual = buckets.get(chave)
+            if atual == reg_id:
+                del buckets[chave]
+            elif isinstance(atual, set):
+                atual.discard(reg_id)
+                if len(atual) == 1:
+                    buckets[chave] = atual.pop()
+
+    # ---------- Eventos do repositório ----------
+    def on_reset(self, registros):
+        self._buckets, self._chaves, self._dados = {}, {}, {}
+        for registro in registros:
+            self._add(registro)
+
+    def on_add(self, registro):
+        self._remove(registro.id)
+        self._add(registro)
+
+    def on_remove(self, registro):
+        self._remove(registro.id)
+
+    # ---------- Consulta ----------
+    def candidatos(self, registro, conjunto=None):
+        """Ids que dividem ao menos uma faixa com ``registro`` (mesma categoria)."""
+        achados = set()
+        for chave in self._bucket_keys(registro, conjunto):
+            atual = self._buckets.get(chave)
+            if atual is None:
+                continue
+            if isinstance(atual, set):
+                # Faixa comum demais (só trigramas de um título frequente,
+                # como "poste apagado") é ignorada, como uma stopword
+                if len(atual) <= self.max_bucket:
+                    achados.update(atual)
+            else:
+                achados.add(atual)
+        achados.discard(registro.id)
+        return achados
+
+    def similares(self, registro, limiar=0.5, limite=3):
+        """Até ``limite`` pares ``(similaridade, registro)`` com Jaccard >= ``limiar``.
+
+        A similaridade exata é calculada só para os candidatos do LSH. Os
+        registros devolvidos são resumos montados do índice: têm id,
+        categoria, status, título, local e ``created_at``.
+        """
+        conjunto = shingles(registro)
+        achados = []
+        for reg_id in self.candidatos(registro, conjunto):
+            categoria, status, titulo, local, created_at = self._dados[reg_id]
+            if categoria != registro.categoria:
+                continue
+            similaridade = jaccard(conjunto, _shingles(titulo, local))
+            if similaridade >= limiar:
+                outro = Problema(
+                    id=reg_id, categoria=categoria, status=status, titulo=titulo,
+                    descricao_local=local, created_at=created_at,
+                )
+                achados.append((similaridade, outro))
+        achados.sort(key=lambda par: (par[0], par[1].created_at or ""), reverse=True)
+        return achados[:limite]
@@ -0,0 +1,189 @@
+# drafts.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+
+class DraftPersistence(BasePersistence):
+    """Persiste rascunhos (user_data) e estados das conversas em SQLite.
+
+    - Gravação em lote: o Application chama ``update_*`` a cada
+      ``update_interval`` e tudo o que chegou na mesma rodada vai numa única
+      transação.
+    - Restauração preguiçosa: nada de user_data é carregado no startup; o
+      rascunho de um usuário só é lido em ``refresh_user_data``, na primeira
+      interação dele depois do restart.
+    - TTL: rascunhos e conversas sem atividade há mais de ``ttl`` segundos são
+      descartados (no banco a cada gravação; em memória via ``stale_users``).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS user_data (
+            user_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_user_data_updated_at ON user_data (updated_at);
+        CREATE TABLE IF NOT EXISTS conversations (
+            name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (name, key)
+        );
+        CREATE INDEX IF NOT EXISTS idx_conversations_updated_at ON conversations (updated_at);
+    """
+
+    def __init__(self, path, ttl=24 * 3600, update_interval=30):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self.ttl = ttl
+        self._conn = None
+        # Gravações pendentes da rodada atual: user_id -> dict | None (remover)
+        self._pending_users = {}
+        self._pending_conversations = {}
+        self._flush_task = None
+        # user_id -> última atividade; também marca quem já foi restaurado
+        self.last_seen = {}
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    # ---------- Leitura ----------
+    async def get_user_data(self):
+        # Restauração preguiçosa: ver refresh_user_data
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        limite = time.time() - self.ttl
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM conversations WHERE updated_at < ?", (limite,))
+        conversas = {}
+        for key, state in conn.execute("SELECT key, state FROM conversations WHERE name = ?", (name,)):
+            conversas[tuple(json.loads(key))] = json.loads(state)
+        logger.info("Conversas '%s' restauradas: %d", name, len(conversas))
+        return conversas
+
+    async def refresh_user_data(self, user_id, user_data):
+        agora = time.time()
+        visto = self.last_seen.get(user_id)
+        self.last_seen[user_id] = agora
+        if visto is None:
+            if user_data:
+                return
+            row = self._connect().execute(
+                "SELECT data, updated_at FROM user_data WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row and row[1] >= agora - self.ttl:
+                user_data.update(json.loads(row[0]))
+                logger.info("Rascunho do usuário %s restaurado", user_id)
+        elif user_data and visto < agora - self.ttl:
+            # Rascunho parado há mais que o TTL: descarta na próxima interação
+            user_data.clear()
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    # ---------- Escrita em lote ----------
+    async def update_user_data(self, user_id, data):
+        self._pending_users[user_id] = data or None
+        await self._flush_soon()
+
+    async def drop_user_data(self, user_id):
+        self._pending_users[user_id] = None
+        self.last_seen.pop(user_id, None)
+        await self._flush_soon()
+
+    async def update_conversation(self, name, key, new_state):
+        self._pending_conversations[(name, json.dumps(list(key)))] = new_state
+        await self._flush_soon()
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def _flush_soon(self):
+        # Todas as chamadas de uma rodada do Application compartilham a mesma gravação
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_after_round())
+        await asyncio.shield(self._flush_task)
+
+    async def _flush_after_round(self):
+        await asyncio.sleep(0)
+        self._write_pending()
+
+    def _write_pending(self):
+        users, self._pending_users = self._pending_users, {}
+        conversas, self._pending_conversations = self._pending_conversations, {}
+        if not users and not conversas:
+            return
+        agora = time.time()
+        conn = self._connect()
+        with conn:
+            for user_id, data in users.items():
+                if data is None:
+                    conn.execute("DELETE FROM user_data WHERE user_id = ?", (user_id,))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO user_data (user_id, data, updated_at) VALUES (?, ?, ?)",
+                        (user_id, json.dumps(data, ensure_ascii=False), agora),
+                    )
+            for (name, key), state in conversas.items():
+                if state is None:
+                    conn.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, key))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO conversations (name, key, state, updated_at) VALUES (?, ?, ?, ?)",
+                        (name, key, json.dumps(state), agora),
+                    )
+            conn.execute("DELETE FROM user_data WHERE updated_at < ?", (agora - self.ttl,))
+        logger.debug("Rascunhos gravados: %d usuários, %d conversas", len(users), len(conversas))
+
+    def stale_users(self):
+        """Usuários sem atividade há mais que o TTL (para ``Application.drop_user_data``)."""
+        limite = time.time() - self.ttl
+        return [uid for uid, visto in self.last_seen.items() if visto < limite]
+
+    async def flush(self):
+        self._write_pending()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,243 @@
+# export.py
+"""Exportação em massa dos registros: CSV, JSONL ou GeoJSON, com gzip opcional.
+
+Os registros chegam em páginas (``Repository.page`` com cursor), cada página
+vira um bloco de texto e é gravada de uma vez num arquivo temporário; a
+memória usada depende do tamanho da página, não do total exportado. Campos
+de uso interno (user_id, chat_id, file_ids das fotos) ficam de fora.
+"""
+import csv
+import gzip
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import serializer
+from models import Categoria, Status, label_of, raw_value
+from pagination import cursor_of
+from search import normalizar
+
+COLUNAS = (
+    "id", "categoria", "status", "titulo", "descricao", "descricao_local",
+    "latitude", "longitude", "created_at", "updated_at",
+)
+FORMATOS = ("csv", "jsonl", "geojson")
+# Limite de upload de documentos da Bot API
+MAX_DOCUMENTO = 50 * 1024 * 1024
+
+
+def linha(p):
+    return {
+        "id": p.id,
+        "categoria": label_of(p.categoria, None),
+        "status": raw_value(p.status),
+        "titulo": p.titulo,
+        "descricao": p.descricao,
+        "descricao_local": p.descricao_local,
+        "latitude": p.latitude,
+        "longitude": p.longitude,
+        "created_at": p.created_at,
+        "updated_at": p.updated_at,
+    }
+
+
+# ---------- Formatos ----------
+# Início de célula que o Excel/LibreOffice interpretam como fórmula
+INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def celula(valor):
+    """Valor de célula CSV; texto que viraria fórmula ganha um ``'`` na frente.
+
+    Título, descrição e local vêm do usuário: "=HYPERLINK(...)" exportado
+    como está seria executado ao abrir o arquivo.
+    """
+    if valor is None:
+        return ""
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+class CsvWriter:
+    """CSV com ";" e BOM: abre direto (com acentos) no Excel em português."""
+
+    extensao = "csv"
+    encoding = "utf-8-sig"
+    mime = "text/csv"
+
+    def inicio(self):
+        return self._linhas([COLUNAS])
+
+    def bloco(self, registros):
+        return self._linhas([tuple(linha(p).values()) for p in registros])
+
+    def fim(self):
+        return ""
+
+    @staticmethod
+    def _linhas(linhas):
+        buffer = io.StringIO()
+        csv.writer(buffer, delimiter=";", lineterminator="\r\n").writerows(
+            [celula(v) for v in valores] for valores in linhas
+        )
+        return buffer.getvalue()
+
+
+class JsonlWriter:
+    extensao = "jsonl"
+    encoding = "utf-8"
+    mime = "application/jsonl"
+
+    def inicio(self):
+        return ""
+
+    def bloco(self, registros):
+        return "".join(serializer.dumps(linha(p)) + "\n" for p in registros)
+
+    def fim(self):
+        return ""
+
+
+class GeoJsonWriter:
+    """FeatureCollection; registro sem coordenadas vai com ``geometry: null``."""
+
+    extensao = "geojson"
+    encoding = "utf-8"
+    mime = "application/geo+json"
+
+    def __init__(self):
+        self._primeiro = True
+
+    def inicio(self):
+        return '{"type":"FeatureCollection","features":[\n'
+
+    def bloco(self, registros):
+        if not registros:
+            return ""
+        features = ",\n".join(serializer.dumps(self._feature(p)) for p in registros)
+        if self._primeiro:
+            self._primeiro = False
+            return features
+        return ",\n" + features
+
+    def fim(self):
+        return "\n]}\n"
+
+    @staticmethod
+    def _feature(p):
+        propriedades = linha(p)
+        lat, lon = propriedades.pop("latitude"), propriedades.pop("longitude")
+        geometria = None
+        if lat is not None and lon is not None:
+            # GeoJSON é [longitude, latitude]
+            geometria = {"type": "Point", "coordinates": [lon, lat]}
+        return {"type": "Feature", "id": p.id, "geometry": geometria, "properties": propriedades}
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "geojson": GeoJsonWriter}
+
+
+# ---------- Opções ----------
+def _data(texto):
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            pass
+    raise ValueError(f"data inválida: {texto}")
+
+
+def _categoria(texto):
+    alvo = normalizar(texto)
+    achadas = [c for c in Categoria if normalizar(c.label).startswith(alvo)]
+    if len(achadas) != 1:
+        raise ValueError(f"categoria inválida ou ambígua: {texto}")
+    return achadas[0]
+
+
+def _status(texto):
+    alvo = normalizar(texto)
+    # Valor ("em_analise") ou rótulo sem o emoji ("em analise"), por prefixo único
+    nomes = {s: (s.value, normalizar(s.label).split(" ", 1)[-1]) for s in Status}
+    achados = [s for s, (valor, rotulo) in nomes.items() if valor.startswith(alvo) or rotulo.startswith(alvo)]
+    if len(achados) != 1:
+        raise ValueError(f"status inválido ou ambíguo: {texto}")
+    return achados[0]
+
+
+def parse_opcoes(args):
+    """Opções de ``/exportar [csv|jsonl|geojson] [gz] [categoria=..] [status=..] [de=..] [ate=..]``.
+
+    Levanta ValueError com a mensagem para o usuário.
+    """
+    opcoes = {"formato": "csv", "gzip": False, "categoria": None, "status": None, "since": None, "until": None}
+    for arg in args:
+        chave, _, valor = arg.partition("=")
+        chave = normalizar(chave)
+        if not valor and chave in FORMATOS:
+            opcoes["formato"] = chave
+        elif not valor and chave in ("gz", "gzip"):
+            opcoes["gzip"] = True
+        elif chave == "categoria" and valor:
+            opcoes["categoria"] = _categoria(valor)
+        elif chave == "status" and valor:
+            opcoes["status"] = _status(valor)
+        elif chave == "de" and valor:
+            opcoes["since"] = _data(valor).strftime("%Y-%m-%d %H:%M:%S")
+        elif chave == "ate" and valor:
+            # "ate" inclui o dia inteiro: o limite é o início do dia seguinte
+            opcoes["until"] = (_data(valor) + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            raise ValueError(f"opção desconhecida: {arg}")
+    return opcoes
+
+
+# ---------- Exportação ----------
+def paginas(repo, tamanho=1000, categoria=None, status=None, since=None, until=None):
+    """Gerador de páginas filtradas, do mais recente ao mais antigo."""
+    cursor = None
+    while True:
+        pagina, tem_mais = repo.page(
+            before=cursor, limit=tamanho, categoria=categoria, status=status, since=since, until=until
+        )
+        if pagina:
+            yield pagina
+        if not tem_mais or not pagina:
+            return
+        cursor = cursor_of(pagina[-1])
+
+
+class Exportacao:
+    """Arquivo temporário sendo escrito; ``escrever`` pode rodar numa thread."""
+
+    def __init__(self, formato, comprimir=False, diretorio=None):
+        self.writer = WRITERS[formato]()
+        self.total = 0
+        nome = f"registros.{self.writer.extensao}" + (".gz" if comprimir else "")
+        self.nome = nome
+        fd, self.path = tempfile.mkstemp(prefix="exportar-", suffix="-" + nome, dir=diretorio)
+        os.close(fd)
+        if comprimir:
+            self._arquivo = gzip.open(self.path, "wt", encoding=self.writer.encoding, newline="", compresslevel=6)
+        else:
+            self._arquivo = open(self.path, "w", encoding=self.writer.encoding, newline="")
+        self._arquivo.write(self.writer.inicio())
+
+    def escrever(self, registros):
+        self._arquivo.write(self.writer.bloco(registros))
+        self.total += len(registros)
+
+    def fechar(self):
+        self._arquivo.write(self.writer.fim())
+        self._arquivo.close()
+        return os.path.getsize(self.path)
+
+    def descartar(self):
+        if not self._arquivo.closed:
+            self._arquivo.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
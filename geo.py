@@ -0,0 +1,134 @@
+# geo.py
+"""Índice espacial em grade uniforme para "problemas perto de mim".
+
+Cada registro com coordenadas cai numa célula de ``cell_deg`` graus. A busca
+dos k mais próximos começa na célula da consulta e expande em anéis; para
+assim que o anel seguinte não pode conter nada mais perto que o k-ésimo
+encontrado (ou que o raio). Só os pontos das células visitadas têm a
+distância calculada.
+"""
+import heapq
+import math
+
+RAIO_TERRA_M = 6_371_000.0
+METROS_POR_GRAU = math.pi * RAIO_TERRA_M / 180
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distância em metros entre dois pontos (graus)."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RAIO_TERRA_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def coordenadas(registro):
+    """``(lat, lon)`` válidos do registro, ou None."""
+    lat, lon = registro.latitude, registro.longitude
+    if lat is None or lon is None:
+        return None
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+class GridIndex:
+    """Grade lat/lon -> {id: (lat, lon)}; ouvinte de um ``Repository``.
+
+    O padrão de 0,01° (~1,1 km de lado no equador) deixa poucas células por
+    busca nos raios típicos de uma cidade.
+    """
+
+    def __init__(self, cell_deg=0.01):
+        self.cell_deg = cell_deg
+        self._colunas = round(360 / cell_deg)
+        self._cells = {}
+        # id -> célula, para remoção
+        self._pos = {}
+
+    def __len__(self):
+        return len(self._pos)
+
+    def _cell(self, lat, lon):
+        # Longitude circular: a coluna dá a volta no antimeridiano
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg) % self._colunas
+
+    def add(self, reg_id, lat, lon):
+        self.remove(reg_id)
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, {})[reg_id] = (lat, lon)
+        self._pos[reg_id] = cell
+
+    def remove(self, reg_id):
+        cell = self._pos.pop(reg_id, None)
+        if cell is None:
+            return
+        pontos = self._cells[cell]
+        del pontos[reg_id]
+        if not pontos:
+            del self._cells[cell]
+
+    # ---------- Eventos do repositório ----------
+    def on_reset(self, registros):
+        self._cells, self._pos = {}, {}
+        for registro in registros:
+            self.on_add(registro)
+
+    def on_add(self, registro):
+        coords = coordenadas(registro)
+        if coords is None:
+            self.remove(registro.id)
+        else:
+            self.add(registro.id, *coords)
+
+    def on_remove(self, registro):
+        self.remove(registro.id)
+
+    # ---------- Consulta ----------
+    def _anel(self, linha, coluna, r):
+        """Células na borda do quadrado de "raio" ``r`` (em células) ao redor de (linha, coluna)."""
+        if r == 0:
+            yield linha, coluna
+            return
+        for dc in range(-r, r + 1):
+            yield linha - r, (coluna + dc) % self._colunas
+            yield linha + r, (coluna + dc) % self._colunas
+        for dl in range(-r + 1, r):
+            yield linha + dl, (coluna - r) % self._colunas
+            yield linha + dl, (coluna + r) % self._colunas
+
+    def nearest(self, lat, lon, k=5, radius_m=2000.0):
+        """Até ``k`` pares ``(distância_m, id)`` dentro de ``radius_m``, do mais perto ao mais longe."""
+        if not self._pos or k <= 0:
+            return []
+        linha, coluna = self._cell(lat, lon)
+        # Menor lado de célula na faixa de latitude coberta pelo raio: limite
+        # inferior seguro para a distância até o anel r (>= (r - 1) lados)
+        lat_max = min(89.9, abs(lat) + radius_m / METROS_POR_GRAU)
+        lado_m = self.cell_deg * METROS_POR_GRAU * math.cos(math.radians(lat_max))
+        max_aneis = min(int(radius_m / lado_m) + 2, self._colunas // 2)
+        # Heap de máximo (distância negativa) com os k melhores até aqui
+        melhores = []
+        visitadas = set()
+        for r in range(max_aneis + 1):
+            if r >= 2:
+                limite = (r - 1) * lado_m
+                if limite > radius_m or (len(melhores) == k and limite > -melhores[0][0]):
+                    break
+            for cell in self._anel(linha, coluna, r):
+                if cell in visitadas:
+                    continue
+                visitadas.add(cell)
+                for reg_id, (plat, plon) in self._cells.get(cell, {}).items():
+                    d = haversine(lat, lon, plat, plon)
+                    if d > radius_m:
+                        continue
+                    if len(melhores) < k:
+                        heapq.heappush(melhores, (-d, reg_id))
+                    elif d < -melhores[0][0]:
+                        heapq.heapreplace(melhores, (-d, reg_id))
+        return sorted((-d, reg_id) for d, reg_id in melhores)
@@ -0,0 +1,87 @@
+# indexes.py
+import bisect
+
+from pagination import cursor_of
+
+
+class OrderedIndex:
+    """Registros ordenados por (created_at, id), mantidos incrementalmente.
+
+    Inserção e remoção localizam a posição com bisect; páginas e "últimos N"
+    são fatias das listas, sem reordenar nada.
+    """
+
+    def __init__(self, key=cursor_of):
+        self.key = key
+        self._keys = []
+        self._values = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def values(self):
+        """Registros em ordem crescente de chave (a lista interna; não alterar)."""
+        return self._values
+
+    def rebuild(self, registros):
+        pares = sorted(((self.key(r), r) for r in registros), key=lambda par: par[0])
+        self._keys = [k for k, _ in pares]
+        self._values = [r for _, r in pares]
+
+    def add(self, registro):
+        k = self.key(registro)
+        i = bisect.bisect_right(self._keys, k)
+        self._keys.insert(i, k)
+        self._values.insert(i, registro)
+
+    def remove(self, registro):
+        k = self.key(registro)
+        i = bisect.bisect_left(self._keys, k)
+        if i < len(self._keys) and self._keys[i] == k:
+            del self._keys[i]
+            del self._values[i]
+            return True
+        return False
+
+    def remove_many(self, registros):
+        """Remove vários registros em uma única passada pelas listas."""
+        alvo = {self.key(r) for r in registros}
+        if not alvo:
+            return
+        pares = [(k, v) for k, v in zip(self._keys, self._values) if k not in alvo]
+        self._keys = [k for k, _ in pares]
+        self._values = [v for _, v in pares]
+
+    def page(self, before=None, after=None, limit=10, match=None, since=None, until=None):
+        """Mesmo contrato de ``Repository.page``: mais recentes primeiro.
+
+        ``since``/``until`` (created_at, inclusivo/exclusivo) limitam a faixa via
+        bisect; ``match`` filtra os registros percorridos a partir do cursor.
+        """
+        lo = bisect.bisect_left(self._keys, (since,)) if since else 0
+        hi = bisect.bisect_left(self._keys, (until,)) if until else len(self._keys)
+        if after is not None:
+            inicio = max(lo, bisect.bisect_right(self._keys, after))
+            if match is None:
+                itens = self._values[inicio:min(hi, inicio + limit + 1)]
+            else:
+                itens = self._scan(range(inicio, hi), match, limit + 1)
+            return itens[:limit][::-1], len(itens) > limit
+        fim = hi if before is None else min(hi, bisect.bisect_left(self._keys, before))
+        if match is None:
+            itens = self._values[max(fim - limit - 1, lo):fim][::-1]
+        else:
+            itens = self._scan(range(fim - 1, lo - 1, -1), match, limit + 1)
+        return itens[:limit], len(itens) > limit
+
+    def _scan(self, posicoes, match, n):
+        itens = []
+        for i in posicoes:
+            if match(self._values[i]):
+                itens.append(self._values[i])
+                if len(itens) == n:
+                    break
+        return itens
+
+    def latest(self, n):
+        return self._values[:-n - 1:-1] if n else []
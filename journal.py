@@ -0,0 +1,158 @@
+# journal.py
+import asyncio
+import logging
+import os
+import time
+
+import serializer
+
+logger = logging.getLogger(__name__)
+
+FSYNC_ALWAYS = "always"
+FSYNC_INTERVAL = "interval"
+FSYNC_NEVER = "never"
+
+
+class Journal:
+    """Journal local append-only (JSONL) com compactação em snapshots.
+
+    Cada mutação vira uma linha ``{"op": "add", "record": {...}}``,
+    ``{"op": "del", "id": "..."}`` ou ``{"op": "del", "ids": [...]}``. A compactação grava o estado completo em
+    ``snapshot.json`` e descarta o journal; o startup lê o snapshot e reaplica
+    o journal por cima.
+    """
+
+    def __init__(self, directory, fsync=FSYNC_ALWAYS, fsync_interval=1.0):
+        if fsync not in (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER):
+            raise ValueError(f"Política de fsync inválida: {fsync}")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.journal_path = os.path.join(directory, "journal.jsonl")
+        # Journal rotacionado durante uma compactação em andamento
+        self.old_path = self.journal_path + ".old"
+        self.entries = 0
+        self._fh = None
+        self._last_fsync = 0.0
+        self._compact_lock = asyncio.Lock()
+
+    @property
+    def exists(self):
+        return any(os.path.exists(p) for p in (self.snapshot_path, self.journal_path, self.old_path))
+
+    # ---------- Leitura ----------
+    def replay(self):
+        registros = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                for r in serializer.loads(f.read()):
+                    registros[r["id"]] = r
+        self.entries = 0
+        for path in (self.old_path, self.journal_path):
+            if os.path.exists(path):
+                self.entries += self._apply_file(path, registros)
+        return list(registros.values())
+
+    def _apply_file(self, path, registros):
+        aplicadas = 0
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                try:
+                    op = serializer.loads(line)
+                except ValueError:
+                    # Última linha cortada por um crash no meio da escrita
+                    logger.warning("Linha %d inválida em %s ignorada", n, path)
+                    continue
+                if op.get("op") == "add":
+                    registros[op["record"]["id"]] = op["record"]
+                elif op.get("op") == "del":
+                    for reg_id in op.get("ids") or [op["id"]]:
+                        registros.pop(reg_id, None)
+                aplicadas += 1
+        return aplicadas
+
+    # ---------- Escrita ----------
+    def _open(self):
+        if self._fh is None:
+            os.makedirs(self.directory, exist_ok=True)
+            incompleta = False
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0:
+                with open(self.journal_path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    incompleta = f.read(1) != b"\n"
+            self._fh = open(self.journal_path, "a", encoding="utf-8")
+            # Isola uma linha incompleta deixada por um crash
+            if incompleta:
+                self._fh.write("\n")
+        return self._fh
+
+    def append(self, op):
+        fh = self._open()
+        fh.write(serializer.dumps(op) + "\n")
+        fh.flush()
+        now = time.monotonic()
+        if self.fsync == FSYNC_ALWAYS or (
+            self.fsync == FSYNC_INTERVAL and now - self._last_fsync >= self.fsync_interval
+        ):
+            os.fsync(fh.fileno())
+            self._last_fsync = now
+        self.entries += 1
+
+    def _rotate(self):
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            self._fh = None
+        if os.path.exists(self.journal_path):
+            if os.path.exists(self.old_path):
+                # Sobra de uma compactação interrompida: preserva as duas partes
+                with open(self.old_path, "a", encoding="utf-8") as old, open(self.journal_path, encoding="utf-8") as cur:
+                    old.write(cur.read())
+                    old.flush()
+                    os.fsync(old.fileno())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.old_path)
+        self.entries = 0
+
+    def _write_snapshot(self, registros, encode=None):
+        content = encode(registros) if encode else serializer.dumps(registros)
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        if os.path.exists(self.old_path):
+            os.remove(self.old_path)
+        return content
+
+    async def compact(self, registros, encode=None):
+        """Grava um snapshot de ``registros`` e devolve o conteúdo serializado.
+
+        ``registros`` é uma função que devolve o estado atual: ela só é
+        chamada com o lock, logo antes da rotação; uma cópia tirada antes
+        perderia as mutações feitas enquanto outra compactação esperava.
+        ``encode`` (opcional) transforma a cópia no conteúdo, numa thread;
+        por padrão é ``serializer.dumps``.
+        """
+        async with self._compact_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # Cópia e rotação sem await entre elas: nenhuma mutação fica de fora
+            snapshot = list(registros())
+            self._rotate()
+            start = time.perf_counter()
+            content = await asyncio.to_thread(self._write_snapshot, snapshot, encode)
+            logger.info(
+                "Journal compactado (%d bytes em %.0f ms)", len(content), (time.perf_counter() - start) * 1000
+            )
+            return content
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,88 @@
+# jsonstream.py
+import codecs
+import json
+import re
+
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+class JsonArrayParser:
+    """Parser incremental de um array JSON de registros.
+
+    ``feed()`` recebe pedaços (bytes ou str) e devolve os elementos que já
+    ficaram completos; só o elemento em andamento fica no buffer, nunca o
+    texto inteiro. ``close()`` confere que o array terminou.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        # start -> first -> (item <-> sep) -> done
+        self._state = "start"
+
+    def feed(self, data, final=False):
+        if isinstance(data, bytes):
+            data = self._utf8.decode(data, final)
+        buf = self._buf + data if self._buf else data
+        itens = []
+        pos = 0
+        while True:
+            pos = _WS.match(buf, pos).end()
+            if pos == len(buf):
+                break
+            if self._state == "start":
+                if buf[pos] != "[":
+                    raise ValueError("Conteúdo não é um array JSON")
+                pos += 1
+                self._state = "first"
+            elif self._state in ("first", "item"):
+                if self._state == "first" and buf[pos] == "]":
+                    pos += 1
+                    self._state = "done"
+                    continue
+                try:
+                    item, fim = self._decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # Elemento ainda incompleto: espera o próximo pedaço
+                    break
+                if fim == len(buf) and not final:
+                    # Um número no fim do pedaço pode continuar no próximo
+                    break
+                itens.append(item)
+                pos = fim
+                self._state = "sep"
+            elif self._state == "sep":
+                if buf[pos] == ",":
+                    self._state = "item"
+                elif buf[pos] == "]":
+                    self._state = "done"
+                else:
+                    raise ValueError(f"Separador inesperado no array JSON: {buf[pos]!r}")
+                pos += 1
+            else:
+                raise ValueError("Dados após o fim do array JSON")
+        self._buf = buf[pos:]
+        return itens
+
+    def close(self):
+        itens = self.feed(self._utf8.decode(b"", True), final=True)
+        if self._state != "done" or self._buf.strip():
+            raise ValueError("Array JSON incompleto (conteúdo truncado?)")
+        return itens
+
+
+def parse_chunks(chunks):
+    """Lista de registros a partir de um iterável de pedaços."""
+    parser = JsonArrayParser()
+    registros = []
+    for chunk in chunks:
+        registros.extend(parser.feed(chunk))
+    registros.extend(parser.close())
+    return registros
+
+
+def load_file(path, chunk_size=64 * 1024):
+    """Lê um arquivo com um array JSON sem carregar o texto inteiro."""
+    with open(path, "rb") as f:
+        return parse_chunks(iter(lambda: f.read(chunk_size), b""))
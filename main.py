@@ -1,16 +1,38 @@
 # main.py
 import os
-import json
+import asyncio
+import functools
 import logging
+import time
 from datetime import datetime, timedelta
 import uuid
-import requests
+
+from concurrency import PerChatUpdateProcessor
+from drafts import DraftPersistence
+import metrics
+from webhook import UpdateIngestor, run_webhook, serve_metrics
+from models import Categoria, Problema, Status, as_status, label_of
+from journal import Journal
+from ratelimit import OutboundRateLimiter
+from pagination import cursor_of, decode_cursor, encode_cursor
+import media
+import render
+from search import SearchIndex
+from geo import GridIndex
+from stats import StatsCollector
+from dedup import DuplicateIndex
+import export
+from repository import JournalRepository, MemoryRepository, SqliteRepository
+from storage import GistReplica, GistStore, ShardedGistReplica
 
 from telegram import (
     Update,
     InlineKeyboardButton,
-    InlineKeyboardMarkup
+    InlineKeyboardMarkup,
+    InputMediaPhoto,
+    ReplyKeyboardRemove
 )
+from telegram.error import BadRequest
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -21,6 +43,9 @@ from telegram.ext import (
     filters
 )
 
+# Referência para os tempos das fases de inicialização
+INICIO = time.perf_counter()
+
 # ---------- Config logging ----------
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
@@ -30,6 +55,47 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 GIST_TOKEN = os.getenv("GIST_TOKEN")
 GIST_ID = os.getenv("GIST_ID")
 GIST_FILENAME = os.getenv("GIST_FILENAME", "registros.json")
+# Janela (s) em que mutações são agrupadas em um único PATCH
+GIST_FLUSH_WINDOW = float(os.getenv("GIST_FLUSH_WINDOW", "1.0"))
+
+# Backend de armazenamento: sqlite | journal | gist | memory
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+# Se ativo, o usuário só recebe "registrado" após o lote ser gravado no Gist.
+# No backend gist o Gist é o único armazenamento durável, então o padrão é
+# ligado; nos backends locais o commit é a gravação local e o Gist é réplica
+GIST_DURABLE = os.getenv("GIST_DURABLE", "1" if STORAGE_BACKEND == "gist" else "0") == "1"
+if STORAGE_BACKEND == "gist" and not GIST_DURABLE:
+    logger.warning(
+        "GIST_DURABLE=0 com STORAGE_BACKEND=gist: registros confirmados podem se perder "
+        "se o processo cair antes do próximo lote"
+    )
+DATA_DIR = os.getenv("DATA_DIR", "data")
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(DATA_DIR, "problemas.db"))
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "always")  # always | interval | never
+JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", "500"))
+# Updates processados em paralelo (chats diferentes); 1 = sequencial
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
+# Envios ao Telegram (mensagens/s): global e por chat privado
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", "1"))
+TG_CHAT_BURST = int(os.getenv("TG_CHAT_BURST", "6"))
+# Webhook (Render): fila limitada entre o ACK e os handlers
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+# /metrics: no webhook fica no mesmo servidor, só com METRICS_TOKEN; no polling só sobe com METRICS_PORT
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+# Rascunhos de conversas: gravados em lote e descartados após o TTL
+DRAFTS_PATH = os.getenv("DRAFTS_PATH", os.path.join(DATA_DIR, "rascunhos.db"))
+DRAFT_TTL_HOURS = float(os.getenv("DRAFT_TTL_HOURS", "24"))
+DRAFT_FLUSH_INTERVAL = float(os.getenv("DRAFT_FLUSH_INTERVAL", "30"))
+# Um arquivo por mês no gist (só os meses alterados são regravados)
+GIST_SHARDED = os.getenv("GIST_SHARDED", "0") == "1"
+# Cache local do gist (backend gist): evita o download completo se nada mudou
+GIST_CACHE_PATH = os.getenv("GIST_CACHE_PATH", os.path.join(DATA_DIR, "gist_cache.json"))
+# Quanto um handler que lê registros espera a hidratação do startup (s)
+DATA_READY_TIMEOUT = float(os.getenv("DATA_READY_TIMEOUT", "10"))
 
 if not BOT_TOKEN:
     logger.error("BOT_TOKEN não definido")
@@ -38,73 +104,76 @@ if not BOT_TOKEN:
 # ---------- Conversation states ----------
 CATEGORIA, TITULO, DESCRICAO, PHOTO, LOCATION, CONFIRMACAO = range(6)
 DELETE_PASSWORD, DELETE_CHOOSE, DELETE_CONFIRM = range(6, 9)
+EXPORT_PASSWORD = 9
 
 # ---------- Constants ----------
-STATUS_PENDENTE = "pendente"
+STATUS_PENDENTE = Status.PENDENTE.value
 ADMIN_PASSWORD = "12345678"
-
-CATEGORIAS = [
-    "Iluminação pública",
-    "Limpeza urbana",
-    "Buraco na rua",
-    "Áreas verdes / Praças",
-    "Escola / Creche",
-    "Segurança",
-    "Outro"
-]
+LISTAR_PAGE_SIZE = int(os.getenv("LISTAR_PAGE_SIZE", "5"))
+BUSCA_PAGE_SIZE = int(os.getenv("BUSCA_PAGE_SIZE", "5"))
+DELETE_PAGE_SIZE = int(os.getenv("DELETE_PAGE_SIZE", "8"))
+# "Perto de mim": quantos registros e até que distância (m)
+PERTO_K = int(os.getenv("PERTO_K", "5"))
+PERTO_RAIO_M = float(os.getenv("PERTO_RAIO_M", "2000"))
+# Aviso de duplicado no preview: similaridade mínima (Jaccard dos trigramas
+# de título + local) e formato do LSH (bandas x linhas)
+DEDUP_LIMIAR = float(os.getenv("DEDUP_LIMIAR", "0.5"))
+DEDUP_BANDAS = int(os.getenv("DEDUP_BANDAS", "16"))
+DEDUP_LINHAS = int(os.getenv("DEDUP_LINHAS", "3"))
+# Dias na série diária do /stats (mínimo 1)
+STATS_DIAS = max(1, int(os.getenv("STATS_DIAS", "14")))
+# Registros por página lida do store (e por bloco gravado) no /exportar
+EXPORT_CHUNK = int(os.getenv("EXPORT_CHUNK", "1000"))
+PERIODOS_EXCLUSAO = [7, 30, 90]
+
+CATEGORIAS = [c.label for c in Categoria]
 
 # ---------- Store ----------
-problemas_store = []
-
-# ---------- Gist ----------
-GIST_API_BASE = "https://api.github.com/gists"
-
-def gist_headers():
-    return {"Authorization": f"token {GIST_TOKEN}", "Accept": "application/vnd.github+json"}
-
-def load_from_gist():
-    global problemas_store
-    try:
-        if not GIST_TOKEN or not GIST_ID:
-            logger.warning("GIST_TOKEN ou GIST_ID não definidos. Usando armazenamento local.")
-            problemas_store = []
-            return
-            
-        resp = requests.get(f"{GIST_API_BASE}/{GIST_ID}", headers=gist_headers(), timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        files = data.get("files", {})
-        if GIST_FILENAME in files:
-            raw = files[GIST_FILENAME].get("content", "[]")
-            try:
-                problemas_store = json.loads(raw)
-                logger.info("Dados carregados do gist com sucesso (%d registros)", len(problemas_store))
-            except Exception as e:
-                logger.error("Erro ao desserializar conteúdo do gist: %s", e)
-                problemas_store = []
-        else:
-            problemas_store = []
-            save_to_gist()
-    except Exception as e:
-        logger.warning("Não foi possível carregar Gist: %s", e)
-        problemas_store = []
+def build_repository():
+    replica = None
+    if GIST_TOKEN and GIST_ID and GIST_SHARDED:
+        replica = ShardedGistReplica(
+            GistStore(GIST_TOKEN, GIST_ID, GIST_FILENAME),
+            window=GIST_FLUSH_WINDOW,
+            durable=GIST_DURABLE,
+            primary=STORAGE_BACKEND == "gist"
+        )
+    elif GIST_TOKEN and GIST_ID:
+        replica = GistReplica(
+            GistStore(GIST_TOKEN, GIST_ID, GIST_FILENAME),
+            window=GIST_FLUSH_WINDOW,
+            durable=GIST_DURABLE,
+            # Nos backends locais o próprio disco já faz o papel de cache
+            cache_path=GIST_CACHE_PATH if STORAGE_BACKEND == "gist" else None,
+            primary=STORAGE_BACKEND == "gist"
+        )
 
-def save_to_gist():
-    global problemas_store
-    try:
-        if not GIST_TOKEN or not GIST_ID:
-            logger.warning("GIST_TOKEN ou GIST_ID não definidos. Salvando localmente.")
-            return True
-            
-        content = json.dumps(problemas_store, ensure_ascii=False, indent=2)
-        payload = {"files": {GIST_FILENAME: {"content": content}}}
-        resp = requests.patch(f"{GIST_API_BASE}/{GIST_ID}", headers=gist_headers(), json=payload, timeout=15)
-        resp.raise_for_status()
-        logger.info("Gist atualizado com sucesso")
-        return True
-    except Exception as e:
-        logger.error("Erro ao atualizar gist: %s", e)
-        return False
+    if STORAGE_BACKEND == "sqlite":
+        return SqliteRepository(SQLITE_PATH, replica)
+    if STORAGE_BACKEND == "journal":
+        journal = Journal(DATA_DIR, fsync=JOURNAL_FSYNC)
+        return JournalRepository(journal, replica, compact_every=JOURNAL_COMPACT_EVERY)
+    if STORAGE_BACKEND == "gist":
+        return MemoryRepository(replica)
+    if STORAGE_BACKEND == "memory":
+        return MemoryRepository()
+    raise ValueError(f"STORAGE_BACKEND inválido: {STORAGE_BACKEND}")
+
+repo = build_repository()
+busca = SearchIndex()
+repo.subscribe(busca)
+proximos = GridIndex()
+repo.subscribe(proximos)
+estatisticas = StatsCollector()
+repo.subscribe(estatisticas)
+duplicados = DuplicateIndex(bandas=DEDUP_BANDAS, linhas=DEDUP_LINHAS)
+repo.subscribe(duplicados)
+repo.subscribe(render.CARDS)
+draft_persistence = DraftPersistence(
+    DRAFTS_PATH,
+    ttl=DRAFT_TTL_HOURS * 3600,
+    update_interval=DRAFT_FLUSH_INTERVAL
+)
 
 
 # ---------- Util ----------
@@ -115,47 +184,372 @@ def get_uuid():
     return str(uuid.uuid4())
 
 def format_status(status):
-    mapa = {
-        "pendente": "⏳ Pendente",
-        "aprovado": "✅ Aprovado",
-        "em_analise": "🔍 Em análise",
-        "rejeitado": "❌ Rejeitado"
-    }
-    return mapa.get(status, status)
+    return label_of(as_status(status), "")
+
+async def aguardar_dados(update, context):
+    """Espera o repositório terminar de carregar; avisa o usuário se demorar."""
+    if repo.ready.is_set():
+        return True
+    chat_id = update.effective_chat.id
+    await context.bot.send_message(chat_id, "⏳ Carregando registros, só um instante...")
+    if await repo.wait_ready(DATA_READY_TIMEOUT):
+        return True
+    await context.bot.send_message(
+        chat_id,
+        "⚠️ Os registros ainda estão carregando. Tente novamente em instantes."
+    )
+    return False
+
+
+def requer_dados(handler):
+    """Handlers que leem registros só rodam depois da hidratação do startup."""
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        if not await aguardar_dados(update, context):
+            if update.callback_query:
+                await update.callback_query.answer()
+            return None
+        return await handler(update, context)
+    return wrapper
+
+
+HANDLER_SECONDS = metrics.histogram(
+    "bot_handler_seconds", "Tempo de execução dos handlers", labels=("handler",)
+)
+HANDLER_ERRORS = metrics.counter(
+    "bot_handler_errors_total", "Exceções levantadas pelos handlers", labels=("handler",)
+)
+# Mais externo que requer_dados/requer_rascunho: mede o que o usuário espera
+medido = metrics.timed(HANDLER_SECONDS, HANDLER_ERRORS)
+
+
+def estado_navegacao(before, after, tem_mais, offset):
+    """Converte o resultado de repo.page em (tem_anterior, tem_proxima, offset)."""
+    if after is not None:
+        # Voltando: "tem_mais" indica se ainda há páginas mais recentes
+        if not tem_mais:
+            offset = 0
+        return tem_mais, True, max(offset, 0)
+    return before is not None, tem_mais, max(offset, 0)
 
 
 # ---------- Menu ----------
 async def send_menu(update, context):
-    keyboard = [
-        [InlineKeyboardButton("📝 Registrar problema", callback_data="registrar")],
-        [InlineKeyboardButton("📋 Listar registros", callback_data="listar")],
-        [InlineKeyboardButton("🗑 Deletar registros", callback_data="delete_menu")],
-        [InlineKeyboardButton("❓ Ajuda", callback_data="ajuda")]
+    chat_id = update.effective_chat.id
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=render.MENU_TEXTO,
+        parse_mode="Markdown",
+        reply_markup=render.MENU
+    )
+
+
+# ---------- Envio em lote ----------
+MAX_ALBUM = 10
+MAX_CAPTION = 1024
+MAX_TEXTO = 4096
+
+async def enviar_cards(context, chat_id, cards):
+    """Envia (texto, foto) em ordem com o mínimo de chamadas à API.
+
+    Fotos consecutivas viram um álbum (send_media_group, até 10) e textos
+    consecutivos são juntados numa única mensagem.
+    """
+    i = 0
+    while i < len(cards):
+        grupo = []
+        if cards[i][1] and len(cards[i][0]) <= MAX_CAPTION:
+            while (i < len(cards) and len(grupo) < MAX_ALBUM
+                   and cards[i][1] and len(cards[i][0]) <= MAX_CAPTION):
+                grupo.append(cards[i])
+                i += 1
+            await _enviar_album(context, chat_id, grupo)
+        else:
+            # Foto com legenda acima do limite também vai como texto
+            while (i < len(cards) and not (cards[i][1] and len(cards[i][0]) <= MAX_CAPTION)
+                   and len("\n".join(t for t, _ in grupo + [cards[i]])) <= MAX_TEXTO):
+                grupo.append(cards[i])
+                i += 1
+            if not grupo:
+                grupo.append(cards[i])
+                i += 1
+            await _enviar_textos(context, chat_id, grupo)
+
+
+async def _enviar_textos(context, chat_id, grupo):
+    await context.bot.send_message(
+        chat_id=chat_id,
+        # Os grupos são montados por card e cada card já vem encurtado
+        # (render._corpo): sem corte aqui, que poderia partir o Markdown
+        text="\n".join(texto for texto, _ in grupo),
+        parse_mode="Markdown"
+    )
+
+
+async def _enviar_foto(context, chat_id, card):
+    texto, foto = card
+    try:
+        await context.bot.send_photo(chat_id=chat_id, photo=foto, caption=texto, parse_mode="Markdown")
+    except Exception as e:
+        if media.erro_de_arquivo(e):
+            media.INVALIDOS.add(foto)
+        logger.warning("Erro ao enviar foto no listar (fallback texto): %s", e)
+        await _enviar_textos(context, chat_id, [card])
+
+
+async def _enviar_album(context, chat_id, grupo):
+    if len(grupo) == 1:
+        await _enviar_foto(context, chat_id, grupo[0])
+        return
+    try:
+        await context.bot.send_media_group(
+            chat_id=chat_id,
+            media=[InputMediaPhoto(media=foto, caption=texto, parse_mode="Markdown") for texto, foto in grupo]
+        )
+    except Exception as e:
+        if not media.erro_de_arquivo(e):
+            logger.warning("Erro ao enviar álbum no listar (fallback texto): %s", e)
+            await _enviar_textos(context, chat_id, grupo)
+            return
+        # A API não diz qual foto do álbum falhou: uma a uma, as inválidas
+        # entram no cache e as próximas listagens já não as enviam
+        logger.warning("Foto inválida no álbum; reenviando uma a uma: %s", e)
+        for card in grupo:
+            await _enviar_foto(context, chat_id, card)
+
+
+# ---------- Listagem ----------
+async def enviar_pagina(context, chat_id, pagina, offset):
+    """Cards de uma página (listagem ou busca), numerados a partir de ``offset + 1``."""
+    cards = [(render.card_listagem(p, i), media.foto_listagem(p)) for i, p in enumerate(pagina, offset + 1)]
+    await enviar_cards(context, chat_id, cards)
+
+
+def teclado_pagina(pagina, offset, navegacao):
+    """Botões de foto original + navegação + voltar ao menu."""
+    # Na listagem vai a miniatura; o original só quando pedido
+    fotos = [
+        InlineKeyboardButton(f"🔍 Foto {i}", callback_data=f"foto:{p.id}")
+        for i, p in enumerate(pagina, offset + 1)
+        if p.photo_thumb_file_id and media.foto_completa(p)
     ]
-    markup = InlineKeyboardMarkup(keyboard)
+    linhas = [fotos[i:i + 5] for i in range(0, len(fotos), 5)]
+    if navegacao:
+        linhas.append(navegacao)
+    return InlineKeyboardMarkup(linhas + [[render.BOTAO_VOLTAR_MENU]]) if linhas else render.VOLTAR_MENU
+
+
+async def enviar_listagem(context, chat_id, before=None, after=None, offset=0):
+    """Envia só uma página da listagem, seguida da navegação Anteriores/Próximos."""
+    total = len(repo)
+    if not total:
+        await context.bot.send_message(
+            chat_id, 
+            "📋 Nenhum problema registrado ainda.",
+            reply_markup=render.VOLTAR_MENU
+        )
+        return
+
+    pagina, tem_mais = repo.page(before=before, after=after, limit=LISTAR_PAGE_SIZE)
+    tem_anterior, tem_proxima, offset = estado_navegacao(before, after, tem_mais, offset)
+
+    await enviar_pagina(context, chat_id, pagina, offset)
+
+    navegacao = []
+    if tem_anterior and pagina:
+        cursor = encode_cursor(cursor_of(pagina[0]))
+        navegacao.append(InlineKeyboardButton("⬅️ Anteriores", callback_data=f"lst:a:{offset - LISTAR_PAGE_SIZE}:{cursor}"))
+    if tem_proxima and pagina:
+        cursor = encode_cursor(cursor_of(pagina[-1]))
+        navegacao.append(InlineKeyboardButton("Próximos ➡️", callback_data=f"lst:b:{offset + len(pagina)}:{cursor}"))
+    await context.bot.send_message(
+        chat_id,
+        f"📋 Registros {offset + 1}–{offset + len(pagina)} de {total}",
+        reply_markup=teclado_pagina(pagina, offset, navegacao)
+    )
+
+
+@medido
+@requer_dados
+async def listar_command(update, context):
+    await enviar_listagem(context, update.effective_chat.id)
+
 
+@medido
+@requer_dados
+async def listar_pagina(update, context):
+    query = update.callback_query
+    await query.answer()
+    # lst:<b|a>:<offset>:<cursor>
+    _, direcao, offset, cursor = query.data.split(":", 3)
+    try:
+        cursor = decode_cursor(cursor)
+    except ValueError:
+        await send_menu(update, context)
+        return
+    if direcao == "a":
+        await enviar_listagem(context, query.message.chat.id, after=cursor, offset=int(offset))
+    else:
+        await enviar_listagem(context, query.message.chat.id, before=cursor, offset=int(offset))
+
+
+@medido
+@requer_dados
+async def ver_foto(update, context):
+    """Envia a foto original (não a miniatura) de um registro da listagem."""
+    query = update.callback_query
+    registro = repo.get(query.data.split(":", 1)[1])
+    foto = media.foto_completa(registro) if registro else None
+    if foto is None:
+        await query.answer("📷 Foto indisponível.", show_alert=True)
+        return
+    await query.answer()
+    try:
+        await context.bot.send_photo(
+            chat_id=query.message.chat.id,
+            photo=foto,
+            caption=f"📷 *{registro.titulo or '-'}*",
+            parse_mode="Markdown"
+        )
+    except BadRequest as e:
+        if not media.erro_de_arquivo(e):
+            raise
+        media.INVALIDOS.add(foto)
+        await context.bot.send_message(query.message.chat.id, "📷 Foto indisponível.")
+
+
+# ---------- Busca ----------
+async def enviar_busca(context, chat_id, consulta, offset=0):
+    ids, total = busca.search(consulta, limit=BUSCA_PAGE_SIZE, offset=offset)
+    if not total:
+        await context.bot.send_message(
+            chat_id,
+            f"🔎 Nada encontrado para “{consulta}”.",
+            reply_markup=render.VOLTAR_MENU
+        )
+        return
+    pagina = [r for r in (repo.get(i) for i in ids) if r is not None]
+    await enviar_pagina(context, chat_id, pagina, offset)
+
+    navegacao = []
+    if offset > 0:
+        navegacao.append(InlineKeyboardButton("⬅️ Anteriores", callback_data=f"bsc:{max(offset - BUSCA_PAGE_SIZE, 0)}"))
+    if offset + len(ids) < total:
+        navegacao.append(InlineKeyboardButton("Próximos ➡️", callback_data=f"bsc:{offset + len(ids)}"))
+    await context.bot.send_message(
+        chat_id,
+        f"🔎 Resultados {offset + 1}–{offset + len(pagina)} de {total} para “{consulta}”",
+        reply_markup=teclado_pagina(pagina, offset, navegacao)
+    )
+
+
+@medido
+@requer_dados
+async def buscar_command(update, context):
+    consulta = " ".join(context.args or []).strip()
+    if not consulta:
+        await update.message.reply_text(
+            "🔎 Use: /buscar <termos>\nEx: /buscar poste apagado",
+            reply_markup=render.VOLTAR_MENU
+        )
+        return
+    # A consulta fica no user_data: o callback_data tem limite de 64 bytes
+    context.user_data["busca"] = consulta
+    await enviar_busca(context, update.effective_chat.id, consulta)
+
+
+@medido
+@requer_dados
+async def buscar_pagina(update, context):
+    query = update.callback_query
+    await query.answer()
+    consulta = context.user_data.get("busca")
+    if not consulta:
+        await send_menu(update, context)
+        return
+    # bsc:<offset>
+    await enviar_busca(context, query.message.chat.id, consulta, offset=int(query.data.split(":", 1)[1]))
+
+
+# ---------- Perto de mim ----------
+async def pedir_localizacao(context, chat):
+    # O botão de pedir localização só funciona em chat privado
+    await context.bot.send_message(
+        chat.id,
+        render.PEDIR_LOCALIZACAO,
+        parse_mode="Markdown",
+        reply_markup=render.ENVIAR_LOCALIZACAO if chat.type == "private" else render.VOLTAR_MENU
+    )
+
+
+@medido
+async def perto_command(update, context):
+    await pedir_localizacao(context, update.effective_chat)
+
+
+@medido
+@requer_dados
+async def perto_de_mim(update, context):
+    """Localização enviada fora do registro: os registros mais próximos."""
+    local = update.message.location
     chat_id = update.effective_chat.id
+    achados = proximos.nearest(local.latitude, local.longitude, k=PERTO_K, radius_m=PERTO_RAIO_M)
+    pagina = [(repo.get(reg_id), metros) for metros, reg_id in achados]
+    pagina = [(p, metros) for p, metros in pagina if p is not None]
+    if not pagina:
+        await update.message.reply_text(
+            f"📍 Nenhum problema registrado num raio de {render.distancia(PERTO_RAIO_M)}.",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        await send_menu(update, context)
+        return
+
+    cards = [(render.card_proximo(p, i, metros), media.foto_listagem(p)) for i, (p, metros) in enumerate(pagina, 1)]
+    await enviar_cards(context, chat_id, cards)
+    # Tira o teclado de localização antes de mostrar os botões da página
+    await update.message.reply_text(
+        f"📍 {len(pagina)} mais próximo(s) num raio de {render.distancia(PERTO_RAIO_M)}",
+        reply_markup=ReplyKeyboardRemove()
+    )
     await context.bot.send_message(
-        chat_id=chat_id,
-        text="👋 *Bem-vindo ao Kernel6 Project!*\nEscolha uma opção:",
+        chat_id,
+        "Escolha uma opção:",
+        reply_markup=teclado_pagina([p for p, _ in pagina], 0, [])
+    )
+
+
+# ---------- Estatísticas ----------
+@medido
+@requer_dados
+async def stats_command(update, context):
+    hoje = (datetime.utcnow() - timedelta(hours=3)).date()
+    await context.bot.send_message(
+        update.effective_chat.id,
+        render.painel_stats(estatisticas, hoje, STATS_DIAS),
         parse_mode="Markdown",
-        reply_markup=markup
+        reply_markup=render.VOLTAR_MENU
     )
 
 
 # ---------- START ----------
+@medido
 async def start(update, context):
     await send_menu(update, context)
 
 
 # ---------- AJUDA ----------
+@medido
 async def ajuda(update, context):
     txt = (
         "🤖 *Ajuda*\n\n"
         "/start - Menu\n"
         "/registrar - Registrar problema (também pelo botão)\n"
         "/listar - Listar registros\n"
-        "/deletar - Excluir registro (senha)"
+        "/buscar <termos> - Buscar por título, descrição ou local\n"
+        "/perto - Problemas perto da sua localização\n"
+        "/stats - Estatísticas por categoria, status e dia\n"
+        "/deletar - Excluir registro (senha)\n"
+        "/exportar - Exportar registros em CSV, JSONL ou GeoJSON (senha)"
     )
     chat_id = update.effective_chat.id
     await context.bot.send_message(chat_id, txt, parse_mode="Markdown")
@@ -163,21 +557,19 @@ async def ajuda(update, context):
 
 
 # ---------- Registrar via comando (opcional) ----------
+@medido
 async def registrar_command(update, context):
     chat_id = update.effective_chat.id
-    botoes = []
-    for cat in CATEGORIAS:
-        botoes.append([InlineKeyboardButton(cat, callback_data=f"cat:{cat}")])
-    botoes.append([InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")])
     await context.bot.send_message(
-        chat_id=chat_id, 
-        text="📝 Qual categoria do problema?", 
-        reply_markup=InlineKeyboardMarkup(botoes)
+        chat_id=chat_id,
+        text=render.PERGUNTA_CATEGORIA,
+        reply_markup=render.CATEGORIAS
     )
     return CATEGORIA
 
 
 # ---------- Menu callback (botões principais) ----------
+@medido
 async def menu_callback(update, context):
     query = update.callback_query
     await query.answer()
@@ -185,71 +577,22 @@ async def menu_callback(update, context):
     chat_id = query.message.chat.id
 
     if data == "registrar":
-        botoes = []
-        for cat in CATEGORIAS:
-            botoes.append([InlineKeyboardButton(cat, callback_data=f"cat:{cat}")])
-        botoes.append([InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")])
         await context.bot.send_message(
-            chat_id=chat_id, 
-            text="📝 Qual categoria do problema?", 
-            reply_markup=InlineKeyboardMarkup(botoes)
+            chat_id=chat_id,
+            text=render.PERGUNTA_CATEGORIA,
+            reply_markup=render.CATEGORIAS
         )
         return CATEGORIA
 
     elif data == "listar":
-        if not problemas_store:
-            keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
-            await context.bot.send_message(
-                chat_id, 
-                "📋 Nenhum problema registrado ainda.",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-        else:
-            problemas_ordenados = sorted(problemas_store, key=lambda x: x.get("created_at", ""), reverse=True)
-            for i, p in enumerate(problemas_ordenados, 1):
-                texto = (
-                    f"*{i}. {p.get('categoria','-')}*\n"
-                    f"📝 *Título:* {p.get('titulo','-')}\n"
-                    f"📄 *Descrição:* {p.get('descricao','-')}\n"
-                    f"📍 *Local:* {p.get('descricao_local','-')}\n"
-                    f"📅 *Criado:* {p.get('created_at_formatted','-')}\n"
-                    f"📊 *Status:* {format_status(p.get('status',''))}\n"
-                )
-                if p.get("photo_file_id"):
-                    try:
-                        keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
-                        await context.bot.send_photo(
-                            chat_id=chat_id, 
-                            photo=p["photo_file_id"], 
-                            caption=texto, 
-                            parse_mode="Markdown",
-                            reply_markup=InlineKeyboardMarkup(keyboard)
-                        )
-                    except Exception as e:
-                        logger.warning("Erro ao enviar foto no listar (fallback texto): %s", e)
-                        keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
-                        await context.bot.send_message(
-                            chat_id=chat_id, 
-                            text=texto, 
-                            parse_mode="Markdown",
-                            reply_markup=InlineKeyboardMarkup(keyboard)
-                        )
-                else:
-                    keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
-                    await context.bot.send_message(
-                        chat_id=chat_id, 
-                        text=texto, 
-                        parse_mode="Markdown",
-                        reply_markup=InlineKeyboardMarkup(keyboard)
-                    )
+        await enviar_listagem(context, chat_id)
         return ConversationHandler.END
 
     elif data == "delete_menu":
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
         await context.bot.send_message(
-            chat_id=chat_id, 
-            text="🔐 Digite a senha de administrador:", 
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            chat_id=chat_id,
+            text=render.PEDIR_SENHA,
+            reply_markup=render.VOLTAR_MENU
         )
         return DELETE_PASSWORD
 
@@ -267,6 +610,24 @@ async def menu_callback(update, context):
 # =========================
 # Registrar flow handlers
 # =========================
+def requer_rascunho(handler):
+    """Encerra a conversa se o rascunho expirou (TTL) em vez de quebrar no KeyError."""
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        if "problema" not in context.user_data:
+            if update.callback_query:
+                await update.callback_query.answer()
+            await context.bot.send_message(
+                update.effective_chat.id,
+                "⌛ Seu rascunho expirou. Comece o registro novamente."
+            )
+            await send_menu(update, context)
+            return ConversationHandler.END
+        return await handler(update, context)
+    return wrapper
+
+
+@medido
 async def escolher_categoria(update, context):
     query = update.callback_query
     await query.answer()
@@ -280,16 +641,17 @@ async def escolher_categoria(update, context):
     categoria = data.replace("cat:", "")
     context.user_data["problema"] = {"categoria": categoria, "status": STATUS_PENDENTE}
     
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_categoria")]]
     await context.bot.send_message(
-        chat_id, 
-        "📝 *Forneça um título para o problema:*\nEx: \"Poste de luz quebrado na Rua X\"", 
+        chat_id,
+        render.PERGUNTA_TITULO,
         parse_mode="Markdown",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=render.voltar("voltar_categoria")
     )
     return TITULO
 
 
+@medido
+@requer_rascunho
 async def receber_titulo(update, context):
     if update.callback_query:
         query = update.callback_query
@@ -297,14 +659,10 @@ async def receber_titulo(update, context):
         data = query.data
         
         if data == "voltar_categoria":
-            botoes = []
-            for cat in CATEGORIAS:
-                botoes.append([InlineKeyboardButton(cat, callback_data=f"cat:{cat}")])
-            botoes.append([InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")])
             await context.bot.send_message(
-                query.message.chat.id, 
-                "📝 Qual categoria do problema?", 
-                reply_markup=InlineKeyboardMarkup(botoes)
+                query.message.chat.id,
+                render.PERGUNTA_CATEGORIA,
+                reply_markup=render.CATEGORIAS
             )
             return CATEGORIA
     
@@ -312,32 +670,31 @@ async def receber_titulo(update, context):
     chat_id = update.effective_chat.id
     
     if len(titulo) < 3:
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_categoria")]]
         await update.message.reply_text(
             "⚠️ Título muito curto. Informe algo mais descritivo.",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_categoria")
         )
         return TITULO
     if len(titulo) > 100:
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_categoria")]]
         await update.message.reply_text(
             "⚠️ Título muito longo. Max 100 caracteres.",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_categoria")
         )
         return TITULO
     
     context.user_data["problema"]["titulo"] = titulo
     
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_titulo")]]
     await context.bot.send_message(
-        chat_id, 
-        "📝 *Agora, descreva o problema com detalhes:*", 
+        chat_id,
+        render.PERGUNTA_DESCRICAO,
         parse_mode="Markdown",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=render.voltar("voltar_titulo")
     )
     return DESCRICAO
 
 
+@medido
+@requer_rascunho
 async def receber_descricao(update, context):
     if update.callback_query:
         query = update.callback_query
@@ -345,12 +702,11 @@ async def receber_descricao(update, context):
         data = query.data
         
         if data == "voltar_titulo":
-            keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_categoria")]]
             await context.bot.send_message(
-                query.message.chat.id, 
-                "📝 *Forneça um título para o problema:*\nEx: \"Poste de luz quebrado na Rua X\"", 
+                query.message.chat.id,
+                render.PERGUNTA_TITULO,
                 parse_mode="Markdown",
-                reply_markup=InlineKeyboardMarkup(keyboard)
+                reply_markup=render.voltar("voltar_categoria")
             )
             return TITULO
     
@@ -358,29 +714,25 @@ async def receber_descricao(update, context):
     chat_id = update.effective_chat.id
     
     if len(descricao) < 10:
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_titulo")]]
         await update.message.reply_text(
             "⚠️ Descrição muito curta. Informe mais detalhes.",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_titulo")
         )
         return DESCRICAO
     
     context.user_data["problema"]["descricao"] = descricao
 
-    keyboard = [
-        [InlineKeyboardButton("📷 Adicionar foto", callback_data="add_file"),
-         InlineKeyboardButton("⏭️ Pular", callback_data="skip_file")],
-        [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_descricao")]
-    ]
     await context.bot.send_message(
-        chat_id, 
-        "📸 *Deseja enviar uma foto do problema?*", 
-        parse_mode="Markdown", 
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        chat_id,
+        render.PERGUNTA_FOTO,
+        parse_mode="Markdown",
+        reply_markup=render.FOTO_OPCOES
     )
     return PHOTO
 
 
+@medido
+@requer_rascunho
 async def photo_choice(update, context):
     query = update.callback_query
     await query.answer()
@@ -388,137 +740,146 @@ async def photo_choice(update, context):
 
     if query.data == "skip_file":
         context.user_data["problema"]["photo_file_id"] = None
+        context.user_data["problema"]["photo_thumb_file_id"] = None
         
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_foto")]]
         await context.bot.send_message(
-            chat_id, 
-            "📍 *Onde fica o problema?* Forneça endereço ou referência.", 
+            chat_id,
+            render.PERGUNTA_LOCAL,
             parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_foto")
         )
         return LOCATION
 
     elif query.data == "add_file":
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_descricao")]]
         await context.bot.send_message(
-            chat_id, 
-            "📸 *Envie a foto agora.* Por favor, envie uma foto clara do problema.", 
+            chat_id,
+            "📸 *Envie a foto agora.* Por favor, envie uma foto clara do problema.",
             parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_descricao")
         )
         return PHOTO
     
     elif query.data == "voltar_descricao":
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_titulo")]]
         await context.bot.send_message(
-            chat_id, 
-            "📝 *Agora, descreva o problema com detalhes:*", 
+            chat_id,
+            render.PERGUNTA_DESCRICAO,
             parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_titulo")
         )
         return DESCRICAO
     
     elif query.data == "voltar_foto":
-        keyboard = [
-            [InlineKeyboardButton("📷 Adicionar foto", callback_data="add_file"),
-             InlineKeyboardButton("⏭️ Pular", callback_data="skip_file")],
-            [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_descricao")]
-        ]
         await context.bot.send_message(
-            chat_id, 
-            "📸 *Deseja enviar uma foto do problema?*", 
-            parse_mode="Markdown", 
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            chat_id,
+            render.PERGUNTA_FOTO,
+            parse_mode="Markdown",
+            reply_markup=render.FOTO_OPCOES
         )
         return PHOTO
 
 
+@medido
+@requer_rascunho
 async def receber_foto(update, context):
     chat_id = update.effective_chat.id
 
     if update.message.photo:
-        file = await update.message.photo[-1].get_file()
-        context.user_data["problema"]["photo_file_id"] = file.file_id
+        # O file_id já vem no PhotoSize: sem chamada extra a getFile
+        thumb, full = media.escolher_tamanhos(update.message.photo)
+        context.user_data["problema"]["photo_file_id"] = full
+        context.user_data["problema"]["photo_thumb_file_id"] = thumb
 
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_foto")]]
         await context.bot.send_message(
-            chat_id, 
-            "✅ *Foto recebida!* Agora informe o local.", 
+            chat_id,
+            "✅ *Foto recebida!* Agora informe o local.",
             parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_foto")
         )
         
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_apos_foto")]]
         await context.bot.send_message(
-            chat_id, 
-            "📍 *Onde fica o problema?* Forneça endereço ou referência.", 
+            chat_id,
+            render.PERGUNTA_LOCAL,
             parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_apos_foto")
         )
         return LOCATION
 
-    keyboard = [
-        [InlineKeyboardButton("📷 Adicionar foto", callback_data="add_file"),
-         InlineKeyboardButton("⏭️ Pular", callback_data="skip_file")],
-        [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_descricao")]
-    ]
     await context.bot.send_message(
-        chat_id, 
-        "⚠️ *Por favor, envie uma foto* ou clique em *Pular*.", 
-        parse_mode="Markdown", 
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        chat_id,
+        "⚠️ *Por favor, envie uma foto* ou clique em *Pular*.",
+        parse_mode="Markdown",
+        reply_markup=render.FOTO_OPCOES
     )
     return PHOTO
 
 
+@medido
+@requer_rascunho
 async def receber_local(update, context):
+    problema = context.user_data["problema"]
     if update.callback_query:
         query = update.callback_query
         await query.answer()
         data = query.data
         
         if data == "voltar_apos_foto" or data == "voltar_foto":
-            keyboard = [
-                [InlineKeyboardButton("📷 Adicionar foto", callback_data="add_file"),
-                 InlineKeyboardButton("⏭️ Pular", callback_data="skip_file")],
-                [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_descricao")]
-            ]
             await context.bot.send_message(
-                query.message.chat.id, 
-                "📸 *Deseja enviar uma foto do problema?*", 
-                parse_mode="Markdown", 
-                reply_markup=InlineKeyboardMarkup(keyboard)
+                query.message.chat.id,
+                render.PERGUNTA_FOTO,
+                parse_mode="Markdown",
+                reply_markup=render.FOTO_OPCOES
             )
             return PHOTO
-    
-    chat_id = update.effective_chat.id
+
+        if data == "local_coords" and problema.get("latitude") is not None:
+            # Sem referência em texto: o card mostra as coordenadas no lugar
+            problema["descricao_local"] = None
+            await finalizar_rascunho(update, context)
+            return CONFIRMACAO
+        return LOCATION
+
+    if update.message.location:
+        # Localização do Telegram: guarda as coordenadas e ainda pede uma
+        # referência em texto (opcional)
+        problema["latitude"] = update.message.location.latitude
+        problema["longitude"] = update.message.location.longitude
+        await update.message.reply_text(
+            "✅ *Localização recebida!* Se quiser, escreva um ponto de referência.",
+            parse_mode="Markdown",
+            reply_markup=render.LOCAL_OPCOES
+        )
+        return LOCATION
+
     descricao_local = (update.message.text or "").strip()
     
     if len(descricao_local) < 5:
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_foto")]]
         await update.message.reply_text(
             "⚠️ Local muito vago. Informe ponto de referência mais específico.",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_foto")
         )
         return LOCATION
 
-    problema = context.user_data["problema"]
     problema["descricao_local"] = descricao_local
+    await finalizar_rascunho(update, context)
+    return CONFIRMACAO
+
+
+async def finalizar_rascunho(update, context):
+    """Completa o rascunho (id, autor, datas) e mostra o preview."""
+    problema = context.user_data["problema"]
     created_at = get_brasilia_time()
-    created_at_formatted = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y %H:%M")
     problema.update({
         "id": get_uuid(),
         "user_id": update.effective_user.id,
-        "chat_id": chat_id,
-        "latitude": None,
-        "longitude": None,
+        "chat_id": update.effective_chat.id,
+        # Coordenadas só existem se o usuário enviou a localização
+        "latitude": problema.get("latitude"),
+        "longitude": problema.get("longitude"),
         "created_at": created_at,
-        "created_at_formatted": created_at_formatted,
         "updated_at": created_at
     })
 
     await mostrar_preview_problema(update, context)
-    return CONFIRMACAO
 
 
 async def mostrar_preview_problema(update, context):
@@ -529,42 +890,34 @@ async def mostrar_preview_problema(update, context):
         try:
             await context.bot.send_photo(
                 chat_id=chat_id, 
-                photo=problema["photo_file_id"],
+                photo=problema.get("photo_thumb_file_id") or problema["photo_file_id"],
                 caption="📸 *Foto do problema enviada*",
                 parse_mode="Markdown"
             )
         except Exception as e:
             logger.warning("Erro ao enviar foto no preview: %s", e)
 
-    msg = "📋 *CONFIRME OS DADOS DO PROBLEMA*\n\n"
-    msg += f"📁 *Categoria:* {problema.get('categoria','-')}\n"
-    msg += f"📝 *Título:* {problema.get('titulo','-')}\n"
-    
-    descricao = problema.get('descricao','-')
-    if len(descricao) > 100:
-        descricao = descricao[:97] + "..."
-    msg += f"📄 *Descrição:* {descricao}\n"
-    
-    msg += f"📍 *Local:* {problema.get('descricao_local','-')}\n"
-    msg += f"📅 *Data:* {problema.get('created_at_formatted','-')}\n"
-    msg += f"📊 *Status:* {format_status(problema.get('status',''))}\n"
-    msg += f"📷 *Foto anexada:* {'✅ Sim' if problema.get('photo_file_id') else '❌ Não'}\n\n"
-    msg += "*Tudo correto?*"
-
-    keyboard = [
-        [InlineKeyboardButton("✅ SIM, CONFIRMAR", callback_data="confirm_save"),
-         InlineKeyboardButton("❌ NÃO, CANCELAR", callback_data="cancel_save")],
-        [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_local")]
-    ]
+    # Mesmo card da listagem: o (id, updated_at) do rascunho é o do registro
+    # salvo, então o texto montado aqui já fica em cache para a listagem
+    rascunho = Problema.from_dict(problema)
+    similares = duplicados.similares(rascunho, limiar=DEDUP_LIMIAR)
+    msg = (
+        "📋 *CONFIRME OS DADOS DO PROBLEMA*\n\n"
+        + render.card_detalhes(rascunho)
+        + f"📷 *Foto anexada:* {'✅ Sim' if problema.get('photo_file_id') else '❌ Não'}\n\n"
+        + render.aviso_duplicados(similares)
+        + "*Tudo correto?*"
+    )
 
     await context.bot.send_message(
-        chat_id=chat_id, 
-        text=msg, 
-        parse_mode="Markdown", 
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        chat_id=chat_id,
+        text=msg,
+        parse_mode="Markdown",
+        reply_markup=render.CONFIRMAR_REGISTRO
     )
 
 
+@medido
 async def confirmar_registro(update, context):
     query = update.callback_query
     await query.answer()
@@ -577,10 +930,9 @@ async def confirmar_registro(update, context):
             await send_menu(update, context)
             return ConversationHandler.END
 
-        problemas_store.append(problema)
-        ok = save_to_gist()
+        ok = await repo.add(Problema.from_dict(problema))
         if not ok:
-            await context.bot.send_message(chat_id, "❌ Erro ao salvar no Gist. Tente novamente mais tarde.")
+            await context.bot.send_message(chat_id, "❌ Erro ao salvar o registro. Tente novamente mais tarde.")
             return ConversationHandler.END
 
         await context.bot.send_message(chat_id, "✅ *Problema registrado com sucesso!*", parse_mode="Markdown")
@@ -595,12 +947,11 @@ async def confirmar_registro(update, context):
         return ConversationHandler.END
     
     elif query.data == "voltar_local":
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_foto")]]
         await context.bot.send_message(
-            chat_id, 
-            "📍 *Onde fica o problema?* Forneça endereço ou referência.", 
+            chat_id,
+            render.PERGUNTA_LOCAL,
             parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.voltar("voltar_foto")
         )
         return LOCATION
 
@@ -610,15 +961,82 @@ async def confirmar_registro(update, context):
 # =========================
 # Delete flow handlers - TOTALMENTE REFEITO
 # =========================
+def filtro_exclusao(context):
+    return context.user_data.setdefault("delete_filtro", {"categoria": None, "status": None, "dias": None})
+
+
+def montar_seletor_exclusao(context, before=None, after=None, offset=0):
+    """Uma página de candidatos à exclusão, respeitando os filtros do usuário."""
+    filtro = filtro_exclusao(context)
+    categoria = CATEGORIAS[filtro["categoria"]] if filtro["categoria"] is not None else None
+    since = None
+    if filtro["dias"]:
+        since = (datetime.utcnow() - timedelta(hours=3, days=filtro["dias"])).strftime("%Y-%m-%d %H:%M:%S")
+
+    pagina, tem_mais = repo.page(
+        before=before, after=after, limit=DELETE_PAGE_SIZE,
+        categoria=categoria, status=filtro["status"], since=since
+    )
+    tem_anterior, tem_proxima, offset = estado_navegacao(before, after, tem_mais, offset)
+
+    botoes = [[render.botao_exclusao(p, idx)] for idx, p in enumerate(pagina, offset + 1)]
+
+    navegacao = []
+    if tem_anterior and pagina:
+        cursor = encode_cursor(cursor_of(pagina[0]))
+        navegacao.append(InlineKeyboardButton("⬅️", callback_data=f"dpg:a:{offset - DELETE_PAGE_SIZE}:{cursor}"))
+    if tem_proxima and pagina:
+        cursor = encode_cursor(cursor_of(pagina[-1]))
+        navegacao.append(InlineKeyboardButton("➡️", callback_data=f"dpg:b:{offset + len(pagina)}:{cursor}"))
+    if navegacao:
+        botoes.append(navegacao)
+
+    botoes.append(render.LINHA_FILTROS)
+    descricao_filtro = []
+    if categoria:
+        descricao_filtro.append(categoria)
+    if filtro["status"]:
+        descricao_filtro.append(format_status(filtro["status"]))
+    if filtro["dias"]:
+        descricao_filtro.append(f"últimos {filtro['dias']} dias")
+    if descricao_filtro:
+        botoes.append(render.LINHA_LIMPAR_FILTROS)
+    botoes.append(render.LINHA_CANCELAR_EXCLUSAO)
+
+    texto = "🗑 *Selecione o registro para excluir:*\n\n📋 *Legenda:* Título - Local"
+    if descricao_filtro:
+        texto += f"\n🔎 *Filtros:* {' · '.join(descricao_filtro)}"
+    if not pagina:
+        texto += "\n\n📭 Nenhum registro com esses filtros."
+    return texto, InlineKeyboardMarkup(botoes)
+
+
+OPCOES_FILTRO = render.opcoes_filtro(PERIODOS_EXCLUSAO)
+
+
+def montar_opcoes_filtro(tipo):
+    return OPCOES_FILTRO.get(tipo, OPCOES_FILTRO["dfd"])
+
+
+async def editar_seletor(query, texto, markup):
+    try:
+        await query.edit_message_text(texto, parse_mode="Markdown", reply_markup=markup)
+    except BadRequest as e:
+        # "Message is not modified" ao repetir o mesmo filtro/página
+        logger.debug("Seletor não atualizado: %s", e)
+
+
+@medido
 async def deletar_command(update, context):
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
     await update.message.reply_text(
-        "🔐 Digite a senha de administrador:",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        render.PEDIR_SENHA,
+        reply_markup=render.VOLTAR_MENU
     )
     return DELETE_PASSWORD
 
 
+@medido
+@requer_dados
 async def deletar_password(update, context):
     if update.callback_query:
         query = update.callback_query
@@ -630,40 +1048,27 @@ async def deletar_password(update, context):
     
     senha = (update.message.text or "").strip()
     if senha != ADMIN_PASSWORD:
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
         await update.message.reply_text(
             "❌ Senha incorreta.",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.VOLTAR_MENU
         )
         return ConversationHandler.END
 
-    if not problemas_store:
-        keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
+    if not len(repo):
         await update.message.reply_text(
             "📭 Nenhum registro para excluir.",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.VOLTAR_MENU
         )
         return ConversationHandler.END
 
-    botoes = []
-    for idx, p in enumerate(problemas_store, 1):
-        titulo = p.get("titulo", "Sem título")
-        local = p.get("descricao_local", "Sem local")
-        texto_titulo = titulo[:15] + "..." if len(titulo) > 15 else titulo
-        texto_local = local[:10] + "..." if len(local) > 10 else local
-        texto_botao = f"{idx}. {texto_titulo} - {texto_local}"
-        botoes.append([InlineKeyboardButton(texto_botao, callback_data=f"del:{p['id']}")])
-    
-    botoes.append([InlineKeyboardButton("⬅️ Cancelar", callback_data="cancel_delete")])
-
-    await update.message.reply_text(
-        "🗑 *Selecione o registro para excluir:*\n\n📋 *Legenda:* Título - Local",
-        parse_mode="Markdown",
-        reply_markup=InlineKeyboardMarkup(botoes)
-    )
+    context.user_data.pop("delete_filtro", None)
+    texto, markup = montar_seletor_exclusao(context)
+    await update.message.reply_text(texto, parse_mode="Markdown", reply_markup=markup)
     return DELETE_CHOOSE
 
 
+@medido
+@requer_dados
 async def deletar_escolha(update, context):
     query = update.callback_query
     await query.answer()
@@ -672,10 +1077,42 @@ async def deletar_escolha(update, context):
         await query.message.reply_text("❌ Exclusão cancelada.")
         await send_menu(update, context)
         return ConversationHandler.END
+
+    if query.data.startswith("dpg:"):
+        # dpg:<b|a>:<offset>:<cursor>
+        _, direcao, offset, cursor = query.data.split(":", 3)
+        try:
+            cursor = decode_cursor(cursor)
+        except ValueError:
+            return DELETE_CHOOSE
+        if direcao == "a":
+            texto, markup = montar_seletor_exclusao(context, after=cursor, offset=int(offset))
+        else:
+            texto, markup = montar_seletor_exclusao(context, before=cursor, offset=int(offset))
+        await editar_seletor(query, texto, markup)
+        return DELETE_CHOOSE
+
+    if query.data.startswith("df"):
+        tipo, _, valor = query.data.partition(":")
+        if tipo != "dfx" and not valor:
+            await editar_seletor(query, *montar_opcoes_filtro(tipo))
+            return DELETE_CHOOSE
+        filtro = filtro_exclusao(context)
+        valor = None if valor == "x" else valor
+        if tipo == "dfx":
+            filtro.update(categoria=None, status=None, dias=None)
+        elif tipo == "dfc":
+            filtro["categoria"] = int(valor) if valor is not None else None
+        elif tipo == "dfs":
+            filtro["status"] = valor
+        elif tipo == "dfd":
+            filtro["dias"] = int(valor) if valor is not None else None
+        await editar_seletor(query, *montar_seletor_exclusao(context))
+        return DELETE_CHOOSE
     
     if query.data.startswith("del:"):
         reg_id = query.data.split(":")[1]
-        registro = next((p for p in problemas_store if p["id"] == reg_id), None)
+        registro = repo.get(reg_id)
         
         if not registro:
             await query.message.reply_text("❌ Registro não encontrado.")
@@ -685,55 +1122,30 @@ async def deletar_escolha(update, context):
         context.user_data["delete_id"] = reg_id
         
         detalhes = (
-            f"🗑 *CONFIRMAR EXCLUSÃO*\n\n"
-            f"📁 *Categoria:* {registro.get('categoria', '-')}\n"
-            f"📝 *Título:* {registro.get('titulo', '-')}\n"
-            f"📄 *Descrição:* {registro.get('descricao', '-')[:50]}...\n"
-            f"📍 *Local:* {registro.get('descricao_local', '-')}\n"
-            f"📅 *Data:* {registro.get('created_at_formatted', '-')}\n"
-            f"📊 *Status:* {format_status(registro.get('status', ''))}\n\n"
-            f"⚠️ *Esta ação não pode ser desfeita!*"
-        )
-
-        keyboard = [
-            [InlineKeyboardButton("✅ SIM, EXCLUIR", callback_data="confirm_delete"),
-             InlineKeyboardButton("❌ NÃO, CANCELAR", callback_data="cancel_delete_confirm")]
-        ]
-        
+            "🗑 *CONFIRMAR EXCLUSÃO*\n\n"
+            + render.card_detalhes(registro, "confirmacao_exclusao")
+            + "\n⚠️ *Esta ação não pode ser desfeita!*"
+        )
+
         await query.message.reply_text(
             detalhes,
             parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=render.CONFIRMAR_EXCLUSAO
         )
         return DELETE_CONFIRM
     
     return DELETE_CHOOSE
 
 
+@medido
+@requer_dados
 async def deletar_confirmar(update, context):
-    global problemas_store  # declare aqui, antes de qualquer uso na função
-
     query = update.callback_query
     await query.answer()
     
     if query.data == "cancel_delete_confirm":
-        botoes = []
-        for idx, p in enumerate(problemas_store, 1):
-            titulo = p.get("titulo", "Sem título")
-            local = p.get("descricao_local", "Sem local")
-            
-            texto_titulo = titulo[:15] + "..." if len(titulo) > 15 else titulo
-            texto_local = local[:10] + "..." if len(local) > 10 else local
-            texto_botao = f"{idx}. {texto_titulo} - {texto_local}"
-            botoes.append([InlineKeyboardButton(texto_botao, callback_data=f"del:{p['id']}")])
-        
-        botoes.append([InlineKeyboardButton("⬅️ Cancelar", callback_data="cancel_delete")])
-        
-        await query.message.reply_text(
-            "🗑 *Selecione o registro para excluir:*\n\n📋 *Legenda:* Título - Local",
-            parse_mode="Markdown",
-            reply_markup=InlineKeyboardMarkup(botoes)
-        )
+        texto, markup = montar_seletor_exclusao(context)
+        await query.message.reply_text(texto, parse_mode="Markdown", reply_markup=markup)
         return DELETE_CHOOSE
     
     elif query.data == "confirm_delete":
@@ -744,28 +1156,24 @@ async def deletar_confirmar(update, context):
             await send_menu(update, context)
             return ConversationHandler.END
         
-        registro_removido = None
-        novos_problemas = []
-        
-        for p in problemas_store:
-            if p["id"] == reg_id:
-                registro_removido = p
-            else:
-                novos_problemas.append(p)
+        try:
+            registro_removido = await repo.delete(reg_id)
+        except Exception as e:
+            logger.error("Erro ao excluir registro %s: %s", reg_id, e)
+            await query.message.reply_text("❌ Erro ao excluir o registro. Tente novamente mais tarde.")
+            await send_menu(update, context)
+            return ConversationHandler.END
         
         if not registro_removido:
             await query.message.reply_text("❌ Registro não encontrado.")
             await send_menu(update, context)
             return ConversationHandler.END
         
-        problemas_store = novos_problemas
-        save_to_gist()
-        
         mensagem = (
             f"✅ *Registro excluído com sucesso!*\n\n"
-            f"📝 *Título:* {registro_removido.get('titulo', '-')}\n"
-            f"📍 *Local:* {registro_removido.get('descricao_local', '-')}\n"
-            f"📅 *Data:* {registro_removido.get('created_at_formatted', '-')}"
+            f"📝 *Título:* {registro_removido.titulo or '-'}\n"
+            f"📍 *Local:* {registro_removido.descricao_local or '-'}\n"
+            f"📅 *Data:* {registro_removido.created_at_formatted}"
         )
         
         await query.message.reply_text(mensagem, parse_mode="Markdown")
@@ -778,6 +1186,7 @@ async def deletar_confirmar(update, context):
 # =========================
 # Extra handlers
 # =========================
+@medido
 async def auto_menu(update, context):
     if update.message and update.message.text and update.message.text.startswith("/"):
         return
@@ -790,6 +1199,8 @@ async def error_handler(update, context):
 
 # ---------- Conversation handler config ----------
 registrar_handler = ConversationHandler(
+    name="registrar",
+    persistent=True,
     entry_points=[
         CallbackQueryHandler(menu_callback, pattern="^registrar$"),
         CommandHandler("registrar", registrar_command)
@@ -813,7 +1224,8 @@ registrar_handler = ConversationHandler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, receber_foto)
         ],
         LOCATION: [
-            CallbackQueryHandler(receber_local, pattern="^(voltar_apos_foto|voltar_foto)$"),
+            CallbackQueryHandler(receber_local, pattern="^(voltar_apos_foto|voltar_foto|local_coords)$"),
+            MessageHandler(filters.LOCATION, receber_local),
             MessageHandler(filters.TEXT & ~filters.COMMAND, receber_local)
         ],
         CONFIRMACAO: [CallbackQueryHandler(confirmar_registro, pattern="^(confirm_save|cancel_save|voltar_local)$")]
@@ -824,20 +1236,22 @@ registrar_handler = ConversationHandler(
     per_user=True
 )
 
+@medido
 async def start_delete_from_menu(update, context):
     query = update.callback_query
     await query.answer()
     chat_id = query.message.chat.id
     
-    keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
     await context.bot.send_message(
-        chat_id=chat_id, 
-        text="🔐 Digite a senha de administrador:",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        chat_id=chat_id,
+        text=render.PEDIR_SENHA,
+        reply_markup=render.VOLTAR_MENU
     )
     return DELETE_PASSWORD
 
 deletar_handler = ConversationHandler(
+    name="deletar",
+    persistent=True,
     entry_points=[
         CommandHandler("deletar", deletar_command),
         CallbackQueryHandler(start_delete_from_menu, pattern="^delete_menu$")
@@ -848,7 +1262,7 @@ deletar_handler = ConversationHandler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, deletar_password)
         ],
         DELETE_CHOOSE: [
-            CallbackQueryHandler(deletar_escolha, pattern="^(del:.+|cancel_delete)$")
+            CallbackQueryHandler(deletar_escolha, pattern="^(del:.+|cancel_delete|dpg:.+|df[csdx](:.+)?)$")
         ],
         DELETE_CONFIRM: [
             CallbackQueryHandler(deletar_confirmar, pattern="^(confirm_delete|cancel_delete_confirm)$")
@@ -860,81 +1274,228 @@ deletar_handler = ConversationHandler(
     per_user=True
 )
 
+# =========================
+# Exportação (admin)
+# =========================
+@medido
+async def exportar_command(update, context):
+    args = list(context.args or [])
+    try:
+        export.parse_opcoes(args)
+    except ValueError as e:
+        await update.message.reply_text(f"⚠️ {e}\n\n{render.USO_EXPORTAR}", reply_markup=render.VOLTAR_MENU)
+        return ConversationHandler.END
+    # Os args (e não as opções já convertidas) vão para o user_data, que é JSON
+    context.user_data["exportar"] = args
+    await update.message.reply_text(render.PEDIR_SENHA, reply_markup=render.VOLTAR_MENU)
+    return EXPORT_PASSWORD
+
+
+@medido
+async def exportar_password(update, context):
+    senha = (update.message.text or "").strip()
+    args = context.user_data.pop("exportar", [])
+    if senha != ADMIN_PASSWORD:
+        await update.message.reply_text("❌ Senha incorreta.", reply_markup=render.VOLTAR_MENU)
+        return ConversationHandler.END
+    # Como requer_dados, mas só depois da senha: sem ela não se espera a carga
+    if not await aguardar_dados(update, context):
+        # Continua no mesmo passo, com as opções, para a senha ser enviada de novo
+        context.user_data["exportar"] = args
+        return None
+
+    opcoes = export.parse_opcoes(args)
+    chat_id = update.effective_chat.id
+    await context.bot.send_message(chat_id, "⏳ Gerando exportação...")
+    exportacao = export.Exportacao(opcoes["formato"], opcoes["gzip"])
+    try:
+        # Página a página: a leitura fica no loop (o store não é thread-safe)
+        # e a gravação no arquivo numa thread
+        for pagina in export.paginas(
+            repo, EXPORT_CHUNK, categoria=opcoes["categoria"], status=opcoes["status"],
+            since=opcoes["since"], until=opcoes["until"]
+        ):
+            await asyncio.to_thread(exportacao.escrever, pagina)
+        tamanho = await asyncio.to_thread(exportacao.fechar)
+
+        if not exportacao.total:
+            await update.message.reply_text("📭 Nenhum registro com esses filtros.", reply_markup=render.VOLTAR_MENU)
+        elif tamanho > export.MAX_DOCUMENTO:
+            await update.message.reply_text(
+                f"⚠️ Arquivo de {tamanho / 1024 / 1024:.0f} MB passa do limite de 50 MB do Telegram. "
+                "Use gz ou filtros para reduzir.",
+                reply_markup=render.VOLTAR_MENU
+            )
+        else:
+            with open(exportacao.path, "rb") as arquivo:
+                await context.bot.send_document(
+                    chat_id,
+                    document=arquivo,
+                    filename=exportacao.nome,
+                    caption=f"📦 {exportacao.total} registro(s) · {opcoes['formato'].upper()}",
+                    write_timeout=120
+                )
+    finally:
+        await asyncio.to_thread(exportacao.descartar)
+    return ConversationHandler.END
+
+
+exportar_handler = ConversationHandler(
+    name="exportar",
+    persistent=True,
+    entry_points=[CommandHandler("exportar", exportar_command)],
+    states={
+        EXPORT_PASSWORD: [
+            CallbackQueryHandler(menu_callback, pattern="^voltar_menu$"),
+            MessageHandler(filters.TEXT & ~filters.COMMAND, exportar_password)
+        ]
+    },
+    fallbacks=[],
+    per_message=False,
+    per_chat=True,
+    per_user=True
+)
+
 # Handler para outros callbacks do menu
+@medido
 async def handle_menu_actions(update, context):
     query = update.callback_query
     await query.answer()
     data = query.data
     
     if data == "listar":
-        if not problemas_store:
-            keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
-            await context.bot.send_message(
-                query.message.chat.id,
-                "📋 Nenhum problema registrado ainda.",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-        else:
-            problemas_ordenados = sorted(problemas_store, key=lambda x: x.get("created_at", ""), reverse=True)
-            for i, p in enumerate(problemas_ordenados, 1):
-                texto = (
-                    f"*{i}. {p.get('categoria','-')}*\n"
-                    f"📝 *Título:* {p.get('titulo','-')}\n"
-                    f"📄 *Descrição:* {p.get('descricao','-')}\n"
-                    f"📍 *Local:* {p.get('descricao_local','-')}\n"
-                    f"📅 *Criado:* {p.get('created_at_formatted','-')}\n"
-                    f"📊 *Status:* {format_status(p.get('status',''))}\n"
-                )
-                if p.get("photo_file_id"):
-                    try:
-                        keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
-                        await context.bot.send_photo(
-                            chat_id=query.message.chat.id, 
-                            photo=p["photo_file_id"], 
-                            caption=texto, 
-                            parse_mode="Markdown",
-                            reply_markup=InlineKeyboardMarkup(keyboard)
-                        )
-                    except Exception as e:
-                        logger.warning("Erro ao enviar foto no listar (fallback texto): %s", e)
-                        keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
-                        await query.message.reply_text(
-                            texto, 
-                            parse_mode="Markdown",
-                            reply_markup=InlineKeyboardMarkup(keyboard)
-                        )
-                else:
-                    keyboard = [[InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")]]
-                    await query.message.reply_text(
-                        texto, 
-                        parse_mode="Markdown",
-                        reply_markup=InlineKeyboardMarkup(keyboard)
-                    )
+        if await aguardar_dados(update, context):
+            await enviar_listagem(context, query.message.chat.id)
     
     elif data == "ajuda":
         await ajuda(update, context)
+
+    elif data == "perto":
+        await pedir_localizacao(context, query.message.chat)
     
     elif data == "voltar_menu":
         await send_menu(update, context)
 
 
 # ---------- App init ----------
-def main():
-    load_from_gist()
+async def limpar_rascunhos(app):
+    # Libera da memória rascunhos parados há mais que o TTL
+    while True:
+        await asyncio.sleep(600)
+        for user_id in draft_persistence.stale_users():
+            app.drop_user_data(user_id)
+
+
+def registrar_metricas(app, limiter, ingestor=None):
+    """Gauges lidos no scrape e os dicts de métricas que as classes já mantêm."""
+    metrics.gauge_fn("bot_registros", "Registros no store", lambda: len(repo))
+    metrics.gauge_fn("bot_registros_prontos", "1 depois da hidratação", repo.ready.is_set)
+    metrics.gauge_fn(
+        "bot_chats_ativos", "Chats com updates em processamento ou aguardando",
+        lambda: app.update_processor.active_chats
+    )
+    metrics.expose_dict(
+        "bot_telegram_envios", limiter.metrics, "Fila de envios ao Telegram (OutboundRateLimiter)",
+        counters=("sent", "delayed", "throttled", "failed")
+    )
+    if repo.replica is not None:
+        writer = repo.replica.writer
+        metrics.gauge_fn("bot_gist_mutacoes_pendentes", "Mutações aguardando o próximo lote", lambda: writer.pending)
+        metrics.gauge_fn(
+            "bot_gist_gravacao_parada", "1 se o Gist recusou uma gravação (4xx definitivo) até o restart",
+            lambda: int(writer.stopped is not None)
+        )
+        metrics.gauge_fn(
+            "bot_gist_replica_suspensa", "1 se a réplica no Gist foi suspensa (falha na carga) até o restart",
+            lambda: int(repo.replica.suspended)
+        )
+        metrics.gauge_fn(
+            "bot_gist_mutacoes_atrasadas", "Mutações já salvas no backend local e ainda sem cópia no Gist",
+            lambda: repo.replica.atrasadas
+        )
+        metrics.expose_dict(
+            "bot_gist_writer", writer.metrics, "Lotes de gravação no Gist (WriteBehind)",
+            counters=("mutations", "flushes", "failed_flushes", "total_flush_latency"),
+            nomes={
+                "total_flush_latency": "flush_latency_seconds",
+                "last_flush_latency": "last_flush_latency_seconds",
+                "retry_delay": "retry_delay_seconds",
+            }
+        )
+    if ingestor is not None:
+        metrics.gauge_fn("bot_webhook_fila", "Updates na fila do webhook", lambda: ingestor.depth)
+        metrics.expose_dict(
+            "bot_webhook", ingestor.metrics, "Fila de updates do webhook (UpdateIngestor)",
+            counters=("received", "accepted", "duplicates", "rejected", "processed", "failed", "wait_total"),
+            nomes={"wait_total": "wait_seconds"}
+        )
+
+
+async def post_init(app):
+    # Carga em background: o bot já aceita updates enquanto os registros chegam
+    app.bot_data["hidratacao"] = asyncio.create_task(repo.hydrate())
+    app.bot_data["limpeza_rascunhos"] = asyncio.create_task(limpar_rascunhos(app))
+    if METRICS_PORT and not os.environ.get('RENDER'):
+        app.bot_data["servidor_metricas"] = serve_metrics(METRICS_PORT, token=METRICS_TOKEN)
+    logger.info("Bot aceitando updates após %.0f ms", (time.perf_counter() - INICIO) * 1000)
 
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+
+async def post_shutdown(app):
+    tarefa = app.bot_data.pop("limpeza_rascunhos", None)
+    if tarefa:
+        tarefa.cancel()
+    servidor = app.bot_data.pop("servidor_metricas", None)
+    if servidor:
+        servidor.stop()
+    hidratacao = app.bot_data.pop("hidratacao", None)
+    if hidratacao:
+        await hidratacao
+    await repo.close()
+
+
+def main():
+    logger.info("Imports e configuração em %.0f ms", (time.perf_counter() - INICIO) * 1000)
+    limiter = OutboundRateLimiter(
+        global_rate=TG_GLOBAL_RATE,
+        global_burst=int(TG_GLOBAL_RATE),
+        chat_rate=TG_CHAT_RATE,
+        chat_burst=TG_CHAT_BURST
+    )
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(PerChatUpdateProcessor(CONCURRENT_UPDATES))
+        .persistence(draft_persistence)
+        .rate_limiter(limiter)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    logger.info("Application montado em %.0f ms", (time.perf_counter() - INICIO) * 1000)
 
     # Handlers básicos
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("ajuda", ajuda))
+    app.add_handler(CommandHandler("listar", listar_command))
+    app.add_handler(CommandHandler("buscar", buscar_command))
+    app.add_handler(CommandHandler("perto", perto_command))
+    app.add_handler(CommandHandler("stats", stats_command))
     
     # Handlers de conversação
     app.add_handler(registrar_handler)
     app.add_handler(deletar_handler)
+    app.add_handler(exportar_handler)
     
     # Handler para listar, ajuda e voltar
-    app.add_handler(CallbackQueryHandler(handle_menu_actions, pattern="^(listar|ajuda|voltar_menu)$"))
+    app.add_handler(CallbackQueryHandler(handle_menu_actions, pattern="^(listar|ajuda|perto|voltar_menu)$"))
+    app.add_handler(CallbackQueryHandler(listar_pagina, pattern="^lst:"))
+    app.add_handler(CallbackQueryHandler(ver_foto, pattern="^foto:"))
+    app.add_handler(CallbackQueryHandler(buscar_pagina, pattern="^bsc:\\d+$"))
     
+    # Localização fora do registro: problemas perto de mim (no passo de
+    # local do registro a conversa trata antes)
+    app.add_handler(MessageHandler(filters.LOCATION, perto_de_mim))
+
     # Handler para menu automático
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, auto_menu))
     
@@ -949,14 +1510,21 @@ def main():
         logger.info(f"Starting webhook on port {port}")
         logger.info(f"Webhook URL: {webhook_url}")
         
-        app.run_webhook(
+        ingestor = UpdateIngestor(app, maxsize=WEBHOOK_QUEUE_SIZE, workers=WEBHOOK_WORKERS)
+        registrar_metricas(app, limiter, ingestor)
+        asyncio.run(run_webhook(
+            app,
+            ingestor,
             listen="0.0.0.0",
             port=port,
             url_path=BOT_TOKEN,
-            webhook_url=webhook_url
-        )
+            webhook_url=webhook_url,
+            secret_token=WEBHOOK_SECRET,
+            metrics_token=METRICS_TOKEN
+        ))
     else:
         logger.info("Starting with polling (local environment)...")
+        registrar_metricas(app, limiter)
         app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
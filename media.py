@@ -0,0 +1,79 @@
+# media.py
+"""Fotos dos registros: escolha de tamanhos e cache de file_ids inválidos.
+
+O Telegram manda cada foto em vários tamanhos (``PhotoSize``, do menor para o
+maior). O registro guarda o maior em ``photo_file_id`` (aberto sob demanda) e
+um intermediário em ``photo_thumb_file_id``, usado nas listagens. Um file_id
+recusado pela API (apagado, de outro bot) entra em ``INVALIDOS`` e deixa de ser
+enviado até o restart, em vez de falhar em toda listagem.
+"""
+import collections
+
+from telegram.error import BadRequest
+
+import metrics
+
+# Menor lado aceitável para a miniatura; abaixo disso fica ilegível no álbum
+THUMB_MIN_LADO = 320
+
+MEDIA_INVALIDA = metrics.counter(
+    "bot_media_invalida_total", "file_ids recusados pela API e colocados no cache de inválidos"
+)
+
+
+def escolher_tamanhos(fotos):
+    """``(thumb, full)``: file_ids da miniatura e do maior tamanho de ``message.photo``."""
+    if not fotos:
+        return None, None
+    full = fotos[-1]
+    thumb = next((f for f in fotos if max(f.width, f.height) >= THUMB_MIN_LADO), full)
+    # Mesmo arquivo para os dois: não guarda a miniatura repetida
+    return (thumb.file_id if thumb is not full else None), full.file_id
+
+
+class InvalidFileIds:
+    """Conjunto limitado (LRU) de file_ids que a API já recusou."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._ids = collections.OrderedDict()
+
+    def add(self, file_id):
+        if file_id in self._ids:
+            return
+        self._ids[file_id] = None
+        MEDIA_INVALIDA.inc()
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+
+    def __contains__(self, file_id):
+        return file_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+
+INVALIDOS = InvalidFileIds()
+
+
+def foto_listagem(p):
+    """File_id a usar na listagem (miniatura, senão o original), ou None."""
+    foto = p.photo_thumb_file_id or p.photo_file_id
+    if foto is None or foto in INVALIDOS:
+        return None
+    return foto
+
+
+def foto_completa(p):
+    foto = p.photo_file_id
+    if foto is None or foto in INVALIDOS:
+        return None
+    return foto
+
+
+def erro_de_arquivo(exc):
+    """True se a API recusou o arquivo (e não, por ex., o Markdown da legenda)."""
+    if not isinstance(exc, BadRequest):
+        return False
+    mensagem = str(exc).lower()
+    return "file" in mensagem or "photo" in mensagem
@@ -0,0 +1,306 @@
+# metrics.py
+"""Métricas no formato de texto do Prometheus, sem dependências externas.
+
+Contadores e histogramas são atualizados no caminho quente só com somas de
+atributos (e um ``bisect`` no histograma); o texto é montado apenas quando
+``/metrics`` é lido. Gauges podem receber uma função, lida no scrape, para
+valores que já existem em outro lugar (tamanho do store, profundidade de fila).
+"""
+import bisect
+import functools
+import math
+import time
+
+# Segundos: de 1 ms (memória) a 10 s (Gist lento / retries do Telegram)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt(valor):
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    if isinstance(valor, int):
+        return str(valor)
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor))
+
+
+def _escape(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(nomes, valores, extra=""):
+    pares = [f'{n}="{_escape(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        # valores dos labels -> série
+        self._children = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def __getattr__(self, nome):
+        # Só chamado quando o atributo não existe: com labels não há _default,
+        # e inc()/set()/observe() direto na métrica precisam de labels(...)
+        if nome == "_default":
+            raise ValueError(f"{self.name}: métrica com labels {self.labelnames}; use labels(...)")
+        raise AttributeError(nome)
+
+    def labels(self, *valores):
+        """Série para os valores de label; guarde o retorno no caminho quente."""
+        child = self._children.get(valores)
+        if child is None:
+            if len(valores) != len(self.labelnames):
+                raise ValueError(f"{self.name}: esperados labels {self.labelnames}")
+            child = self._children[valores] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        """Linhas ``nome{labels} valor`` de todas as séries."""
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def dec(self, n=1):
+        self.value -= n
+
+    def set(self, valor):
+        self.value = valor
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, n=1):
+        self._default.value += n
+
+    def samples(self):
+        for valores, child in self._children.items():
+            yield f"{self.name}{_labels(self.labelnames, valores)} {_fmt(child.value)}"
+
+
+class Gauge(_Metric):
+    """Gauge com valor próprio ou, com ``fn``, lido da função no scrape."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), fn=None):
+        self.fn = fn
+        super().__init__(name, help, labels)
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, valor):
+        self._default.value = valor
+
+    def inc(self, n=1):
+        self._default.value += n
+
+    def dec(self, n=1):
+        self._default.value -= n
+
+    def samples(self):
+        if self.fn is not None:
+            yield f"{self.name} {_fmt(self.fn())}"
+            return
+        for valores, child in self._children.items():
+            yield f"{self.name}{_labels(self.labelnames, valores)} {_fmt(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # um contador por bucket + o +Inf; acumulados só na exposição
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, valor):
+        self.counts[bisect.bisect_left(self.buckets, valor)] += 1
+        self.sum += valor
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, valor):
+        self._default.observe(valor)
+
+    def time(self):
+        return self._default.time()
+
+    def samples(self):
+        for valores, child in self._children.items():
+            acumulado = 0
+            for le, n in zip(self.buckets + (math.inf,), child.counts):
+                acumulado += n
+                limite = 'le="%s"' % _fmt(le)
+                yield f"{self.name}_bucket{_labels(self.labelnames, valores, limite)} {acumulado}"
+            sufixo = _labels(self.labelnames, valores)
+            yield f"{self.name}_sum{sufixo} {_fmt(child.sum)}"
+            yield f"{self.name}_count{sufixo} {acumulado}"
+
+
+class DictCollector:
+    """Expõe um dict de métricas já mantido por outra classe (ex.: ``WriteBehind.metrics``).
+
+    Cada chave vira ``<prefix>_<nome>``, com ``nome`` tirado de ``nomes``
+    (para dar a unidade, ex.: ``{"wait_total": "wait_seconds"}``) ou a própria
+    chave. As de ``counters`` são do tipo counter e terminam em um único
+    ``_total``; as demais são gauges.
+    """
+
+    def __init__(self, prefix, metrics, help, counters=(), nomes=None):
+        self.prefix = prefix
+        self.metrics = metrics
+        self.help = help
+        self.counters = set(counters)
+        self.nomes = nomes or {}
+
+    def families(self):
+        for chave, valor in self.metrics.items():
+            nome = f"{self.prefix}_{self.nomes.get(chave, chave)}"
+            if chave in self.counters:
+                if not nome.endswith("_total"):
+                    nome += "_total"
+                yield nome, "counter", valor
+            else:
+                yield nome, "gauge", valor
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica já registrada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_dict(self, collector):
+        """Registra (ou substitui, pelo prefixo) um ``DictCollector``."""
+        self._collectors[collector.prefix] = collector
+        return collector
+
+    def unregister(self, name):
+        self._metrics.pop(name, None)
+        self._collectors.pop(name, None)
+
+    def render(self):
+        linhas = []
+        for metric in self._metrics.values():
+            linhas.append(f"# HELP {metric.name} {metric.help}")
+            linhas.append(f"# TYPE {metric.name} {metric.kind}")
+            linhas.extend(metric.samples())
+        for collector in self._collectors.values():
+            for nome, tipo, valor in collector.families():
+                linhas.append(f"# HELP {nome} {collector.help}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                linhas.append(f"{nome} {_fmt(valor)}")
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name, help, labels=()):
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def gauge(name, help, labels=(), fn=None):
+    return REGISTRY.register(Gauge(name, help, labels, fn))
+
+
+def gauge_fn(name, help, fn):
+    """Gauge lido de ``fn()`` no scrape; substitui um anterior com o mesmo nome."""
+    REGISTRY.unregister(name)
+    return REGISTRY.register(Gauge(name, help, fn=fn))
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+def expose_dict(prefix, metrics, help, counters=(), nomes=None):
+    return REGISTRY.register_dict(DictCollector(prefix, metrics, help, counters, nomes))
+
+
+def render():
+    return REGISTRY.render()
+
+
+def timed(seconds, errors=None):
+    """Decorator de coroutines: observa a duração em ``seconds`` com label = nome da função.
+
+    Com ``errors``, exceções também incrementam ``errors`` (mesmo label).
+    """
+    def decorator(fn):
+        child = seconds.labels(fn.__name__)
+        falhas = errors.labels(fn.__name__) if errors is not None else None
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                if falhas is not None:
+                    falhas.value += 1
+                raise
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
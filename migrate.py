@@ -0,0 +1,69 @@
+# migrate.py
+"""Importa registros existentes (registros.json) para o banco SQLite.
+
+    python migrate.py registros.json            # arquivo local exportado do gist
+    python migrate.py --from-gist               # baixa usando GIST_TOKEN/GIST_ID
+    python migrate.py registros.json --db data/problemas.db
+
+Registros com o mesmo id são sobrescritos, então rodar de novo é seguro.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+from models import Problema
+from repository import SqliteRepository
+from storage import GistStore, ShardedGistReplica
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def load_file(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def load_gist():
+    store = GistStore(os.getenv("GIST_TOKEN"), os.getenv("GIST_ID"), os.getenv("GIST_FILENAME", "registros.json"))
+    if not store.enabled:
+        raise SystemExit("GIST_TOKEN ou GIST_ID não definidos")
+    try:
+        # Lê os dois formatos: shards (com manifest) ou o arquivo único
+        return await ShardedGistReplica(store).load() or []
+    finally:
+        await store.close()
+
+
+def main(argv=None):
+    default_db = os.getenv("SQLITE_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "problemas.db"))
+    parser = argparse.ArgumentParser(description="Importa registros.json para o SQLite")
+    parser.add_argument("arquivo", nargs="?", help="caminho do registros.json")
+    parser.add_argument("--from-gist", action="store_true", help="baixa o registros.json do gist")
+    parser.add_argument("--db", default=default_db, help=f"banco de destino (padrão: {default_db})")
+    args = parser.parse_args(argv)
+
+    if args.from_gist:
+        registros = asyncio.run(load_gist())
+    elif args.arquivo:
+        registros = load_file(args.arquivo)
+    else:
+        parser.error("informe o arquivo ou --from-gist")
+
+    validos = [r for r in registros if isinstance(r, dict) and r.get("id")]
+    if len(validos) != len(registros):
+        logger.warning("%d registros sem id ignorados", len(registros) - len(validos))
+
+    repo = SqliteRepository(args.db)
+    antes = len(repo)
+    repo.insert_many(Problema.from_dict(r) for r in validos)
+    logger.info("%d registros importados para %s (%d -> %d)", len(validos), args.db, antes, len(repo))
+    asyncio.run(repo.close())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
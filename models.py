@@ -0,0 +1,173 @@
+# models.py
+"""Registro de problema em memória: classe com ``__slots__`` e enums.
+
+Categoria e status viram membros de enum (um ponteiro por registro em vez de
+uma string por registro); textos de exibição são derivados na hora. O
+formato serializado continua o dict de sempre (``to_dict``/``from_dict``),
+inclusive ``created_at_formatted`` e campos desconhecidos, preservados em
+``extra``.
+"""
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+
+
+class Categoria(Enum):
+    ILUMINACAO = "Iluminação pública"
+    LIMPEZA = "Limpeza urbana"
+    BURACO = "Buraco na rua"
+    AREAS_VERDES = "Áreas verdes / Praças"
+    ESCOLA = "Escola / Creche"
+    SEGURANCA = "Segurança"
+    OUTRO = "Outro"
+
+    @property
+    def label(self):
+        return self.value
+
+
+class Status(Enum):
+    PENDENTE = "pendente"
+    APROVADO = "aprovado"
+    EM_ANALISE = "em_analise"
+    REJEITADO = "rejeitado"
+
+    @property
+    def label(self):
+        return STATUS_LABELS[self]
+
+
+STATUS_LABELS = {
+    Status.PENDENTE: "⏳ Pendente",
+    Status.APROVADO: "✅ Aprovado",
+    Status.EM_ANALISE: "🔍 Em análise",
+    Status.REJEITADO: "❌ Rejeitado",
+}
+
+
+def _enum_or_intern(enum, valor):
+    # Valores fora do enum (dados antigos) continuam válidos, só que internados
+    if valor is None or isinstance(valor, enum):
+        return valor
+    try:
+        return enum(valor)
+    except ValueError:
+        return sys.intern(str(valor))
+
+
+def as_categoria(valor):
+    return _enum_or_intern(Categoria, valor)
+
+
+def as_status(valor):
+    return _enum_or_intern(Status, valor)
+
+
+def raw_value(valor):
+    """Valor serializável: o texto do enum ou o próprio valor."""
+    return valor.value if isinstance(valor, Enum) else valor
+
+
+def label_of(valor, vazio="-"):
+    if valor is None or valor == "":
+        return vazio
+    return valor.label if isinstance(valor, Enum) else valor
+
+
+def format_created_at(created_at):
+    """ "2024-05-01 13:45:00" -> "01/05/2024 13:45" """
+    c = created_at
+    if c and len(c) == 19 and c[4] == c[7] == "-" and c[10] == " ":
+        # Caminho rápido (fatias) para o formato gravado pelo bot
+        return f"{c[8:10]}/{c[5:7]}/{c[:4]} {c[11:16]}"
+    try:
+        return datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y %H:%M")
+    except (TypeError, ValueError):
+        return created_at or "-"
+
+
+CAMPOS = (
+    "id", "categoria", "status", "titulo", "descricao", "descricao_local", "photo_file_id",
+    "user_id", "chat_id", "latitude", "longitude", "created_at", "updated_at", "photo_thumb_file_id",
+)
+
+
+@dataclass(slots=True, eq=False)
+class Problema:
+    id: str
+    categoria: object = None
+    status: object = None
+    titulo: str = None
+    descricao: str = None
+    descricao_local: str = None
+    photo_file_id: str = None
+    user_id: int = None
+    chat_id: int = None
+    latitude: float = None
+    longitude: float = None
+    created_at: str = None
+    updated_at: str = None
+    # Miniatura usada nas listagens; photo_file_id é o tamanho original
+    photo_thumb_file_id: str = None
+    # Chaves desconhecidas do dict original, devolvidas intactas em to_dict
+    extra: dict = None
+
+    @property
+    def created_at_formatted(self):
+        return format_created_at(self.created_at)
+
+    @property
+    def categoria_label(self):
+        return label_of(self.categoria)
+
+    @property
+    def status_label(self):
+        return label_of(self.status, "")
+
+    @classmethod
+    def from_dict(cls, dados):
+        registro = cls(**{k: dados.get(k) for k in CAMPOS})
+        registro.categoria = as_categoria(registro.categoria)
+        registro.status = as_status(registro.status)
+        if registro.updated_at == registro.created_at:
+            # Mesma string para os dois campos em vez de duas cópias
+            registro.updated_at = registro.created_at
+        extra = {k: v for k, v in dados.items() if k not in CAMPOS}
+        if extra.get("created_at_formatted") == registro.created_at_formatted:
+            # Redundante: volta igual em to_dict
+            del extra["created_at_formatted"]
+        registro.extra = extra or None
+        return registro
+
+    def to_dict(self):
+        categoria, status = self.categoria, self.status
+        dados = {
+            "id": self.id,
+            "categoria": categoria.value if isinstance(categoria, Enum) else categoria,
+            "status": status.value if isinstance(status, Enum) else status,
+            "titulo": self.titulo,
+            "descricao": self.descricao,
+            "descricao_local": self.descricao_local,
+            "photo_file_id": self.photo_file_id,
+            "user_id": self.user_id,
+            "chat_id": self.chat_id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "created_at_formatted": format_created_at(self.created_at),
+        }
+        if self.photo_thumb_file_id is not None:
+            # Campo novo: registros antigos continuam serializando igual
+            dados["photo_thumb_file_id"] = self.photo_thumb_file_id
+        if self.extra:
+            dados.update(self.extra)
+        return dados
+
+
+def to_json(obj):
+    """``default`` para json.dumps: serializa ``Problema`` no formato dict."""
+    if isinstance(obj, Problema):
+        return obj.to_dict()
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
@@ -0,0 +1,35 @@
+# pagination.py
+"""Cursores compactos para paginação por (created_at, id) em callback_data.
+
+O Telegram limita callback_data a 64 bytes, então o cursor guarda o
+created_at só com dígitos e o UUID em base64url (22 caracteres).
+"""
+import base64
+import uuid
+
+
+def cursor_of(registro):
+    return (registro.created_at or "", registro.id)
+
+
+def encode_cursor(cursor):
+    created_at, reg_id = cursor
+    digits = "".join(c for c in created_at if c.isdigit())
+    try:
+        token = "u" + base64.urlsafe_b64encode(uuid.UUID(reg_id).bytes).decode().rstrip("=")
+    except ValueError:
+        token = "r" + reg_id
+    return f"{digits}.{token}"
+
+
+def decode_cursor(texto):
+    digits, token = texto.split(".", 1)
+    if len(digits) == 14:
+        created_at = f"{digits[:4]}-{digits[4:6]}-{digits[6:8]} {digits[8:10]}:{digits[10:12]}:{digits[12:]}"
+    else:
+        created_at = digits
+    if token.startswith("u"):
+        reg_id = str(uuid.UUID(bytes=base64.urlsafe_b64decode(token[1:] + "==")))
+    else:
+        reg_id = token[1:]
+    return created_at, reg_id
@@ -0,0 +1,158 @@
+# ratelimit.py
+import asyncio
+import logging
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# O _count do histograma é o número de chamadas por endpoint
+TG_SECONDS = metrics.histogram(
+    "bot_telegram_request_seconds", "Latência das chamadas à API do Telegram", labels=("endpoint",)
+)
+TG_ERRORS = metrics.counter(
+    "bot_telegram_errors_total", "Chamadas à API do Telegram com erro", labels=("endpoint", "tipo")
+)
+
+
+class TokenBucket:
+    """Token bucket com fila FIFO: quem chega primeiro envia primeiro."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    @property
+    def idle(self):
+        self._refill()
+        return not self._lock.locked() and self.tokens >= self.capacity
+
+    async def acquire(self):
+        """Consome um token; devolve True se precisou esperar."""
+        async with self._lock:
+            esperou = False
+            self._refill()
+            while self.tokens < 1:
+                esperou = True
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+            return esperou
+
+
+class OutboundRateLimiter(BaseRateLimiter):
+    """Fila de saída para a API do Telegram com buckets global e por chat.
+
+    Só requisições com ``chat_id`` (envios) passam pelos buckets; getUpdates,
+    answerCallbackQuery etc. seguem direto. Um 429 (RetryAfter) pausa todos os
+    envios pelo tempo pedido pelo Telegram antes de tentar de novo.
+
+    ``metrics``: ``queued`` é quantos envios estão na fila agora; ``sent``,
+    ``delayed`` (esperaram por token), ``throttled`` (429) e ``failed`` são
+    contadores acumulados.
+    """
+
+    def __init__(
+        self,
+        global_rate=30.0,
+        global_burst=30,
+        chat_rate=1.0,
+        chat_burst=6,
+        group_rate=20 / 60,
+        group_burst=5,
+        max_retries=3,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate, self.chat_burst = chat_rate, chat_burst
+        self.group_rate, self.group_burst = group_rate, group_burst
+        self.max_retries = max_retries
+        self._chat_buckets = {}
+        self._resume = asyncio.Event()
+        self._resume.set()
+        self.metrics = {"queued": 0, "sent": 0, "delayed": 0, "throttled": 0, "failed": 0}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        logger.info("Métricas de envio ao Telegram: %s", self.metrics)
+
+    def _bucket_for(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 1000:
+                # Descarta buckets cheios e sem fila (chats inativos)
+                for key in [k for k, b in self._chat_buckets.items() if b.idle]:
+                    del self._chat_buckets[key]
+            grupo = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            if grupo:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _chamar(self, callback, args, kwargs, endpoint):
+        start = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception as exc:
+            TG_ERRORS.labels(endpoint, type(exc).__name__).inc()
+            raise
+        finally:
+            TG_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            return await self._chamar(callback, args, kwargs, endpoint)
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+
+        max_retries = rate_limit_args if rate_limit_args is not None else self.max_retries
+        m = self.metrics
+        m["queued"] += 1
+        try:
+            for tentativa in range(max_retries + 1):
+                # Bucket do chat primeiro: preserva a ordem das mensagens do chat
+                esperou = await self._bucket_for(chat_id).acquire()
+                await self._resume.wait()
+                esperou = await self.global_bucket.acquire() or esperou
+                if esperou:
+                    m["delayed"] += 1
+                try:
+                    resultado = await self._chamar(callback, args, kwargs, endpoint)
+                    m["sent"] += 1
+                    return resultado
+                except RetryAfter as exc:
+                    m["throttled"] += 1
+                    if tentativa == max_retries:
+                        m["failed"] += 1
+                        raise
+                    espera = exc.retry_after
+                    if hasattr(espera, "total_seconds"):
+                        espera = espera.total_seconds()
+                    logger.warning("Flood control em %s (chat %s): aguardando %.1fs", endpoint, chat_id, espera)
+                    self._resume.clear()
+                    await asyncio.sleep(espera + 0.1)
+                    self._resume.set()
+                except Exception:
+                    m["failed"] += 1
+                    raise
+        finally:
+            m["queued"] -= 1
+        return None
@@ -0,0 +1,292 @@
+# render.py
+"""Teclados, textos fixos e cards dos registros, montados uma vez só.
+
+Os objetos do python-telegram-bot são imutáveis depois de criados, então os
+teclados fixos são construídos no import e reaproveitados em todo envio. O
+texto de cada registro é memoizado por ``(id, updated_at)``: uma edição muda o
+``updated_at`` e o card é refeito; como ouvinte do repositório, o cache
+descarta o card de registros removidos.
+"""
+import collections
+import functools
+from datetime import timedelta
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+
+import metrics
+from models import Categoria, STATUS_LABELS
+
+CARDS_CACHE = metrics.counter(
+    "bot_cards_cache_total", "Consultas ao cache de cards", labels=("resultado",)
+)
+_HITS = CARDS_CACHE.labels("hit")
+_MISSES = CARDS_CACHE.labels("miss")
+
+
+# ---------- Textos ----------
+MENU_TEXTO = "👋 *Bem-vindo ao Kernel6 Project!*\nEscolha uma opção:"
+PERGUNTA_CATEGORIA = "📝 Qual categoria do problema?"
+PERGUNTA_TITULO = "📝 *Forneça um título para o problema:*\nEx: \"Poste de luz quebrado na Rua X\""
+PERGUNTA_DESCRICAO = "📝 *Agora, descreva o problema com detalhes:*"
+PERGUNTA_FOTO = "📸 *Deseja enviar uma foto do problema?*"
+PERGUNTA_LOCAL = (
+    "📍 *Onde fica o problema?* Forneça endereço ou referência,\n"
+    "ou envie a localização pelo 📎 (Localização)."
+)
+PEDIR_LOCALIZACAO = (
+    "📍 *Problemas perto de você*\n"
+    "Envie sua localização pelo botão abaixo ou pelo 📎 (Localização)."
+)
+PEDIR_SENHA = "🔐 Digite a senha de administrador:"
+USO_EXPORTAR = (
+    "📦 Use: /exportar [csv|jsonl|geojson] [gz] [categoria=...] [status=...] [de=AAAA-MM-DD] [ate=AAAA-MM-DD]\n"
+    "Ex: /exportar csv gz categoria=iluminacao status=pendente de=2024-01-01"
+)
+
+
+# ---------- Teclados ----------
+BOTAO_VOLTAR_MENU = InlineKeyboardButton("⬅️ Voltar ao menu", callback_data="voltar_menu")
+
+MENU = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📝 Registrar problema", callback_data="registrar")],
+    [InlineKeyboardButton("📋 Listar registros", callback_data="listar")],
+    [InlineKeyboardButton("📍 Perto de mim", callback_data="perto")],
+    [InlineKeyboardButton("🗑 Deletar registros", callback_data="delete_menu")],
+    [InlineKeyboardButton("❓ Ajuda", callback_data="ajuda")],
+])
+
+VOLTAR_MENU = InlineKeyboardMarkup([[BOTAO_VOLTAR_MENU]])
+
+CATEGORIAS = InlineKeyboardMarkup(
+    [[InlineKeyboardButton(c.label, callback_data=f"cat:{c.label}")] for c in Categoria]
+    + [[BOTAO_VOLTAR_MENU]]
+)
+
+FOTO_OPCOES = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📷 Adicionar foto", callback_data="add_file"),
+     InlineKeyboardButton("⏭️ Pular", callback_data="skip_file")],
+    [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_descricao")],
+])
+
+# Depois da localização: referência em texto ou só as coordenadas
+LOCAL_OPCOES = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⏭️ Usar só a localização", callback_data="local_coords")],
+    [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_foto")],
+])
+
+# Teclado de resposta: o botão pede a localização ao app (só em chat privado)
+ENVIAR_LOCALIZACAO = ReplyKeyboardMarkup(
+    [[KeyboardButton("📍 Enviar minha localização", request_location=True)]],
+    resize_keyboard=True,
+    one_time_keyboard=True
+)
+
+CONFIRMAR_REGISTRO = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ SIM, CONFIRMAR", callback_data="confirm_save"),
+     InlineKeyboardButton("❌ NÃO, CANCELAR", callback_data="cancel_save")],
+    [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_local")],
+])
+
+CONFIRMAR_EXCLUSAO = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ SIM, EXCLUIR", callback_data="confirm_delete"),
+     InlineKeyboardButton("❌ NÃO, CANCELAR", callback_data="cancel_delete_confirm")],
+])
+
+# Linhas fixas do seletor de exclusão (o resto do teclado depende da página)
+LINHA_FILTROS = (
+    InlineKeyboardButton("📁 Categoria", callback_data="dfc"),
+    InlineKeyboardButton("📊 Status", callback_data="dfs"),
+    InlineKeyboardButton("📅 Período", callback_data="dfd"),
+)
+LINHA_LIMPAR_FILTROS = (InlineKeyboardButton("🧹 Limpar filtros", callback_data="dfx"),)
+LINHA_CANCELAR_EXCLUSAO = (InlineKeyboardButton("⬅️ Cancelar", callback_data="cancel_delete"),)
+
+
+@functools.lru_cache(maxsize=None)
+def voltar(callback_data):
+    """Teclado com um único "⬅️ Voltar" para o passo anterior."""
+    return InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Voltar", callback_data=callback_data)]])
+
+
+def opcoes_filtro(periodos):
+    """``{tipo: (texto, teclado)}`` das telas de filtro do seletor de exclusão."""
+    opcoes = {
+        "dfc": ("📁 *Filtrar por categoria:*", [
+            [InlineKeyboardButton(c.label, callback_data=f"dfc:{i}")] for i, c in enumerate(Categoria)
+        ]),
+        "dfs": ("📊 *Filtrar por status:*", [
+            [InlineKeyboardButton(label, callback_data=f"dfs:{status.value}")] for status, label in STATUS_LABELS.items()
+        ]),
+        "dfd": ("📅 *Filtrar por período:*", [
+            [InlineKeyboardButton(f"Últimos {dias} dias", callback_data=f"dfd:{dias}")] for dias in periodos
+        ]),
+    }
+    return {
+        tipo: (texto, InlineKeyboardMarkup(botoes + [[InlineKeyboardButton("Todos", callback_data=f"{tipo}:x")]]))
+        for tipo, (texto, botoes) in opcoes.items()
+    }
+
+
+# ---------- Estatísticas ----------
+def _barra(n, maximo, largura=10):
+    return "▇" * max(1, round(n * largura / maximo)) if n else ""
+
+
+def painel_stats(stats, hoje, dias):
+    """Texto do /stats a partir de um ``StatsCollector``."""
+    linhas = [f"📊 *Estatísticas* — {stats.total} registro(s)", ""]
+    linhas.append(f"🗓 Últimos 7 dias: {stats.desde(hoje - timedelta(days=6))} · "
+                  f"últimos 30: {stats.desde(hoje - timedelta(days=29))}")
+    linhas += ["", "📁 *Por categoria*"]
+    linhas += [f"{label}: {n}" for label, n in stats.categorias()] or ["-"]
+    linhas += ["", "📌 *Por status*"]
+    linhas += [f"{label}: {n}" for label, n in stats.status()] or ["-"]
+    # Pelo menos um dia: a série nunca fica vazia
+    dias = max(1, dias)
+    serie = stats.serie_diaria(hoje, dias)
+    maximo = max(n for _, n in serie)
+    linhas += ["", f"📈 *Por dia (últimos {dias})*"]
+    linhas += [" ".join(filter(None, (f"{dia:%d/%m}", _barra(n, maximo), str(n)))) for dia, n in serie]
+    return "\n".join(linhas)
+
+
+# ---------- Cards ----------
+def coordenadas(lat, lon):
+    return f"{lat:.5f}, {lon:.5f}"
+
+
+def distancia(metros):
+    return f"{metros:.0f} m" if metros < 1000 else f"{metros / 1000:.1f} km".replace(".", ",")
+
+
+# Listagem, perto de mim e preview usam o mesmo card ("corpo"); a
+# confirmação de exclusão mostra a descrição ainda mais curta
+LIMITE_TITULO = 100
+LIMITE_DESCRICAO = 100
+LIMITE_DESCRICAO_EXCLUSAO = 50
+LIMITE_LOCAL = 200
+
+
+def _resumo(texto, limite):
+    if len(texto) <= limite:
+        return texto
+    return texto[:limite - 3] + "..."
+
+
+def _corpo(p, limite_descricao=LIMITE_DESCRICAO):
+    """Corpo do card com título, descrição e local encurtados.
+
+    Encurtar cada campo aqui mantém o card inteiro abaixo do limite da
+    mensagem; cortar o texto já montado poderia partir uma entidade Markdown.
+    """
+    mapa = coordenadas(p.latitude, p.longitude) if p.latitude is not None and p.longitude is not None else None
+    texto = (
+        f"📝 *Título:* {_resumo(p.titulo or '-', LIMITE_TITULO)}\n"
+        f"📄 *Descrição:* {_resumo(p.descricao or '-', limite_descricao)}\n"
+        f"📍 *Local:* {_resumo(p.descricao_local or mapa or '-', LIMITE_LOCAL)}\n"
+    )
+    if mapa and p.descricao_local:
+        texto += f"🗺 *Coordenadas:* {mapa}\n"
+    return texto + (
+        f"📅 *Criado:* {p.created_at_formatted}\n"
+        f"📊 *Status:* {p.status_label}\n"
+    )
+
+
+def _rotulo_exclusao(p):
+    titulo = p.titulo or "Sem título"
+    local = p.descricao_local or "Sem local"
+    texto_titulo = titulo[:15] + "..." if len(titulo) > 15 else titulo
+    texto_local = local[:10] + "..." if len(local) > 10 else local
+    return f"{texto_titulo} - {texto_local}"
+
+
+class CardCache:
+    """Textos por registro, memoizados por ``(id, updated_at)`` com limite LRU.
+
+    ``builders`` mapeia variante -> função que recebe o Problema; cada
+    variante é montada só na primeira vez que é pedida.
+    """
+
+    def __init__(self, builders, maxsize=4096):
+        self.builders = builders
+        self.maxsize = maxsize
+        # id -> (updated_at, {variante: texto})
+        self._cards = collections.OrderedDict()
+
+    def get(self, registro, variante):
+        entrada = self._cards.get(registro.id)
+        if entrada is None or entrada[0] != registro.updated_at:
+            entrada = self._cards[registro.id] = (registro.updated_at, {})
+            if len(self._cards) > self.maxsize:
+                self._cards.popitem(last=False)
+        else:
+            self._cards.move_to_end(registro.id)
+        textos = entrada[1]
+        texto = textos.get(variante)
+        if texto is None:
+            _MISSES.value += 1
+            texto = textos[variante] = self.builders[variante](registro)
+        else:
+            _HITS.value += 1
+        return texto
+
+    def invalidate(self, reg_id):
+        self._cards.pop(reg_id, None)
+
+    # Ouvinte do repositório (Repository.subscribe)
+    def on_reset(self, registros):
+        self._cards.clear()
+
+    def on_add(self, registro):
+        # Edições mudam o updated_at, que já faz parte da chave; um registro
+        # novo mantém o card montado no preview
+        pass
+
+    def on_remove(self, registro):
+        self.invalidate(registro.id)
+
+    def __len__(self):
+        return len(self._cards)
+
+
+CARDS = CardCache({
+    "corpo": _corpo,
+    "confirmacao_exclusao": functools.partial(_corpo, limite_descricao=LIMITE_DESCRICAO_EXCLUSAO),
+    "exclusao": _rotulo_exclusao,
+})
+
+
+def card_listagem(p, posicao):
+    return f"*{posicao}. {p.categoria_label}*\n" + CARDS.get(p, "corpo")
+
+
+def card_proximo(p, posicao, metros):
+    return f"*{posicao}. {p.categoria_label}* · 📏 {distancia(metros)}\n" + CARDS.get(p, "corpo")
+
+
+def card_detalhes(p, variante="corpo"):
+    """Categoria + corpo do card.
+
+    ``variante``: ``"corpo"`` (preview do registro novo, o mesmo texto da
+    listagem) ou ``"confirmacao_exclusao"``.
+    """
+    return f"📁 *Categoria:* {p.categoria_label}\n" + CARDS.get(p, variante)
+
+
+def aviso_duplicados(similares):
+    """Aviso do preview com os registros parecidos (``DuplicateIndex.similares``), ou ""."""
+    if not similares:
+        return ""
+    linhas = ["⚠️ *Parecido com registro(s) já existente(s):*"]
+    for similaridade, p in similares:
+        linhas.append(
+            f"• {p.titulo or '-'} — {p.descricao_local or '-'} "
+            f"({p.created_at_formatted}, {p.status_label}, {similaridade:.0%})"
+        )
+    linhas.append("Se for o mesmo problema, não é preciso registrar de novo.\n\n")
+    return "\n".join(linhas)
+
+
+def botao_exclusao(p, posicao):
+    return InlineKeyboardButton(f"{posicao}. {CARDS.get(p, 'exclusao')}", callback_data=f"del:{p.id}")
@@ -0,0 +1,543 @@
+# repository.py
+import asyncio
+import contextlib
+import itertools
+import logging
+import os
+import sqlite3
+import time
+
+from indexes import OrderedIndex
+import serializer
+from models import Problema, as_categoria, as_status, raw_value
+
+logger = logging.getLogger(__name__)
+
+
+class Repository:
+    """Interface entre os handlers e o armazenamento dos problemas.
+
+    Leituras são síncronas (memória ou SQLite local); escritas são coroutines
+    porque podem envolver journal e réplica no Gist.
+    """
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        # Serializa mutação local + gravação local entre chats processados em
+        # paralelo; a réplica fica fora do lock para não travar os lotes
+        self._write_lock = asyncio.Lock()
+        # Sinalizado quando a hidratação termina (com ou sem sucesso)
+        self.ready = asyncio.Event()
+        self._listeners = []
+        if replica is not None:
+            replica.attach(self._snapshot_content, self.between)
+
+    async def load(self):
+        raise NotImplementedError
+
+    async def hydrate(self):
+        """Roda ``load()`` em background e sinaliza ``ready`` ao terminar.
+
+        O lock de escrita fica preso durante a carga, então escritas esperam
+        naturalmente; leituras devem aguardar ``wait_ready()``.
+        """
+        start = time.perf_counter()
+        try:
+            async with self._write_lock:
+                await self.load()
+                if self._listeners:
+                    registros = await asyncio.to_thread(self._copia)
+                    for listener in self._listeners:
+                        # Leituras esperam ``ready`` e escritas o lock: o
+                        # ouvinte pode montar seu estado numa thread
+                        await asyncio.to_thread(listener.on_reset, registros)
+            logger.info(
+                "Registros prontos em %.0f ms (%d registros)",
+                (time.perf_counter() - start) * 1000, len(self)
+            )
+        except Exception as e:
+            logger.error("Erro ao carregar registros: %s", e)
+        finally:
+            self.ready.set()
+
+    async def wait_ready(self, timeout=None):
+        """Espera a hidratação; devolve False se o ``timeout`` esgotar antes."""
+        if self.ready.is_set():
+            return True
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def subscribe(self, listener):
+        """Registra um ouvinte com ``on_reset(registros)``, ``on_add(registro)`` e ``on_remove(registro)``.
+
+        ``on_reset`` roda ao fim da hidratação; os outros logo depois de cada
+        mutação local, dentro do lock de escrita. Um ``on_add`` com id já
+        existente é uma substituição.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, evento, registros):
+        for listener in self._listeners:
+            for registro in registros:
+                try:
+                    getattr(listener, evento)(registro)
+                except Exception as e:
+                    logger.error("Erro no ouvinte %s.%s: %s", type(listener).__name__, evento, e)
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def get(self, reg_id):
+        raise NotImplementedError
+
+    def all(self):
+        """Todos os registros na ordem de inserção."""
+        raise NotImplementedError
+
+    def page(self, before=None, after=None, limit=10, categoria=None, status=None, since=None, until=None):
+        """Uma página do mais recente para o mais antigo.
+
+        ``before``/``after`` são cursores (created_at, id) exclusivos. Filtros
+        opcionais: ``categoria``, ``status`` e a faixa ``since`` (inclusivo) /
+        ``until`` (exclusivo) comparada com ``created_at``. Devolve
+        ``(registros, tem_mais)``, onde ``tem_mais`` indica se ainda há itens
+        além da página na direção pedida.
+        """
+        raise NotImplementedError
+
+    def latest(self, n):
+        """Os ``n`` registros mais recentes."""
+        return self.page(limit=n)[0]
+
+    def between(self, since=None, until=None):
+        """Registros com ``created_at`` em [since, until), do mais antigo ao mais recente."""
+        return self.page(limit=len(self), since=since, until=until)[0][::-1]
+
+    async def add(self, registro):
+        raise NotImplementedError
+
+    async def delete(self, reg_id):
+        """Remove e devolve o registro, ou None se não existir."""
+        raise NotImplementedError
+
+    async def delete_many(self, ids):
+        """Remove vários ids de uma vez e devolve os registros removidos."""
+        raise NotImplementedError
+
+    async def _snapshot_content(self):
+        return await asyncio.to_thread(serializer.dumps, list(self.all()))
+
+    def _copia(self):
+        """Lista com todos os registros para o ``on_reset`` dos ouvintes.
+
+        Roda numa thread, com o lock de escrita preso pela hidratação.
+        """
+        return list(self.all())
+
+    async def _load_from_replica(self):
+        if self.replica is None:
+            logger.warning("GIST_TOKEN ou GIST_ID não definidos. Usando armazenamento local.")
+            return []
+        try:
+            registros = await self.replica.load_with_retry()
+        except ValueError as e:
+            logger.error("Erro ao desserializar conteúdo do gist: %s", e)
+            self.replica.suspend()
+            return []
+        except Exception as e:
+            # 4xx definitivo ou falha transitória que persistiu após as novas tentativas
+            logger.warning("Não foi possível carregar Gist: %s", e)
+            self.replica.suspend()
+            return []
+        if registros is None:
+            # Arquivo ainda não existe no gist: cria vazio
+            await self.replica.schedule()
+            return []
+        logger.info("Dados carregados do gist com sucesso (%d registros)", len(registros))
+        return await asyncio.to_thread(lambda: [Problema.from_dict(r) for r in registros])
+
+    async def _replicate(self, changed=None):
+        """Agenda a réplica; ``changed`` são os registros afetados (None = tudo)."""
+        if self.replica is None:
+            return True
+        try:
+            return await self.replica.schedule(changed)
+        except Exception as e:
+            logger.error("Erro ao atualizar gist: %s", e)
+            return False
+
+    async def close(self):
+        if self.replica is not None:
+            await self.replica.close()
+
+
+class MemoryRepository(Repository):
+    """Registros só em memória; com réplica, equivale ao antigo backend Gist."""
+
+    def __init__(self, replica=None):
+        super().__init__(replica)
+        # Índice primário: id -> registro (dict preserva a ordem de inserção)
+        self._by_id = {}
+        self._ordered = OrderedIndex()
+        # JSON por mês de created_at: snapshots só recodificam meses alterados
+        self._encoded = serializer.EncodedCache()
+
+    @staticmethod
+    def _chunk_key(registro):
+        # Prefixo de created_at: contíguo na ordem do índice
+        return (registro.created_at or "")[:7]
+
+    def _chunks(self):
+        """(mês, versão, registros) na ordem do índice; cópia feita no loop."""
+        return [
+            (key, self._encoded.version(key), list(grupo))
+            for key, grupo in itertools.groupby(self._ordered.values(), key=self._chunk_key)
+        ]
+
+    async def _snapshot_content(self):
+        return await asyncio.to_thread(self._encoded.join, self._chunks())
+
+    def _reset(self, registros):
+        self._by_id = {r.id: r for r in registros}
+        # Único sort completo: no carregamento
+        self._ordered.rebuild(self._by_id.values())
+        self._encoded.invalidate()
+
+    async def load(self):
+        self._reset(await self._load_from_replica())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, reg_id):
+        return self._by_id.get(reg_id)
+
+    def all(self):
+        return self._by_id.values()
+
+    def page(self, before=None, after=None, limit=10, categoria=None, status=None, since=None, until=None):
+        if categoria is None and status is None:
+            return self._ordered.page(before=before, after=after, limit=limit, since=since, until=until)
+        categoria, status = as_categoria(categoria), as_status(status)
+
+        def match(p):
+            return (categoria is None or p.categoria == categoria) and (
+                status is None or p.status == status
+            )
+        return self._ordered.page(
+            before=before, after=after, limit=limit, match=match, since=since, until=until
+        )
+
+    def latest(self, n):
+        return self._ordered.latest(n)
+
+    def _insert(self, registro):
+        anterior = self._by_id.pop(registro.id, None)
+        if anterior is not None:
+            self._ordered.remove(anterior)
+            self._encoded.invalidate([self._chunk_key(anterior)])
+        self._by_id[registro.id] = registro
+        self._ordered.add(registro)
+        self._encoded.invalidate([self._chunk_key(registro)])
+        self._notify("on_add", [registro])
+
+    def _remove(self, reg_id):
+        removido = self._by_id.pop(reg_id, None)
+        if removido is not None:
+            self._ordered.remove(removido)
+            self._encoded.invalidate([self._chunk_key(removido)])
+            self._notify("on_remove", [removido])
+        return removido
+
+    def _remove_many(self, ids):
+        removidos = [r for r in (self._by_id.pop(i, None) for i in ids) if r is not None]
+        self._ordered.remove_many(removidos)
+        self._encoded.invalidate({self._chunk_key(r) for r in removidos})
+        self._notify("on_remove", removidos)
+        return removidos
+
+    async def add(self, registro):
+        async with self._write_lock:
+            self._insert(registro)
+        return await self._replicate([registro])
+
+    async def delete(self, reg_id):
+        async with self._write_lock:
+            removido = self._remove(reg_id)
+        if removido is not None:
+            await self._replicate([removido])
+        return removido
+
+    async def delete_many(self, ids):
+        async with self._write_lock:
+            removidos = self._remove_many(ids)
+        if removidos:
+            await self._replicate(removidos)
+        return removidos
+
+
+class JournalRepository(MemoryRepository):
+    """Memória + journal local append-only; o Gist recebe os snapshots compactados."""
+
+    def __init__(self, journal, replica=None, compact_every=500):
+        super().__init__(replica)
+        self.journal = journal
+        self.compact_every = compact_every
+
+    async def load(self):
+        if self.journal.exists:
+            try:
+                registros = await asyncio.to_thread(self.journal.replay)
+                self._reset([Problema.from_dict(r) for r in registros])
+                logger.info("Dados carregados do journal local (%d registros)", len(self))
+                return
+            except Exception as e:
+                logger.error("Erro ao ler journal local, recorrendo ao gist: %s", e)
+
+        # Disco vazio (ex.: novo deploy): hidrata a partir da réplica no Gist
+        self._reset(await self._load_from_replica())
+        if len(self):
+            await self._compact()
+
+    async def _compact(self):
+        return await self.journal.compact(self._chunks, encode=self._encoded.join)
+
+    async def _snapshot_content(self):
+        return await self._compact()
+
+    def _append(self, op):
+        """Grava a operação no journal antes de tocar a memória; OSError sobe."""
+        try:
+            self.journal.append(op)
+        except OSError as e:
+            logger.error("Erro ao gravar no journal: %s", e)
+            raise
+
+    async def _compactar_se_preciso(self):
+        if self.journal.entries < self.compact_every:
+            return
+        try:
+            await self._compact()
+        except Exception as e:
+            # A operação já está no journal: a compactação tenta de novo depois
+            logger.error("Erro ao compactar o journal: %s", e)
+
+    async def add(self, registro):
+        async with self._write_lock:
+            try:
+                self._append({"op": "add", "record": registro.to_dict()})
+            except OSError:
+                return False
+            self._insert(registro)
+            await self._compactar_se_preciso()
+        return await self._replicate([registro])
+
+    async def delete(self, reg_id):
+        """Como ``Repository.delete``; levanta OSError se o journal falhar (memória intacta)."""
+        async with self._write_lock:
+            if self.get(reg_id) is None:
+                return None
+            self._append({"op": "del", "id": reg_id})
+            removido = self._remove(reg_id)
+            await self._compactar_se_preciso()
+        await self._replicate([removido])
+        return removido
+
+    async def delete_many(self, ids):
+        async with self._write_lock:
+            existentes = [i for i in dict.fromkeys(ids) if self.get(i) is not None]
+            if not existentes:
+                return []
+            # Uma única linha no journal para o lote inteiro
+            self._append({"op": "del", "ids": existentes})
+            removidos = self._remove_many(existentes)
+            await self._compactar_se_preciso()
+        await self._replicate(removidos)
+        return removidos
+
+    async def close(self):
+        await super().close()
+        self.journal.close()
+
+
+class SqliteRepository(Repository):
+    """SQLite em modo WAL com índices nas colunas usadas em consultas.
+
+    O registro completo fica em ``data`` (JSON); as colunas indexadas são
+    cópias dos campos consultados.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS problemas (
+            id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL DEFAULT '',
+            status TEXT,
+            categoria TEXT,
+            user_id INTEGER,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_problemas_created_at ON problemas (created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_problemas_status ON problemas (status);
+        CREATE INDEX IF NOT EXISTS idx_problemas_categoria ON problemas (categoria);
+        CREATE INDEX IF NOT EXISTS idx_problemas_user_id ON problemas (user_id);
+    """
+
+    def __init__(self, path, replica=None):
+        super().__init__(replica)
+        self.path = path
+        self._conn = None
+
+    def connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    @staticmethod
+    def _row(registro):
+        return (
+            registro.id,
+            registro.created_at or "",
+            raw_value(registro.status),
+            raw_value(registro.categoria),
+            registro.user_id,
+            serializer.dumps(registro),
+        )
+
+    def _conexao_avulsa(self):
+        """Conexão própria para uma thread (a principal é do event loop).
+
+        Em WAL, leitores em outra conexão não bloqueiam nem são bloqueados
+        pela escrita.
+        """
+        return contextlib.closing(sqlite3.connect(self.path))
+
+    def insert_many(self, registros, conn=None):
+        conn = conn or self.connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO problemas (id, created_at, status, categoria, user_id, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._row(r) for r in registros),
+            )
+
+    async def load(self):
+        self.connect()
+        if len(self):
+            logger.info("Banco SQLite aberto (%d registros)", len(self))
+            return
+        # Banco vazio (ex.: novo deploy): hidrata a partir da réplica no Gist
+        registros = await self._load_from_replica()
+        if registros:
+            await asyncio.to_thread(self._inserir_avulso, registros)
+
+    def _inserir_avulso(self, registros):
+        with self._conexao_avulsa() as conn:
+            self.insert_many(registros, conn)
+
+    def _query(self, sql, params=()):
+        return [Problema.from_dict(serializer.loads(row[0])) for row in self.connect().execute(sql, params)]
+
+    def __len__(self):
+        return self.connect().execute("SELECT COUNT(*) FROM problemas").fetchone()[0]
+
+    async def _snapshot_content(self):
+        return await asyncio.to_thread(self._snapshot_avulso)
+
+    def _snapshot_avulso(self):
+        # A coluna data já guarda o JSON de cada registro: nada é recodificado
+        with self._conexao_avulsa() as conn:
+            rows = conn.execute("SELECT data FROM problemas ORDER BY created_at, id")
+            return "[" + ",".join(row[0] for row in rows) + "]"
+
+    def _copia(self):
+        with self._conexao_avulsa() as conn:
+            rows = conn.execute("SELECT data FROM problemas ORDER BY rowid")
+            return [Problema.from_dict(serializer.loads(row[0])) for row in rows]
+
+    def get(self, reg_id):
+        rows = self._query("SELECT data FROM problemas WHERE id = ?", (reg_id,))
+        return rows[0] if rows else None
+
+    def all(self):
+        return self._query("SELECT data FROM problemas ORDER BY rowid")
+
+    def page(self, before=None, after=None, limit=10, categoria=None, status=None, since=None, until=None):
+        filtros, params = [], []
+        for coluna, valor in (("categoria", categoria), ("status", status)):
+            if valor is not None:
+                filtros.append(f"{coluna} = ?")
+                params.append(raw_value(valor))
+        if since:
+            filtros.append("created_at >= ?")
+            params.append(since)
+        if until:
+            filtros.append("created_at < ?")
+            params.append(until)
+        if after is not None:
+            filtros.append("(created_at, id) > (?, ?)")
+            params += after
+            ordem = "created_at, id"
+        else:
+            if before is not None:
+                filtros.append("(created_at, id) < (?, ?)")
+                params += before
+            ordem = "created_at DESC, id DESC"
+        where = f"WHERE {' AND '.join(filtros)} " if filtros else ""
+        itens = self._query(f"SELECT data FROM problemas {where}ORDER BY {ordem} LIMIT ?", (*params, limit + 1))
+        if after is not None:
+            return itens[:limit][::-1], len(itens) > limit
+        return itens[:limit], len(itens) > limit
+
+    async def add(self, registro):
+        async with self._write_lock:
+            try:
+                self.insert_many([registro])
+            except sqlite3.Error as e:
+                logger.error("Erro ao gravar no SQLite: %s", e)
+                return False
+            self._notify("on_add", [registro])
+        return await self._replicate([registro])
+
+    async def delete(self, reg_id):
+        async with self._write_lock:
+            registro = self.get(reg_id)
+            if registro is None:
+                return None
+            conn = self.connect()
+            with conn:
+                conn.execute("DELETE FROM problemas WHERE id = ?", (reg_id,))
+            self._notify("on_remove", [registro])
+        await self._replicate([registro])
+        return registro
+
+    async def delete_many(self, ids):
+        ids = list(ids)
+        conn = self.connect()
+        removidos = []
+        async with self._write_lock:
+            # Lotes abaixo do limite de parâmetros do SQLite
+            for i in range(0, len(ids), 500):
+                lote = ids[i:i + 500]
+                marcadores = ",".join("?" * len(lote))
+                removidos += self._query(f"SELECT data FROM problemas WHERE id IN ({marcadores})", lote)
+                with conn:
+                    conn.execute(f"DELETE FROM problemas WHERE id IN ({marcadores})", lote)
+            self._notify("on_remove", removidos)
+        if removidos:
+            await self._replicate(removidos)
+        return removidos
+
+    async def close(self):
+        await super().close()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,153 @@
+# search.py
+"""Busca textual em memória: índice invertido sem acentos nem maiúsculas.
+
+Indexa ``titulo``, ``descricao`` e ``descricao_local``. Termos são
+normalizados (NFKD sem marcas combinantes + casefold), então "iluminação",
+"ILUMINACAO" e "Iluminacao" são o mesmo termo. Cada termo da consulta casa
+por prefixo (``poste`` encontra ``postes``); todos os termos precisam casar.
+O ranking é TF·IDF com peso por campo, desempatado pelo mais recente.
+
+O índice é mantido pelos eventos do repositório (``Repository.subscribe``),
+nunca por varredura dos registros.
+"""
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+
+# Título pesa mais que local, que pesa mais que descrição
+PESOS = (("titulo", 3.0), ("descricao_local", 2.0), ("descricao", 1.0))
+# Termos da consulta mais curtos que isso não usam prefixo (evita "a*" = tudo)
+MIN_PREFIXO = 3
+STOPWORDS = frozenset(
+    "a o as os e de da do das dos em na no nas nos um uma uns umas por para com sem que se ao aos".split()
+)
+_TOKEN = re.compile(r"\w+")
+# Marcas combinantes que sobram do NFKD (acentos, til, cedilha)
+_MARCAS = re.compile(r"[\u0300-\u036f]")
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: "Iluminação" -> "iluminacao"."""
+    if texto.isascii():
+        return texto.lower()
+    return _MARCAS.sub("", unicodedata.normalize("NFKD", texto)).casefold()
+
+
+def tokens(texto):
+    if not texto:
+        return []
+    return [t for t in _TOKEN.findall(normalizar(texto)) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """Índice invertido termo -> {id: peso}; ouvinte de um ``Repository``."""
+
+    def __init__(self):
+        self._postings = {}
+        # id -> (created_at, termos do documento), para remoção e desempate
+        self._docs = {}
+        # Vocabulário ordenado: prefixos viram uma faixa via bisect
+        self._vocab = []
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _pesos(registro):
+        pesos = {}
+        for campo, peso in PESOS:
+            for termo in tokens(getattr(registro, campo)):
+                pesos[termo] = pesos.get(termo, 0.0) + peso
+        return pesos
+
+    def _add(self, registro):
+        pesos = self._pesos(registro)
+        self._docs[registro.id] = (registro.created_at or "", tuple(pesos))
+        for termo, peso in pesos.items():
+            posting = self._postings.get(termo)
+            if posting is None:
+                posting = self._postings[termo] = {}
+                bisect.insort(self._vocab, termo)
+            posting[registro.id] = peso
+
+    def _remove(self, reg_id):
+        doc = self._docs.pop(reg_id, None)
+        if doc is None:
+            return
+        for termo in doc[1]:
+            posting = self._postings[termo]
+            posting.pop(reg_id, None)
+            if not posting:
+                del self._postings[termo]
+                del self._vocab[bisect.bisect_left(self._vocab, termo)]
+
+    # ---------- Eventos do repositório ----------
+    def on_reset(self, registros):
+        self._postings, self._docs, self._vocab = {}, {}, []
+        for registro in registros:
+            pesos = self._pesos(registro)
+            self._docs[registro.id] = (registro.created_at or "", tuple(pesos))
+            for termo, peso in pesos.items():
+                self._postings.setdefault(termo, {})[registro.id] = peso
+        # Um único sort no lugar de um insort por termo novo
+        self._vocab = sorted(self._postings)
+
+    def on_add(self, registro):
+        # Reinserção (edição) troca os termos antigos pelos novos
+        self._remove(registro.id)
+        self._add(registro)
+
+    def on_remove(self, registro):
+        self._remove(registro.id)
+
+    # ---------- Consulta ----------
+    def _expandir(self, termo):
+        """Termos do vocabulário que casam com ``termo`` (exato ou prefixo)."""
+        if len(termo) < MIN_PREFIXO:
+            return [termo] if termo in self._postings else []
+        inicio = bisect.bisect_left(self._vocab, termo)
+        fim = bisect.bisect_left(self._vocab, termo + "\U0010ffff", inicio)
+        return self._vocab[inicio:fim]
+
+    def search(self, consulta, limit=10, offset=0):
+        """``(ids, total)``: ids da página pedida, do mais relevante ao menos."""
+        termos = list(dict.fromkeys(tokens(consulta)))
+        if not termos:
+            return [], 0
+        total_docs = len(self._docs)
+        expansoes = []
+        for termo in termos:
+            postings = [self._postings[t] for t in self._expandir(termo)]
+            if not postings:
+                return [], 0
+            expansoes.append(postings)
+
+        # Interseção dos ids antes de pontuar, começando pelo termo mais raro
+        expansoes.sort(key=lambda postings: sum(map(len, postings)))
+        candidatos = None
+        for postings in expansoes:
+            ids = postings[0].keys() if len(postings) == 1 else set().union(*postings)
+            candidatos = set(ids) if candidatos is None else candidatos.intersection(ids)
+            if not candidatos:
+                return [], 0
+
+        scores = dict.fromkeys(candidatos, 0.0)
+        for postings in expansoes:
+            for posting in postings:
+                idf = math.log(1 + total_docs / len(posting))
+                if len(posting) <= len(scores):
+                    for reg_id, peso in posting.items():
+                        if reg_id in scores:
+                            scores[reg_id] += peso * idf
+                else:
+                    for reg_id in scores:
+                        peso = posting.get(reg_id)
+                        if peso is not None:
+                            scores[reg_id] += peso * idf
+        docs = self._docs
+        melhores = heapq.nlargest(
+            offset + limit, scores, key=lambda reg_id: (scores[reg_id], docs[reg_id][0])
+        )
+        return melhores[offset:], len(scores)
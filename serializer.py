@@ -0,0 +1,80 @@
+# serializer.py
+"""Serialização JSON dos registros: orjson quando instalado, stdlib como fallback.
+
+O formato gravado é compacto; ``dumps_pretty`` (indentado) fica para
+exportações lidas por pessoas. Os dois backends produzem JSON equivalente,
+então dados gravados por um são lidos pelo outro.
+"""
+import json
+
+from models import to_json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    # Problema é dataclass: sem PASSTHROUGH o orjson ignoraria o to_dict
+    _OPTS = orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=to_json, option=_OPTS).decode("utf-8")
+
+    def dumps_pretty(obj):
+        return orjson.dumps(obj, default=to_json, option=_OPTS | orjson.OPT_INDENT_2).decode("utf-8")
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    def dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=to_json)
+
+    def dumps_pretty(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2, default=to_json)
+
+    def loads(data):
+        return json.loads(data)
+
+
+class EncodedCache:
+    """JSON já codificado por chave (ex.: mês); só chaves invalidadas são recodificadas.
+
+    O uso típico é em duas etapas: ``version()`` de cada grupo é lido no loop
+    junto com a cópia dos registros, e ``join()`` roda numa thread. Se a chave
+    for invalidada no meio do caminho, o trecho codificado não entra no cache.
+    """
+
+    def __init__(self):
+        self._encoded = {}
+        self._versions = {}
+        self._generation = 0
+
+    def invalidate(self, keys=None):
+        """Descarta as ``keys`` (None = todas)."""
+        if keys is None:
+            self._generation += 1
+            self._encoded.clear()
+            return
+        for key in keys:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._encoded.pop(key, None)
+
+    def version(self, key):
+        return self._generation, self._versions.get(key, 0)
+
+    def encode(self, key, version, registros):
+        """Trecho ``a,b,c`` (sem colchetes) dos registros da chave."""
+        cached = self._encoded.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        texto = dumps(registros)[1:-1]
+        if self.version(key) == version:
+            self._encoded[key] = (version, texto)
+        return texto
+
+    def join(self, grupos):
+        """Array JSON com todos os grupos ``(chave, versão, registros)``."""
+        return "[" + ",".join(t for t in (self.encode(*g) for g in grupos) if t) + "]"
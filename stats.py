@@ -0,0 +1,85 @@
+# stats.py
+"""Estatísticas agregadas dos registros, mantidas incrementalmente.
+
+Contagens por categoria, por status e por dia (``created_at[:10]``). Como
+ouvinte do repositório, cada inserção ou exclusão custa O(1) e a carga
+inicial refaz tudo uma vez; o ``/stats`` só lê os contadores, sem varrer o
+store.
+"""
+import collections
+from datetime import timedelta
+
+from models import Categoria, Status, label_of
+
+
+class StatsCollector:
+    """Contadores categoria/status/dia; ouvinte de um ``Repository``."""
+
+    def __init__(self):
+        self.total = 0
+        self.por_categoria = collections.Counter()
+        self.por_status = collections.Counter()
+        self.por_dia = collections.Counter()
+        # id -> chaves contadas, para desfazer a contagem numa substituição
+        # ou exclusão mesmo que o registro tenha mudado
+        self._chaves = {}
+
+    def __len__(self):
+        return self.total
+
+    @staticmethod
+    def _chave(registro):
+        return registro.categoria, registro.status, (registro.created_at or "")[:10]
+
+    def _somar(self, chave, delta):
+        categoria, status, dia = chave
+        self.total += delta
+        for contador, valor in ((self.por_categoria, categoria), (self.por_status, status), (self.por_dia, dia)):
+            n = contador.get(valor, 0) + delta
+            if n:
+                contador[valor] = n
+            else:
+                del contador[valor]
+
+    # ---------- Eventos do repositório ----------
+    def on_reset(self, registros):
+        chaves = {r.id: self._chave(r) for r in registros}
+        self._chaves = chaves
+        self.total = len(chaves)
+        self.por_categoria = collections.Counter(c for c, _, _ in chaves.values())
+        self.por_status = collections.Counter(s for _, s, _ in chaves.values())
+        self.por_dia = collections.Counter(d for _, _, d in chaves.values())
+
+    def on_add(self, registro):
+        self.on_remove(registro)
+        chave = self._chaves[registro.id] = self._chave(registro)
+        self._somar(chave, 1)
+
+    def on_remove(self, registro):
+        chave = self._chaves.pop(registro.id, None)
+        if chave is not None:
+            self._somar(chave, -1)
+
+    # ---------- Consulta ----------
+    def categorias(self):
+        """``[(rótulo, n)]`` na ordem do enum; valores antigos fora dele no fim."""
+        conhecidas = [(c.label, self.por_categoria[c]) for c in Categoria if self.por_categoria[c]]
+        outras = sorted((label_of(c), n) for c, n in self.por_categoria.items() if not isinstance(c, Categoria))
+        return conhecidas + outras
+
+    def status(self):
+        conhecidos = [(s.label, self.por_status[s]) for s in Status if self.por_status[s]]
+        outros = sorted((label_of(s, "Sem status"), n) for s, n in self.por_status.items() if not isinstance(s, Status))
+        return conhecidos + outros
+
+    def serie_diaria(self, hoje, dias=14):
+        """``[(date, n)]`` dos ``dias`` até ``hoje`` (inclusive), com zeros."""
+        return [
+            (dia, self.por_dia.get(dia.isoformat(), 0))
+            for dia in (hoje - timedelta(days=i) for i in range(dias - 1, -1, -1))
+        ]
+
+    def desde(self, inicio):
+        """Registros criados a partir de ``inicio`` (date): soma só os dias presentes."""
+        inicio = inicio.isoformat()
+        return sum(n for dia, n in self.por_dia.items() if dia >= inicio)
@@ -0,0 +1,652 @@
+# storage.py
+import asyncio
+import contextlib
+import json
+import email.utils
+import logging
+import os
+import random
+import time
+
+import httpx
+
+import jsonstream
+import metrics
+import serializer
+
+logger = logging.getLogger(__name__)
+
+GIST_API_BASE = "https://api.github.com/gists"
+# Devolvido por GistStore.load quando o GET condicional recebe 304
+NOT_MODIFIED = object()
+
+GIST_SECONDS = metrics.histogram(
+    "bot_gist_request_seconds", "Latência das requisições ao Gist", labels=("op",)
+)
+GIST_ERRORS = metrics.counter(
+    "bot_gist_request_errors_total", "Requisições ao Gist com erro", labels=("op",)
+)
+GIST_BYTES = metrics.counter(
+    "bot_gist_bytes_total", "Bytes trocados com o Gist", labels=("direcao",)
+)
+_RECEBIDOS = GIST_BYTES.labels("recebidos")
+_ENVIADOS = GIST_BYTES.labels("enviados")
+
+
+@contextlib.contextmanager
+def _medir(op):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        GIST_ERRORS.labels(op).inc()
+        raise
+    finally:
+        GIST_SECONDS.labels(op).observe(time.perf_counter() - start)
+
+
+class GistStore:
+    """Persistência assíncrona no Gist usando um único cliente HTTP com keep-alive."""
+
+    def __init__(self, token, gist_id, filename, timeout=15.0, transport=None):
+        self.token = token
+        self.gist_id = gist_id
+        self.filename = filename
+        self.timeout = timeout
+        self._transport = transport
+        self._client = None
+        # ETag da última resposta do GitHub (GET ou PATCH)
+        self.etag = None
+        # Garante que PATCHes não cheguem fora de ordem ao GitHub
+        self._save_lock = asyncio.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.token and self.gist_id)
+
+    def _headers(self):
+        return {"Authorization": f"token {self.token}", "Accept": "application/vnd.github+json"}
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=GIST_API_BASE,
+                headers=self._headers(),
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=60),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def fetch_files(self, etag=None):
+        """GET do gist: ``{nome: arquivo}`` com os metadados e o ``content`` da API.
+
+        Com ``etag`` o GET é condicional e devolve ``NOT_MODIFIED`` se o gist
+        não mudou desde então.
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        with _medir("get"):
+            resp = await self._get_client().get(f"/{self.gist_id}", headers=headers)
+            _RECEBIDOS.inc(resp.num_bytes_downloaded)
+            if resp.status_code == 304:
+                self.etag = etag
+                return NOT_MODIFIED
+            resp.raise_for_status()
+        self.etag = resp.headers.get("ETag")
+        return resp.json().get("files", {})
+
+    async def read_records(self, arquivo):
+        """Registros de um arquivo devolvido por ``fetch_files``."""
+        if arquivo.get("truncated"):
+            # A API corta arquivos grandes em "content": baixa o arquivo bruto
+            logger.info(
+                "Arquivo %s truncado na API (%s bytes); baixando de raw_url",
+                arquivo.get("filename"), arquivo.get("size")
+            )
+            return await self._stream_records(arquivo["raw_url"])
+        raw = arquivo.get("content", "[]")
+        return await asyncio.to_thread(serializer.loads, raw)
+
+    async def read_json(self, arquivo):
+        """Conteúdo de um arquivo pequeno (ex.: manifest) já decodificado."""
+        if arquivo.get("truncated"):
+            with _medir("raw"):
+                resp = await self._get_client().get(arquivo["raw_url"])
+                _RECEBIDOS.inc(resp.num_bytes_downloaded)
+                resp.raise_for_status()
+            return resp.json()
+        return json.loads(arquivo.get("content") or "null")
+
+    async def load(self, etag=None):
+        """Retorna a lista de registros do Gist ou None se o arquivo não existir.
+
+        Com ``etag``, devolve ``NOT_MODIFIED`` se o gist não mudou.
+        """
+        files = await self.fetch_files(etag)
+        if files is NOT_MODIFIED:
+            return files
+        if self.filename not in files:
+            if manifest_name(self.filename) in files:
+                # Tratar como gist vazio faria a próxima gravação apagar os dados
+                raise ValueError("gist particionado em shards: use GIST_SHARDED=1")
+            return None
+        return await self.read_records(files[self.filename])
+
+    async def _stream_records(self, url):
+        # Parse incremental: em memória só o registro em andamento, não o texto todo
+        parser = jsonstream.JsonArrayParser()
+        registros = []
+        with _medir("raw"):
+            async with self._get_client().stream("GET", url) as resp:
+                resp.raise_for_status()
+                async for chunk in resp.aiter_bytes():
+                    registros.extend(parser.feed(chunk))
+                _RECEBIDOS.inc(resp.num_bytes_downloaded)
+        registros.extend(parser.close())
+        return registros
+
+    async def save(self, records):
+        # Cópia rasa no loop; a serialização pesada roda em thread
+        snapshot = list(records)
+        content = await asyncio.to_thread(serializer.dumps, snapshot)
+        await self.save_content(content)
+
+    async def save_content(self, content):
+        """Grava um conteúdo já serializado (ex.: o snapshot do journal)."""
+        await self.save_files({self.filename: content})
+
+    async def save_files(self, files):
+        """Um único PATCH com vários arquivos; conteúdo None remove o arquivo."""
+        async with self._save_lock:
+            payload = {"files": {
+                nome: None if content is None else {"content": content}
+                for nome, content in files.items()
+            }}
+            with _medir("patch"):
+                resp = await self._get_client().patch(f"/{self.gist_id}", json=payload)
+                _ENVIADOS.inc(len(resp.request.content))
+                _RECEBIDOS.inc(resp.num_bytes_downloaded)
+                resp.raise_for_status()
+            self.etag = resp.headers.get("ETag")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def retry_after(resp):
+    """Segundos pedidos pelo GitHub antes de tentar de novo, ou None.
+
+    ``Retry-After`` (segundos ou data HTTP) vem nos limites secundários;
+    ``X-RateLimit-Reset`` (epoch) com ``X-RateLimit-Remaining: 0`` no primário.
+    """
+    valor = resp.headers.get("Retry-After")
+    if valor:
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(valor).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = resp.headers.get("X-RateLimit-Reset")
+    if reset and resp.headers.get("X-RateLimit-Remaining") == "0":
+        try:
+            return max(0.0, float(reset) - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def classificar_falha(exc):
+    """``(definitiva, espera)`` de uma gravação que falhou.
+
+    4xx que não é limite de taxa (401, 403, 404, 422...) não se resolve
+    repetindo; 429/403 com limite, 408, 5xx e erros de rede são transitórios.
+    """
+    if not isinstance(exc, httpx.HTTPStatusError):
+        return False, None
+    espera = retry_after(exc.response)
+    status = exc.response.status_code
+    if espera is not None or status in (408, 429) or status >= 500:
+        return False, espera
+    return 400 <= status < 500, None
+
+
+def backoff(falhas, base, teto, pedido=None):
+    """Espera após ``falhas`` falhas seguidas: exponencial a partir de ``base``, limitada a ``teto``.
+
+    Com jitter, para réplicas reiniciadas juntas não repetirem no mesmo
+    instante; nunca menos que o ``pedido`` pelo servidor.
+    """
+    limite = min(teto, base * 2 ** falhas)
+    espera = random.uniform(limite / 2, limite)
+    if pedido is not None:
+        espera = max(espera, pedido)
+    return espera
+
+
+class WriteBehind:
+    """Agrupa mutações feitas dentro de uma janela em uma única gravação.
+
+    ``submit()`` devolve uma future resolvida com True/False quando o lote que
+    contém a mutação for gravado; quem não precisa de durabilidade pode ignorá-la.
+
+    Falhas transitórias são repetidas com backoff exponencial limitado a
+    ``max_backoff`` (com jitter), respeitando o tempo pedido pelo servidor.
+    Uma falha definitiva (4xx que não é limite de taxa) para as gravações até
+    o restart: novas mutações são recusadas na hora.
+    """
+
+    def __init__(self, flush_fn, window=1.0, max_backoff=300.0):
+        self.flush_fn = flush_fn
+        self.window = window
+        self.max_backoff = max_backoff
+        self._pending = 0
+        self._waiters = []
+        self._task = None
+        self._wake = asyncio.Event()
+        self._falhas = 0
+        # Exceção da falha definitiva que parou as gravações
+        self.stopped = None
+        self.metrics = {
+            "mutations": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_latency": 0.0,
+            "total_flush_latency": 0.0,
+            "consecutive_failures": 0,
+            "retry_delay": 0.0,
+        }
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self):
+        fut = asyncio.get_running_loop().create_future()
+        self._pending += 1
+        self.metrics["mutations"] += 1
+        if self.stopped is not None:
+            fut.set_result(False)
+            return fut
+        self._waiters.append(fut)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return fut
+
+    async def _esperar(self, segundos):
+        """Dorme até ``segundos`` ou até o ``close()``; True se acordou pelo close."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), segundos)
+        except asyncio.TimeoutError:
+            pass
+        return self._wake.is_set()
+
+    async def _run(self):
+        espera = self.window
+        while self._pending and self.stopped is None:
+            if await self._esperar(espera):
+                break
+            espera = await self._flush() or self.window
+
+    def _backoff(self, pedido):
+        """Próxima espera após ``self._falhas`` falhas seguidas (s)."""
+        return backoff(self._falhas, self.window, self.max_backoff, pedido)
+
+    async def _flush(self):
+        """Grava o lote pendente; devolve a espera até a próxima tentativa se falhar."""
+        if not self._pending or self.stopped is not None:
+            return None
+        batch, waiters = self._pending, self._waiters
+        self._pending, self._waiters = 0, []
+        start = time.perf_counter()
+        espera = None
+        try:
+            await self.flush_fn()
+            ok = True
+        except Exception as e:
+            self.metrics["failed_flushes"] += 1
+            # Os dados continuam em memória; o próximo lote tenta de novo
+            self._pending += batch
+            ok = False
+            self._falhas += 1
+            self.metrics["consecutive_failures"] = self._falhas
+            definitiva, pedido = classificar_falha(e)
+            if definitiva:
+                self.stopped = e
+                logger.critical(
+                    "Gravação no Gist recusada (%s); %d mutações NÃO serão gravadas e novas "
+                    "gravações ficam paradas até o restart", e, self._pending
+                )
+            else:
+                espera = self._backoff(pedido)
+                self.metrics["retry_delay"] = espera
+                logger.error(
+                    "Erro ao gravar lote de %d mutações (%d falhas seguidas), nova tentativa em %.1f s: %s",
+                    batch, self._falhas, espera, e
+                )
+        elapsed = time.perf_counter() - start
+        if ok:
+            self._falhas = 0
+            m = self.metrics
+            m["consecutive_failures"] = 0
+            m["retry_delay"] = 0.0
+            m["flushes"] += 1
+            m["last_batch_size"] = batch
+            m["max_batch_size"] = max(m["max_batch_size"], batch)
+            m["last_flush_latency"] = elapsed
+            m["total_flush_latency"] += elapsed
+            logger.info("Gist atualizado com sucesso (%d mutações em %.0f ms)", batch, elapsed * 1000)
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(ok)
+        return espera
+
+    async def close(self):
+        """Grava imediatamente o que estiver pendente (usado no shutdown)."""
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+        await self._flush()
+
+
+class GistReplica:
+    """Réplica assíncrona no Gist: grava snapshots do repositório em lotes.
+
+    Com ``cache_path``, o último conteúdo lido/gravado fica em disco junto com
+    o ETag do GitHub; no restart um GET condicional (304) evita baixar tudo.
+
+    ``primary``: o Gist é o armazenamento principal (backend gist). Com um
+    backend local (sqlite/journal) o registro já está salvo quando a réplica
+    é agendada, então uma réplica suspensa ou uma gravação durável que falhou
+    não falham a operação: ficam contadas em ``atrasadas`` até o próximo lote
+    gravado com sucesso.
+    """
+
+    def __init__(self, store, window=1.0, durable=False, cache_path=None, primary=True,
+                 load_retries=5, load_backoff=1.0):
+        self.store = store
+        self.load_retries = load_retries
+        self.load_backoff = load_backoff
+        self.durable = durable
+        self.cache_path = cache_path
+        self.primary = primary
+        self.writer = WriteBehind(self._gravar, window=window)
+        self._snapshot_fn = None
+        self._range_fn = None
+        self.suspended = False
+        self.atrasadas = 0
+
+    def attach(self, snapshot_fn, range_fn=None):
+        """Define a coroutine que devolve o conteúdo serializado a replicar.
+
+        ``range_fn(since, until)`` devolve os registros de uma faixa de
+        ``created_at`` (usado pela réplica particionada).
+        """
+        self._snapshot_fn = snapshot_fn
+        self._range_fn = range_fn
+
+    async def _gravar(self):
+        await self._flush()
+        # O lote grava o estado atual inteiro: nada mais fica para trás
+        self.atrasadas = 0
+
+    async def _flush(self):
+        content = await self._snapshot_fn()
+        await self.store.save_content(content)
+        if self.cache_path:
+            await asyncio.to_thread(self._write_cache, content, self.store.etag)
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path + ".etag", encoding="utf-8") as f:
+                etag = f.read().strip()
+            return etag, jsonstream.load_file(self.cache_path)
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_cache(self, content, etag):
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Sem o arquivo do ETag o cache é ignorado: removê-lo antes de trocar o
+        # conteúdo evita usar um ETag que não corresponde ao que está em disco
+        try:
+            os.remove(self.cache_path + ".etag")
+        except FileNotFoundError:
+            pass
+        for path, data in ((self.cache_path, content), (self.cache_path + ".etag", etag)):
+            if data is None:
+                continue
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                if isinstance(data, str):
+                    f.write(data)
+                else:
+                    # Lista de registros: json.dump escreve em pedaços
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, path)
+
+    async def load(self):
+        if not self.cache_path:
+            return await self.store.load()
+        etag, cached = await asyncio.to_thread(self._read_cache)
+        start = time.perf_counter()
+        registros = await self.store.load(etag=etag if cached is not None else None)
+        elapsed = (time.perf_counter() - start) * 1000
+        if registros is NOT_MODIFIED:
+            logger.info("Gist sem alterações (304 em %.0f ms): usando cache local", elapsed)
+            return cached
+        logger.info("Gist baixado em %.0f ms", elapsed)
+        if registros is not None:
+            await asyncio.to_thread(self._write_cache, registros, self.store.etag)
+        return registros
+
+    async def load_with_retry(self):
+        """``load()`` repetido com backoff em falhas transitórias (5xx, 429, rede).
+
+        Erro de conteúdo (ValueError) e 4xx definitivo sobem na hora; as
+        falhas transitórias só sobem depois de ``load_retries`` novas
+        tentativas. Roda dentro da hidratação, em background: o bot já
+        atende enquanto isso.
+        """
+        falhas = 0
+        while True:
+            try:
+                return await self.load()
+            except ValueError:
+                raise
+            except Exception as e:
+                definitiva, pedido = classificar_falha(e)
+                if definitiva or falhas >= self.load_retries:
+                    raise
+                falhas += 1
+                espera = backoff(falhas, self.load_backoff, self.writer.max_backoff, pedido)
+                logger.warning(
+                    "Falha ao carregar o Gist (%d de %d tentativas), nova tentativa em %.1f s: %s",
+                    falhas, self.load_retries, espera, e
+                )
+                await asyncio.sleep(espera)
+
+    def suspend(self):
+        """Para de gravar no Gist: a carga falhou e o remoto pode ter mais dados que a memória."""
+        if not self.suspended:
+            self.suspended = True
+            logger.error("Réplica no Gist suspensa até o próximo restart para não sobrescrever os dados remotos")
+            if not self.primary:
+                logger.error("Os registros continuam sendo salvos no armazenamento local, sem cópia no Gist")
+
+    async def schedule(self, changed=None):
+        """Agenda uma gravação; ``changed`` são os registros afetados (None = tudo)."""
+        if self.suspended:
+            if self.primary:
+                # Mesmo contrato de uma gravação com falha: só o modo durável reporta
+                return not self.durable
+            self.atrasadas += 1
+            return True
+        fut = self.writer.submit()
+        if not self.durable:
+            return True
+        ok = await fut
+        if ok or self.primary:
+            return ok
+        # Já salvo no backend local: confirma e registra o atraso da réplica
+        self.atrasadas += 1
+        logger.warning("Registro salvo localmente; réplica no Gist atrasada (%d mutações)", self.atrasadas)
+        return True
+
+    async def close(self):
+        await self.writer.close()
+        logger.info("Métricas de gravação no Gist: %s", self.writer.metrics)
+        await self.store.close()
+
+
+SEM_DATA = "sem-data"
+
+
+def shard_of(registro):
+    """Shard do registro: o mês de ``created_at`` ("2024-05") ou ``SEM_DATA``."""
+    created_at = registro.created_at or ""
+    mes = created_at[:7]
+    if len(mes) == 7 and mes[4] == "-" and mes[:4].isdigit() and mes[5:].isdigit():
+        return mes
+    return SEM_DATA
+
+
+def manifest_name(filename):
+    """Manifest dos shards de ``filename`` ("registros.json" -> "registros.manifest.json")."""
+    return f"{os.path.splitext(filename)[0]}.manifest.json"
+
+
+def next_month(mes):
+    ano, m = int(mes[:4]), int(mes[5:])
+    return f"{ano + 1:04d}-01" if m == 12 else f"{ano:04d}-{m + 1:02d}"
+
+
+class ShardedGistReplica(GistReplica):
+    """Réplica no Gist com um arquivo por mês de ``created_at``.
+
+    ``<base>.manifest.json`` descreve os shards (arquivo e contagem). Cada
+    lote grava num único PATCH só os shards tocados pelas mutações, mais o
+    manifest. A carga lê todos os shards: o ganho é só nas gravações. Um
+    gist ainda no formato antigo (arquivo único) é lido normalmente e
+    convertido para shards na primeira gravação.
+    """
+
+    def __init__(self, store, window=1.0, durable=False, primary=True, load_retries=5, load_backoff=1.0):
+        # Sem cache em disco: reescrevê-lo a cada lote anularia o ganho dos shards
+        super().__init__(
+            store, window=window, durable=durable, primary=primary,
+            load_retries=load_retries, load_backoff=load_backoff
+        )
+        self.base = os.path.splitext(store.filename)[0]
+        self.manifest_name = manifest_name(store.filename)
+        self.manifest = None
+        self._dirty = set()
+        self._full = False
+        # Arquivo único do formato antigo ainda no gist: removido no próximo lote
+        self._legado = False
+        # Conteúdo de cada shard já codificado; só shards alterados são recodificados
+        self._encoded = serializer.EncodedCache()
+
+    def shard_filename(self, key):
+        return f"{self.base}-{key}.json"
+
+    async def _fetch_manifest(self, files=None):
+        if files is None:
+            files = await self.store.fetch_files()
+        arquivo = files.get(self.manifest_name)
+        if arquivo is None:
+            return None, files
+        return await self.store.read_json(arquivo), files
+
+    async def load(self):
+        """Registros de todos os shards; None se o gist estiver vazio."""
+        start = time.perf_counter()
+        manifest, files = await self._fetch_manifest()
+        self._legado = self.store.filename in files
+        if manifest is None:
+            self.manifest = {"version": 1, "shard_by": "month", "shards": {}}
+            if not self._legado:
+                return None
+            # Formato antigo: tudo num arquivo só; vira shards na próxima gravação
+            logger.info("Gist no formato de arquivo único; será particionado na próxima gravação")
+            self._full = True
+            return await self.store.read_records(files[self.store.filename])
+
+        self.manifest = manifest
+        chaves = sorted(manifest["shards"])
+        registros = []
+        for key in chaves:
+            nome = manifest["shards"][key]["file"]
+            if nome not in files:
+                raise ValueError(f"Shard {nome} listado no manifest não existe no gist")
+            registros.extend(await self.store.read_records(files[nome]))
+        logger.info(
+            "Gist particionado: %d shards carregados em %.0f ms", len(chaves), (time.perf_counter() - start) * 1000
+        )
+        return registros
+
+    async def schedule(self, changed=None):
+        if changed is None:
+            self._full = True
+        else:
+            keys = {shard_of(r) for r in changed}
+            self._dirty |= keys
+            self._encoded.invalidate(keys)
+        return await super().schedule(changed)
+
+    def _shard_records(self, key):
+        if key == SEM_DATA:
+            registros = self._range_fn(None, None)
+        else:
+            registros = self._range_fn(key, next_month(key))
+        return [r for r in registros if shard_of(r) == key]
+
+    async def _flush(self):
+        if self.manifest is None:
+            # Backend local já tinha os dados: só o manifest remoto é necessário
+            manifest, remotos = await self._fetch_manifest()
+            self.manifest = manifest or {"version": 1, "shard_by": "month", "shards": {}}
+            self._legado = self.store.filename in remotos
+            if manifest is None:
+                # Gist ainda sem shards: o primeiro lote grava todos os meses
+                self._full = True
+
+        dirty, full = self._dirty, self._full
+        self._dirty, self._full = set(), False
+        try:
+            if full:
+                dirty |= set(self.manifest["shards"])
+                dirty |= {shard_of(r) for r in self._range_fn(None, None)}
+            shards = dict(self.manifest["shards"])
+            files = {}
+            for key in sorted(dirty):
+                versao = self._encoded.version(key)
+                registros = self._shard_records(key)
+                nome = self.shard_filename(key)
+                if registros:
+                    trecho = await asyncio.to_thread(self._encoded.encode, key, versao, registros)
+                    files[nome] = f"[{trecho}]"
+                    shards[key] = {"file": nome, "count": len(registros)}
+                elif key in shards:
+                    files[nome] = None
+                    del shards[key]
+            manifest = dict(self.manifest, shards=shards)
+            files[self.manifest_name] = serializer.dumps(manifest)
+            if self._legado:
+                # Sem isso o arquivo antigo fica desatualizado no gist e seria
+                # lido por um rollback para GIST_SHARDED=0
+                files[self.store.filename] = None
+            await self.store.save_files(files)
+        except Exception:
+            # O WriteBehind tenta de novo no próximo lote: mantém os shards sujos
+            self._dirty |= dirty
+            self._full = self._full or full
+            raise
+        self.manifest = manifest
+        self._legado = False
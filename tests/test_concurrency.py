@@ -0,0 +1,50 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from concurrency import PerChatUpdateProcessor
+
+
+def update(chat_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), effective_user=None)
+
+
+def test_chat_movimentado_nao_atrasa_outro_chat():
+    async def cenario():
+        processor = PerChatUpdateProcessor(2)
+        ordem, fim = [], {}
+
+        async def handler(chat_id, n):
+            await asyncio.sleep(0.1)
+            ordem.append((chat_id, n))
+            fim[chat_id, n] = time.perf_counter()
+
+        inicio = time.perf_counter()
+        # Como o Application: uma task por update, na ordem de chegada
+        tarefas = [asyncio.create_task(processor.process_update(update(1), handler(1, n))) for n in range(6)]
+        tarefas.append(asyncio.create_task(processor.process_update(update(2), handler(2, 0))))
+        await asyncio.gather(*tarefas)
+        return ordem, {k: v - inicio for k, v in fim.items()}, processor
+
+    ordem, fim, processor = asyncio.run(cenario())
+    assert [n for chat, n in ordem if chat == 1] == list(range(6))
+    # Com o lock do chat dentro do semáforo, o chat 2 esperaria os 6 updates do chat 1
+    assert fim[2, 0] < 0.3
+    assert processor.active_chats == 0
+
+
+def test_erro_num_update_nao_para_a_fila_do_chat():
+    async def cenario():
+        processor = PerChatUpdateProcessor(4)
+        feitos = []
+
+        async def handler(n):
+            await asyncio.sleep(0.01)
+            if n == 1:
+                raise RuntimeError("falhou")
+            feitos.append(n)
+
+        await asyncio.gather(*(processor.process_update(update(1), handler(n)) for n in range(3)))
+        return feitos
+
+    assert asyncio.run(cenario()) == [0, 2]
@@ -0,0 +1,34 @@
+from dedup import DuplicateIndex
+from models import Categoria, Problema, Status
+
+
+def registro(reg_id, titulo, local, status=Status.PENDENTE, categoria=Categoria.ILUMINACAO):
+    return Problema(
+        id=reg_id, categoria=categoria, status=status, titulo=titulo, descricao="x" * 500,
+        descricao_local=local, created_at="2024-05-01 10:00:00",
+    )
+
+
+def test_similares_usa_so_o_indice():
+    indice = DuplicateIndex()
+    indice.on_reset([
+        registro("a", "Poste apagado", "Rua das Flores, 120"),
+        registro("b", "Buraco na calçada", "Avenida Brasil, 900"),
+        registro("c", "Poste apagado", "Rua das Flores, 120", categoria=Categoria.LIMPEZA),
+    ])
+    achados = indice.similares(registro("novo", "Poste apagado", "R. das Flores 120"), limiar=0.5)
+    assert [p.id for _, p in achados] == ["a"]
+    similar = achados[0][1]
+    assert (similar.titulo, similar.status_label) == ("Poste apagado", Status.PENDENTE.label)
+    assert similar.created_at_formatted
+
+
+def test_similares_acompanha_edicao_e_exclusao():
+    indice = DuplicateIndex()
+    original = registro("a", "Poste apagado", "Rua das Flores, 120")
+    indice.on_reset([original])
+    indice.on_add(registro("a", "Poste apagado", "Rua das Flores, 120", status=Status.APROVADO))
+    rascunho = registro("novo", "Poste apagado", "Rua das Flores, 120")
+    assert indice.similares(rascunho)[0][1].status == Status.APROVADO
+    indice.on_remove(original)
+    assert indice.similares(rascunho) == []
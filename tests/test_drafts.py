@@ -0,0 +1,73 @@
+import asyncio
+import sqlite3
+
+from drafts import DraftPersistence
+
+
+def test_rascunho_e_conversa_sobrevivem_ao_restart(tmp_path):
+    caminho = str(tmp_path / "drafts.db")
+
+    async def cenario():
+        antes = DraftPersistence(caminho)
+        await asyncio.gather(
+            antes.update_user_data(7, {"titulo": "Poste apagado", "categoria": "Iluminação pública"}),
+            antes.update_conversation("registro", (100, 7), 3),
+        )
+        await antes.flush()
+
+        depois = DraftPersistence(caminho)
+        # Restauração preguiçosa: nada vem no startup
+        assert await depois.get_user_data() == {}
+        user_data = {}
+        await depois.refresh_user_data(7, user_data)
+        conversas = await depois.get_conversations("registro")
+        await depois.flush()
+        return user_data, conversas
+
+    user_data, conversas = asyncio.run(cenario())
+    assert user_data == {"titulo": "Poste apagado", "categoria": "Iluminação pública"}
+    assert conversas == {(100, 7): 3}
+
+
+def test_drop_e_fim_da_conversa_apagam_do_banco(tmp_path):
+    caminho = str(tmp_path / "drafts.db")
+
+    async def cenario():
+        antes = DraftPersistence(caminho)
+        await antes.update_user_data(7, {"titulo": "x"})
+        await antes.update_conversation("registro", (100, 7), 3)
+        await antes.drop_user_data(7)
+        await antes.update_conversation("registro", (100, 7), None)
+        await antes.flush()
+
+        depois = DraftPersistence(caminho)
+        user_data = {}
+        await depois.refresh_user_data(7, user_data)
+        conversas = await depois.get_conversations("registro")
+        await depois.flush()
+        return user_data, conversas
+
+    assert asyncio.run(cenario()) == ({}, {})
+
+
+def test_rascunho_expirado_nao_volta(tmp_path):
+    caminho = str(tmp_path / "drafts.db")
+
+    async def cenario():
+        antes = DraftPersistence(caminho, ttl=60)
+        await antes.update_user_data(7, {"titulo": "x"})
+        await antes.update_conversation("registro", (100, 7), 3)
+        await antes.flush()
+        with sqlite3.connect(caminho) as conn:
+            conn.execute("UPDATE user_data SET updated_at = updated_at - 120")
+            conn.execute("UPDATE conversations SET updated_at = updated_at - 120")
+        conn.close()
+
+        depois = DraftPersistence(caminho, ttl=60)
+        user_data = {}
+        await depois.refresh_user_data(7, user_data)
+        conversas = await depois.get_conversations("registro")
+        await depois.flush()
+        return user_data, conversas
+
+    assert asyncio.run(cenario()) == ({}, {})
@@ -0,0 +1,42 @@
+import csv
+import io
+
+import pytest
+
+import export
+from models import Categoria, Problema, Status
+
+
+def test_csv_neutraliza_formulas():
+    registro = Problema(
+        id="r1", categoria=Categoria.ILUMINACAO, status=Status.PENDENTE,
+        titulo='=HYPERLINK("http://exemplo.invalid","clique")', descricao="+55 11 9999-0000",
+        descricao_local="@prefeitura", latitude=-23.55, longitude=-46.63,
+        created_at="2024-05-01 10:00:00",
+    )
+    texto = export.CsvWriter().bloco([registro])
+    linha = dict(zip(export.COLUNAS, next(csv.reader(io.StringIO(texto), delimiter=";"))))
+    assert linha["titulo"] == """'=HYPERLINK("http://exemplo.invalid","clique")"""
+    assert linha["descricao"] == "'+55 11 9999-0000"
+    assert linha["descricao_local"] == "'@prefeitura"
+    # Números continuam números
+    assert (linha["latitude"], linha["longitude"]) == ("-23.55", "-46.63")
+
+
+def test_celula():
+    assert export.celula(None) == ""
+    assert export.celula("-1") == "'-1"
+    assert export.celula("\tx") == "'\tx"
+    assert export.celula("Poste apagado") == "Poste apagado"
+    assert export.celula(-1.5) == -1.5
+
+
+def test_status_por_valor_rotulo_ou_prefixo_unico():
+    assert export.parse_opcoes(["status=em_analise"])["status"] == Status.EM_ANALISE
+    assert export.parse_opcoes(["status=Em análise"])["status"] == Status.EM_ANALISE
+    assert export.parse_opcoes(["status=aprov"])["status"] == Status.APROVADO
+    assert export.parse_opcoes(["status=PENDENTE"])["status"] == Status.PENDENTE
+    # Sufixos ("ado" casava Aprovado) não valem mais
+    for texto in ("ado", "analise"):
+        with pytest.raises(ValueError):
+            export.parse_opcoes([f"status={texto}"])
@@ -0,0 +1,69 @@
+import random
+
+from geo import GridIndex, haversine
+from models import Problema
+
+
+def forca_bruta(pontos, lat, lon, k, radius_m):
+    dentro = sorted(
+        (haversine(lat, lon, plat, plon), reg_id)
+        for reg_id, (plat, plon) in pontos.items()
+        if haversine(lat, lon, plat, plon) <= radius_m
+    )
+    return dentro[:k]
+
+
+def test_haversine():
+    assert haversine(-23.55, -46.63, -23.55, -46.63) == 0
+    # 1° de latitude ~ 111,2 km
+    assert abs(haversine(0, 0, 1, 0) - 111_195) < 1
+
+
+def test_raio_igual_a_forca_bruta():
+    rnd = random.Random(22)
+    centro = (-23.55, -46.63)
+    pontos = {
+        f"r{i}": (centro[0] + rnd.uniform(-0.05, 0.05), centro[1] + rnd.uniform(-0.05, 0.05))
+        for i in range(500)
+    }
+    indice = GridIndex()
+    for reg_id, (lat, lon) in pontos.items():
+        indice.add(reg_id, lat, lon)
+    for _ in range(30):
+        lat = centro[0] + rnd.uniform(-0.04, 0.04)
+        lon = centro[1] + rnd.uniform(-0.04, 0.04)
+        for k, raio in ((5, 2000.0), (50, 800.0), (3, 10_000.0)):
+            assert indice.nearest(lat, lon, k, raio) == forca_bruta(pontos, lat, lon, k, raio)
+
+
+def test_raio_exclui_pontos_distantes():
+    indice = GridIndex()
+    indice.add("perto", -23.5500, -46.6300)
+    indice.add("longe", -23.5700, -46.6300)
+    resultado = indice.nearest(-23.5505, -46.6300, k=5, radius_m=1000)
+    assert [reg_id for _, reg_id in resultado] == ["perto"]
+    assert indice.nearest(-23.5505, -46.6300, k=0) == []
+
+
+def test_antimeridiano():
+    indice = GridIndex()
+    indice.add("leste", 0.0, 179.999)
+    indice.add("oeste", 0.0, -179.999)
+    resultado = indice.nearest(0.0, 180.0, k=5, radius_m=500)
+    assert sorted(reg_id for _, reg_id in resultado) == ["leste", "oeste"]
+
+
+def test_eventos_do_repositorio():
+    indice = GridIndex()
+    indice.on_reset([
+        Problema(id="r1", latitude=-23.55, longitude=-46.63),
+        Problema(id="r2"),
+        Problema(id="r3", latitude="invalida", longitude=-46.63),
+    ])
+    assert len(indice) == 1
+    # Edição que remove as coordenadas tira o registro do índice
+    indice.on_add(Problema(id="r1"))
+    assert len(indice) == 0
+    indice.on_add(Problema(id="r2", latitude=-23.55, longitude=-46.63))
+    indice.on_remove(Problema(id="r2"))
+    assert indice.nearest(-23.55, -46.63) == []
@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+
+from repository import MemoryRepository
+from storage import GistReplica
+
+
+class StoreFalso:
+    def __init__(self, falhar=False):
+        self.falhar = falhar
+        self.gravacoes = []
+        self.etag = None
+
+    async def save_content(self, content):
+        if self.falhar:
+            raise OSError("rede fora")
+        self.gravacoes.append(content)
+
+    async def close(self):
+        pass
+
+
+def replica(store, primary):
+    r = GistReplica(store, window=0.01, durable=True, primary=primary)
+
+    async def snapshot():
+        return "[]"
+
+    r.attach(snapshot)
+    return r
+
+
+def test_suspensa_so_falha_quando_o_gist_e_o_principal():
+    async def cenario():
+        principal, local = replica(StoreFalso(), True), replica(StoreFalso(), False)
+        principal.suspend()
+        local.suspend()
+        return await principal.schedule(), await local.schedule(), await local.schedule(), local.atrasadas
+
+    assert asyncio.run(cenario()) == (False, True, True, 2)
+
+
+def test_falha_duravel_com_backend_local_confirma_e_conta_atraso():
+    async def cenario():
+        store = StoreFalso(falhar=True)
+        r = replica(store, primary=False)
+        ok = await r.schedule()
+        atrasadas = r.atrasadas
+        store.falhar = False
+        ok_depois = await r.schedule()
+        await r.close()
+        return ok, atrasadas, ok_depois, r.atrasadas
+
+    assert asyncio.run(cenario()) == (True, 1, True, 0)
+
+
+def test_falha_duravel_com_gist_principal_reporta():
+    async def cenario():
+        r = replica(StoreFalso(falhar=True), primary=True)
+        ok = await r.schedule()
+        r.writer.stopped = OSError("fim do teste")
+        r.writer._wake.set()
+        await r.writer._task
+        return ok
+
+    assert asyncio.run(cenario()) is False
+
+
+class StoreInstavel:
+    """Falha ``falhas`` vezes com ``erro`` e depois devolve os registros."""
+
+    def __init__(self, falhas, erro):
+        self.falhas = falhas
+        self.erro = erro
+        self.chamadas = 0
+        self.etag = None
+
+    async def load(self, etag=None):
+        self.chamadas += 1
+        if self.chamadas <= self.falhas:
+            raise self.erro
+        return [{"id": "a", "titulo": "t", "created_at": "2024-01-01 00:00:00"}]
+
+    async def close(self):
+        pass
+
+
+def erro_http(status):
+    request = httpx.Request("GET", "https://api.github.com/gists/x")
+    return httpx.HTTPStatusError(str(status), request=request, response=httpx.Response(status, request=request))
+
+
+def test_falha_transitoria_na_carga_tenta_de_novo_sem_suspender():
+    async def cenario():
+        store = StoreInstavel(2, erro_http(502))
+        repo = MemoryRepository(GistReplica(store, load_backoff=0.01))
+        await repo.load()
+        return store.chamadas, repo.replica.suspended, len(repo)
+
+    assert asyncio.run(cenario()) == (3, False, 1)
+
+
+def test_falha_definitiva_ou_persistente_na_carga_suspende():
+    async def cenario(store):
+        repo = MemoryRepository(GistReplica(store, load_retries=2, load_backoff=0.01))
+        await repo.load()
+        return store.chamadas, repo.replica.suspended
+
+    assert asyncio.run(cenario(StoreInstavel(10, erro_http(404)))) == (1, True)
+    assert asyncio.run(cenario(StoreInstavel(10, httpx.ConnectTimeout("timeout")))) == (3, True)
+    assert asyncio.run(cenario(StoreInstavel(10, ValueError("json inválido")))) == (1, True)
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from models import Problema
+from repository import MemoryRepository
+from storage import GistStore, ShardedGistReplica
+
+
+class GistFalso:
+    """Gist em memória atrás de um ``httpx.MockTransport`` (GET e PATCH)."""
+
+    def __init__(self, arquivos):
+        self.arquivos = dict(arquivos)
+        self.patches = []
+
+    def __call__(self, request):
+        if request.method == "PATCH":
+            payload = json.loads(request.content)["files"]
+            self.patches.append(payload)
+            for nome, arquivo in payload.items():
+                if arquivo is None:
+                    self.arquivos.pop(nome, None)
+                else:
+                    self.arquivos[nome] = arquivo["content"]
+            return httpx.Response(200, json={})
+        return httpx.Response(200, json={"files": {
+            nome: {"filename": nome, "content": conteudo} for nome, conteudo in self.arquivos.items()
+        }})
+
+    def store(self):
+        return GistStore("token", "gist", "registros.json", transport=httpx.MockTransport(self))
+
+
+def registro(i, mes):
+    return {"id": f"id-{i}", "titulo": f"t{i}", "categoria": "Outro", "status": "pendente",
+            "created_at": f"2024-{mes:02d}-01 10:00:00"}
+
+
+def test_migracao_para_shards_remove_o_arquivo_unico():
+    gist = GistFalso({"registros.json": json.dumps([registro(1, 1), registro(2, 2), registro(3, 2)])})
+
+    async def cenario():
+        repo = MemoryRepository(ShardedGistReplica(gist.store(), window=0.01))
+        await repo.load()
+        await repo.delete("id-2")
+        await repo.close()
+
+        with pytest.raises(ValueError):
+            # Rollback para GIST_SHARDED=0 não pode ver o gist como vazio
+            await gist.store().load()
+        relida = ShardedGistReplica(gist.store())
+        registros = await relida.load()
+        await relida.store.close()
+        return registros
+
+    registros = asyncio.run(cenario())
+    assert gist.patches[0]["registros.json"] is None
+    assert "registros.json" not in gist.arquivos
+    assert sorted(gist.arquivos) == ["registros-2024-01.json", "registros-2024-02.json", "registros.manifest.json"]
+    assert sorted(r["id"] for r in registros) == ["id-1", "id-3"]
+
+
+def test_backend_local_grava_todos_os_meses_no_primeiro_lote():
+    gist = GistFalso({"registros.json": json.dumps([registro(1, 1)])})
+
+    async def cenario():
+        replica = ShardedGistReplica(gist.store(), window=0.01, primary=False)
+        repo = MemoryRepository(replica)
+        # Dados já no backend local; o gist só recebe a réplica
+        repo._reset([Problema.from_dict(registro(1, 1)), Problema.from_dict(registro(2, 3))])
+        await repo.add(Problema.from_dict(registro(4, 3)))
+        await repo.close()
+
+    asyncio.run(cenario())
+    assert "registros.json" not in gist.arquivos
+    assert "registros-2024-01.json" in gist.arquivos
+    assert len(json.loads(gist.arquivos["registros-2024-03.json"])) == 2
@@ -0,0 +1,88 @@
+import random
+
+from indexes import OrderedIndex
+from models import Problema
+from pagination import cursor_of
+
+
+def registros(n, seed=1):
+    rnd = random.Random(seed)
+    return [
+        Problema(id=f"r{i:03d}", created_at=f"2024-01-{rnd.randrange(1, 4):02d} 10:00:00")
+        for i in range(n)
+    ]
+
+
+def ordenados(itens):
+    return sorted(itens, key=cursor_of)
+
+
+def test_add_mantem_a_ordem():
+    indice = OrderedIndex()
+    itens = registros(50)
+    for r in itens:
+        indice.add(r)
+    assert indice.values() == ordenados(itens)
+    assert len(indice) == 50
+
+
+def test_rebuild_igual_a_inserir_um_a_um():
+    itens = registros(40, seed=2)
+    um_a_um = OrderedIndex()
+    for r in itens:
+        um_a_um.add(r)
+    reconstruido = OrderedIndex()
+    reconstruido.rebuild(itens)
+    assert reconstruido.values() == um_a_um.values()
+
+
+def test_remove():
+    itens = registros(20)
+    indice = OrderedIndex()
+    indice.rebuild(itens)
+    assert indice.remove(itens[7])
+    assert not indice.remove(itens[7])
+    assert not indice.remove(Problema(id="inexistente", created_at="2024-01-02 10:00:00"))
+    assert indice.values() == ordenados(itens[:7] + itens[8:])
+
+
+def test_remove_many():
+    itens = registros(30)
+    indice = OrderedIndex()
+    indice.rebuild(itens)
+    indice.remove_many(itens[::3])
+    assert indice.values() == ordenados([r for i, r in enumerate(itens) if i % 3])
+    indice.remove_many([])
+    assert len(indice) == 20
+
+
+def test_page_e_latest():
+    itens = registros(25)
+    indice = OrderedIndex()
+    indice.rebuild(itens)
+    decrescente = ordenados(itens)[::-1]
+
+    pagina, tem_mais = indice.page(limit=10)
+    assert pagina == decrescente[:10] and tem_mais
+    pagina, tem_mais = indice.page(before=cursor_of(pagina[-1]), limit=10)
+    assert pagina == decrescente[10:20] and tem_mais
+    pagina, tem_mais = indice.page(before=cursor_of(pagina[-1]), limit=10)
+    assert pagina == decrescente[20:] and not tem_mais
+    pagina, tem_mais = indice.page(after=cursor_of(decrescente[10]), limit=10)
+    assert pagina == decrescente[:10] and not tem_mais
+    assert indice.latest(3) == decrescente[:3]
+    assert indice.latest(0) == []
+
+
+def test_page_com_match_e_faixa():
+    itens = registros(60, seed=3)
+    indice = OrderedIndex()
+    indice.rebuild(itens)
+    pares = [r for r in ordenados(itens)[::-1] if int(r.id[1:]) % 2 == 0]
+
+    pagina, tem_mais = indice.page(limit=100, match=lambda r: int(r.id[1:]) % 2 == 0)
+    assert pagina == pares and not tem_mais
+
+    faixa = [r for r in ordenados(itens)[::-1] if "2024-01-02" <= r.created_at < "2024-01-03"]
+    pagina, _ = indice.page(limit=100, since="2024-01-02 00:00:00", until="2024-01-03 00:00:00")
+    assert pagina == faixa
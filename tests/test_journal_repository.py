@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from journal import Journal
+from models import Problema
+from repository import JournalRepository
+
+
+def registro(i):
+    return Problema.from_dict({
+        "id": f"id-{i}", "titulo": f"t{i}", "categoria": "Outro", "status": "pendente",
+        "created_at": f"2024-01-01 00:00:{i:02d}",
+    })
+
+
+def falhar(*args, **kwargs):
+    raise OSError("disco cheio")
+
+
+def test_append_falho_nao_muda_a_memoria(tmp_path):
+    async def cenario():
+        repo = JournalRepository(Journal(str(tmp_path)))
+        assert await repo.add(registro(1))
+
+        repo.journal.append = falhar
+        assert await repo.add(registro(2)) is False
+        assert repo.get("id-2") is None
+
+        with pytest.raises(OSError):
+            await repo.delete("id-1")
+        assert repo.get("id-1") is not None
+
+        with pytest.raises(OSError):
+            await repo.delete_many(["id-1"])
+        assert len(repo) == 1
+        await repo.close()
+
+    asyncio.run(cenario())
+
+
+def test_journal_reflete_a_memoria(tmp_path):
+    async def cenario():
+        repo = JournalRepository(Journal(str(tmp_path)))
+        for i in range(4):
+            await repo.add(registro(i))
+        assert (await repo.delete("id-0")).id == "id-0"
+        assert await repo.delete("nao-existe") is None
+        assert [r.id for r in await repo.delete_many(["id-1", "id-1", "nao-existe"])] == ["id-1"]
+        await repo.close()
+
+        relido = JournalRepository(Journal(str(tmp_path)))
+        await relido.load()
+        assert sorted(r.id for r in relido.all()) == ["id-2", "id-3"]
+        await relido.close()
+
+    asyncio.run(cenario())
+
+
+def test_compactacoes_concorrentes_nao_perdem_mutacao(tmp_path):
+    async def cenario():
+        repo = JournalRepository(Journal(str(tmp_path)), compact_every=1000)
+        await repo.add(registro(1))
+        primeira = asyncio.create_task(repo._compact())
+        segunda = asyncio.create_task(repo._compact())
+        # A primeira pega o lock e vai para a thread; a segunda fica esperando
+        await asyncio.sleep(0)
+        await repo.add(registro(2))
+        await asyncio.gather(primeira, segunda)
+        await repo.close()
+
+        relido = JournalRepository(Journal(str(tmp_path)))
+        await relido.load()
+        ids = sorted(r.id for r in relido.all())
+        await relido.close()
+        return ids
+
+    assert asyncio.run(cenario()) == ["id-1", "id-2"]
@@ -0,0 +1,44 @@
+import pytest
+
+import metrics
+from webhook import build_webhook_app
+
+
+def test_dict_collector_sem_total_duplicado():
+    coletor = metrics.DictCollector(
+        "bot_gist_writer", {"flushes": 3, "total_flush_latency": 1.5, "last_flush_latency": 0.2},
+        "Lotes", counters=("flushes", "total_flush_latency"),
+        nomes={"total_flush_latency": "flush_latency_seconds", "last_flush_latency": "last_flush_latency_seconds"},
+    )
+    assert list(coletor.families()) == [
+        ("bot_gist_writer_flushes_total", "counter", 3),
+        ("bot_gist_writer_flush_latency_seconds_total", "counter", 1.5),
+        ("bot_gist_writer_last_flush_latency_seconds", "gauge", 0.2),
+    ]
+
+
+def test_counter_que_ja_termina_em_total_nao_ganha_outro():
+    coletor = metrics.DictCollector("bot_x", {"wait_total": 2.0}, "Fila", counters=("wait_total",))
+    assert [nome for nome, _, _ in coletor.families()] == ["bot_x_wait_total"]
+
+
+def rotas(app):
+    return [regra.matcher.regex.pattern for regra in app.wildcard_router.rules]
+
+
+def test_metrics_no_webhook_so_com_token():
+    sem_token = build_webhook_app(None, None, "webhook")
+    com_token = build_webhook_app(None, None, "webhook", metrics_token="segredo")
+    assert not any("metrics" in r for r in rotas(sem_token))
+    assert any("metrics" in r for r in rotas(com_token))
+
+
+def test_metrica_com_labels_exige_labels():
+    contador = metrics.Counter("bot_c_total", "C", labels=("handler",))
+    gauge = metrics.Gauge("bot_g", "G", labels=("fila",))
+    histograma = metrics.Histogram("bot_h_seconds", "H", labels=("handler",))
+    for chamada in (contador.inc, gauge.inc, lambda: gauge.set(1), lambda: histograma.observe(0.1)):
+        with pytest.raises(ValueError, match="labels"):
+            chamada()
+    contador.labels("start").inc()
+    assert list(contador.samples()) == ['bot_c_total{handler="start"} 1']
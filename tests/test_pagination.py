@@ -0,0 +1,50 @@
+import uuid
+
+from models import Problema
+from pagination import cursor_of, decode_cursor, encode_cursor
+from repository import MemoryRepository
+
+
+def test_cursor_com_uuid_ida_e_volta():
+    cursor = ("2024-03-09 18:07:45", str(uuid.uuid4()))
+    texto = encode_cursor(cursor)
+    assert decode_cursor(texto) == cursor
+    # lst:<b|a>:<offset>:<cursor> precisa caber nos 64 bytes do callback_data
+    assert len(f"lst:b:99999:{texto}".encode()) <= 64
+
+
+def test_cursor_com_id_legado_ida_e_volta():
+    cursor = ("2024-03-09 18:07:45", "1700000000-42")
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+
+
+def test_cursor_sem_created_at():
+    assert decode_cursor(encode_cursor(("", "abc"))) == ("", "abc")
+
+
+def test_paginas_cobrem_tudo_sem_repetir_com_empates():
+    repo = MemoryRepository()
+    # Três registros por segundo: o id desempata a ordem
+    registros = [
+        Problema(id=str(uuid.UUID(int=i)), created_at=f"2024-01-01 10:00:{i // 3:02d}")
+        for i in range(23)
+    ]
+    repo._reset(registros)
+    esperado = [r.id for r in sorted(registros, key=cursor_of, reverse=True)]
+
+    ida, cursor, tem_mais = [], None, True
+    while tem_mais:
+        pagina, tem_mais = repo.page(before=cursor, limit=5)
+        ida.extend(p.id for p in pagina)
+        # O cursor passa pelo callback_data como texto
+        cursor = decode_cursor(encode_cursor(cursor_of(pagina[-1])))
+    assert ida == esperado
+
+    # Voltando com "after" a partir da última página
+    volta, tem_mais = [], True
+    cursor = cursor_of(repo.get(esperado[-1]))
+    while tem_mais:
+        pagina, tem_mais = repo.page(after=cursor, limit=5)
+        volta = [p.id for p in pagina] + volta
+        cursor = cursor_of(pagina[0])
+    assert volta == esperado[:-1]
@@ -0,0 +1,50 @@
+from models import Categoria, Problema, Status
+
+import render
+
+MAX_TEXTO = 4096
+
+
+def registro_longo(reg_id="r1"):
+    return Problema(
+        id=reg_id, categoria=Categoria.ILUMINACAO,
+        status=Status.PENDENTE, titulo="Poste apagado", descricao="x" * 6000,
+        descricao_local="Rua das Flores, 10", created_at="2024-01-01 10:00:00",
+    )
+
+
+def test_preview_encurta_descricao_longa():
+    card = render.card_detalhes(registro_longo())
+    assert len(card) < MAX_TEXTO
+    assert "📄 *Descrição:* " + "x" * 97 + "...\n" in card
+
+
+def test_confirmacao_de_exclusao_encurta_descricao_longa():
+    card = render.card_detalhes(registro_longo(), "confirmacao_exclusao")
+    assert len(card) < MAX_TEXTO
+    assert "📄 *Descrição:* " + "x" * 47 + "...\n" in card
+
+
+def test_descricao_curta_fica_inteira():
+    # Outro id: o card de "r1" já está no cache
+    registro = registro_longo("r2")
+    registro.descricao = "Poste apagado há uma semana"
+    assert "📄 *Descrição:* Poste apagado há uma semana\n" in render.card_detalhes(registro)
+
+
+def test_listagem_e_preview_usam_o_mesmo_card_em_cache():
+    registro = registro_longo("r3")
+    render.card_detalhes(registro)
+    misses = render._MISSES.value
+    listagem = render.card_listagem(registro, 1)
+    assert render._MISSES.value == misses
+    assert listagem.endswith(render.card_detalhes(registro).split("\n", 1)[1])
+
+
+def test_card_da_listagem_com_campos_longos_cabe_numa_mensagem():
+    registro = registro_longo("r4")
+    registro.titulo = "t" * 3000
+    registro.descricao_local = "*" * 5000
+    card = render.card_listagem(registro, 1)
+    assert len(card) < 1024
+    assert "📍 *Local:* " + "*" * 197 + "...\n" in card
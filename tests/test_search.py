@@ -0,0 +1,67 @@
+from models import Problema
+from search import SearchIndex, normalizar, tokens
+
+
+def registro(reg_id, titulo="", descricao="", local="", created_at="2024-01-01 10:00:00"):
+    return Problema(
+        id=reg_id, titulo=titulo, descricao=descricao,
+        descricao_local=local, created_at=created_at,
+    )
+
+
+def indice(*registros):
+    idx = SearchIndex()
+    idx.on_reset(registros)
+    return idx
+
+
+def test_normalizar_ignora_acentos_e_maiusculas():
+    assert normalizar("Iluminação") == "iluminacao"
+    assert normalizar("ILUMINACAO") == "iluminacao"
+    assert normalizar("Calçada ÁRVORE") == "calcada arvore"
+    assert tokens("O poste da praça") == ["poste", "praca"]
+
+
+def test_busca_sem_acento_encontra_texto_acentuado():
+    idx = indice(registro("r1", titulo="Iluminação apagada"), registro("r2", titulo="Buraco"))
+    assert idx.search("ILUMINACAO") == (["r1"], 1)
+    assert idx.search("iluminação") == (["r1"], 1)
+
+
+def test_prefixo_e_todos_os_termos():
+    idx = indice(
+        registro("r1", titulo="Postes apagados", local="Rua A"),
+        registro("r2", titulo="Poste caído", local="Rua B"),
+        registro("r3", titulo="Buraco", local="Rua A"),
+    )
+    ids, total = idx.search("poste")
+    assert sorted(ids) == ["r1", "r2"] and total == 2
+    assert idx.search("poste caido") == (["r2"], 1)
+    # Termo curto não vira prefixo
+    assert idx.search("po") == ([], 0)
+    assert idx.search("inexistente") == ([], 0)
+
+
+def test_ranking_pesa_titulo_e_desempata_pelo_mais_recente():
+    idx = indice(
+        registro("descricao", descricao="lixo acumulado"),
+        registro("titulo", titulo="lixo acumulado"),
+        registro("local", local="lixo"),
+        registro("antigo", titulo="lixo", created_at="2023-01-01 10:00:00"),
+        registro("recente", titulo="lixo", created_at="2024-06-01 10:00:00"),
+    )
+    ids, total = idx.search("lixo")
+    assert total == 5
+    assert ids[:2] == ["recente", "titulo"]
+    assert ids.index("antigo") < ids.index("local") < ids.index("descricao")
+    assert idx.search("lixo", limit=2, offset=2)[0] == ids[2:4]
+
+
+def test_edicao_e_remocao_atualizam_o_indice():
+    idx = indice(registro("r1", titulo="Poste apagado"))
+    idx.on_add(registro("r1", titulo="Buraco na rua"))
+    assert idx.search("poste") == ([], 0)
+    assert idx.search("buraco") == (["r1"], 1)
+    idx.on_remove(registro("r1"))
+    assert idx.search("buraco") == ([], 0)
+    assert len(idx) == 0
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import random
+import threading
+
+from models import Categoria, Problema, Status
+from pagination import cursor_of
+from repository import MemoryRepository, SqliteRepository
+
+
+class ReplicaFalsa:
+    def __init__(self, registros):
+        self.registros = registros
+        self.snapshot = None
+
+    def attach(self, snapshot_fn, range_fn=None):
+        self.snapshot = snapshot_fn
+
+    async def load_with_retry(self):
+        return self.registros
+
+    async def schedule(self, changed=None):
+        return True
+
+    async def close(self):
+        pass
+
+
+class Ouvinte:
+    def __init__(self):
+        self.registros = None
+        self.thread = None
+
+    def on_reset(self, registros):
+        self.registros = registros
+        self.thread = threading.current_thread()
+
+
+def dados(n):
+    return [
+        {"id": f"id-{i}", "titulo": f"t{i}", "categoria": "Outro", "status": "pendente",
+         "created_at": f"2024-01-{i % 28 + 1:02d} 10:00:00"}
+        for i in range(n)
+    ]
+
+
+def test_hidratacao_le_e_grava_fora_do_loop(tmp_path):
+    async def cenario():
+        replica = ReplicaFalsa(dados(50))
+        repo = SqliteRepository(str(tmp_path / "p.db"), replica)
+        ouvinte = Ouvinte()
+        repo.subscribe(ouvinte)
+        # Na thread do loop a conexão principal é a única usada fora de to_thread
+        repo.all = lambda: (_ for _ in ()).throw(AssertionError("all() no event loop"))
+        await repo.hydrate()
+        conteudo = await replica.snapshot()
+        await repo.close()
+        return ouvinte, conteudo, len(repo)
+
+    ouvinte, conteudo, total = asyncio.run(cenario())
+    assert total == 50
+    assert len(ouvinte.registros) == 50
+    assert ouvinte.thread is not threading.main_thread()
+    assert sorted(r["id"] for r in json.loads(conteudo)) == sorted(f"id-{i}" for i in range(50))
+
+
+def test_snapshot_da_replica_nao_usa_a_conexao_do_loop(tmp_path):
+    async def cenario():
+        replica = ReplicaFalsa(dados(10))
+        repo = SqliteRepository(str(tmp_path / "p.db"), replica)
+        await repo.hydrate()
+        conexao = repo._conn
+        repo.connect = lambda: (_ for _ in ()).throw(AssertionError("consulta no event loop"))
+        conteudo = await replica.snapshot()
+        conexao.close()
+        return conteudo
+
+    assert len(json.loads(asyncio.run(cenario()))) == 10
+
+
+def dataset():
+    rnd = random.Random(5)
+    registros = []
+    for i in range(120):
+        # Vários registros no mesmo segundo: o id desempata a ordem
+        registros.append(Problema(
+            id=f"id-{rnd.randrange(10**6):06d}-{i}", categoria=rnd.choice(list(Categoria)),
+            status=rnd.choice(list(Status)), titulo=f"t{i}",
+            created_at=f"2024-0{rnd.randrange(1, 4)}-{rnd.randrange(1, 4):02d} 10:00:00",
+        ))
+    return registros
+
+
+def paginas(repo, **filtros):
+    """Ids de todas as páginas indo para trás e depois voltando com ``after``."""
+    ida, cursor, tem_mais = [], None, True
+    while tem_mais:
+        pagina, tem_mais = repo.page(before=cursor, limit=7, **filtros)
+        ida.append([p.id for p in pagina])
+        cursor = cursor_of(pagina[-1]) if pagina else None
+    volta = []
+    vistos = [i for pagina in ida for i in pagina]
+    if vistos:
+        # Da página mais antiga para a mais recente
+        cursor, tem_mais = cursor_of(repo.get(vistos[-1])), True
+        while tem_mais:
+            pagina, tem_mais = repo.page(after=cursor, limit=7, **filtros)
+            volta.append([p.id for p in pagina])
+            cursor = cursor_of(pagina[0]) if pagina else None
+    return ida, volta
+
+
+def test_page_do_sqlite_igual_ao_da_memoria(tmp_path):
+    registros = dataset()
+    memoria = MemoryRepository()
+    memoria._reset(registros)
+    sqlite = SqliteRepository(str(tmp_path / "p.db"))
+    sqlite.insert_many(registros)
+    casos = [
+        {},
+        {"categoria": Categoria.ILUMINACAO},
+        {"status": Status.PENDENTE},
+        {"categoria": Categoria.LIMPEZA, "status": Status.APROVADO},
+        {"since": "2024-02-01 00:00:00"},
+        {"since": "2024-01-02 00:00:00", "until": "2024-03-02 00:00:00", "status": Status.REJEITADO},
+    ]
+    for filtros in casos:
+        assert paginas(sqlite, **filtros) == paginas(memoria, **filtros), filtros
+    ida, _ = paginas(memoria)
+    assert sorted(i for pagina in ida for i in pagina) == sorted(r.id for r in registros)
+    asyncio.run(sqlite.close())
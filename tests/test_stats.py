@@ -0,0 +1,78 @@
+from datetime import date
+
+from models import Categoria, Problema, Status
+from stats import StatsCollector
+
+import render
+
+
+def registro(reg_id, categoria=Categoria.ILUMINACAO, status=Status.PENDENTE, dia="2024-03-10"):
+    return Problema(id=reg_id, categoria=categoria, status=status, created_at=f"{dia} 10:00:00")
+
+
+def coletor():
+    stats = StatsCollector()
+    stats.on_reset([
+        registro("r1"),
+        registro("r2", Categoria.BURACO, Status.APROVADO, "2024-03-09"),
+        registro("r3", Categoria.BURACO, dia="2024-03-01"),
+        registro("r4", "Categoria antiga", None, "2024-03-10"),
+    ])
+    return stats
+
+
+def test_agregados_da_carga_inicial():
+    stats = coletor()
+    assert len(stats) == 4
+    assert stats.categorias() == [
+        (Categoria.ILUMINACAO.label, 1), (Categoria.BURACO.label, 2), ("Categoria antiga", 1),
+    ]
+    assert stats.status() == [(Status.PENDENTE.label, 2), (Status.APROVADO.label, 1), ("Sem status", 1)]
+
+
+def test_serie_diaria_e_desde():
+    stats = coletor()
+    serie = stats.serie_diaria(date(2024, 3, 10), dias=3)
+    assert serie == [(date(2024, 3, 8), 0), (date(2024, 3, 9), 1), (date(2024, 3, 10), 2)]
+    assert stats.desde(date(2024, 3, 9)) == 3
+    assert stats.desde(date(2024, 3, 11)) == 0
+
+
+def test_edicao_e_remocao_desfazem_a_contagem():
+    stats = coletor()
+    # Mudança de status: o registro sai de Pendente e entra em Aprovado
+    stats.on_add(registro("r1", status=Status.APROVADO))
+    assert len(stats) == 4
+    assert stats.por_status[Status.PENDENTE] == 1
+    assert stats.por_status[Status.APROVADO] == 2
+    stats.on_remove(registro("r3"))
+    stats.on_remove(registro("inexistente"))
+    assert len(stats) == 3
+    # Contadores zerados somem, não ficam como 0
+    assert "2024-03-01" not in stats.por_dia
+    assert stats.categorias()[1] == (Categoria.BURACO.label, 1)
+
+
+def test_igual_a_recontar_do_zero():
+    stats = coletor()
+    stats.on_add(registro("r5", Categoria.LIMPEZA, Status.REJEITADO, "2024-03-05"))
+    stats.on_remove(registro("r2"))
+    stats.on_add(registro("r4", Categoria.LIMPEZA, Status.EM_ANALISE))
+    registros = [
+        registro("r1"),
+        registro("r3", Categoria.BURACO, dia="2024-03-01"),
+        registro("r4", Categoria.LIMPEZA, Status.EM_ANALISE),
+        registro("r5", Categoria.LIMPEZA, Status.REJEITADO, "2024-03-05"),
+    ]
+    recontado = StatsCollector()
+    recontado.on_reset(registros)
+    assert stats.por_categoria == recontado.por_categoria
+    assert stats.por_status == recontado.por_status
+    assert stats.por_dia == recontado.por_dia
+    assert stats.total == recontado.total
+
+
+def test_painel_com_zero_dias_mostra_so_hoje():
+    texto = render.painel_stats(coletor(), date(2024, 3, 10), 0)
+    assert "Por dia (últimos 1)" in texto
+    assert texto.endswith("10/03 ▇▇▇▇▇▇▇▇▇▇ 2")
@@ -0,0 +1,74 @@
+import asyncio
+import gc
+import time
+import warnings
+from types import SimpleNamespace
+
+from concurrency import PerChatUpdateProcessor
+from webhook import UpdateIngestor
+
+
+def update(update_id, chat_id):
+    return SimpleNamespace(update_id=update_id, effective_chat=SimpleNamespace(id=chat_id), effective_user=None)
+
+
+class AppFalso:
+    def __init__(self, demora=0.1, vagas=8):
+        self.update_processor = PerChatUpdateProcessor(vagas)
+        self.demora = demora
+        self.fim = {}
+
+    async def process_update(self, update):
+        await asyncio.sleep(self.demora)
+        self.fim[update.update_id] = time.perf_counter()
+
+
+def test_worker_nao_espera_chat_de_outro_worker():
+    async def cenario():
+        app = AppFalso()
+        ingestor = UpdateIngestor(app, workers=2)
+        ingestor.start()
+        inicio = time.perf_counter()
+        for n in range(6):
+            assert ingestor.offer(update(n, chat_id=1))
+        assert ingestor.offer(update(100, chat_id=2))
+        await ingestor.stop()
+        return app, ingestor, inicio
+
+    app, ingestor, inicio = asyncio.run(cenario())
+    assert ingestor.metrics["processed"] == 7
+    assert [n for n in sorted(app.fim, key=app.fim.get) if n < 100] == list(range(6))
+    # O chat 2 não espera a fila do chat 1
+    assert app.fim[100] - inicio < 0.3
+    assert ingestor.depth == 0
+
+
+def test_fila_cheia_conta_updates_adiados():
+    async def cenario():
+        ingestor = UpdateIngestor(AppFalso(), maxsize=3, workers=2)
+        ingestor.start()
+        aceitos = [ingestor.offer(update(n, chat_id=1)) for n in range(3)]
+        await asyncio.sleep(0.01)
+        # Os adiados saíram da asyncio.Queue mas continuam contando no limite
+        aceitos += [ingestor.offer(update(n, chat_id=1)) for n in (3, 4)]
+        await ingestor.stop(timeout=0.05)
+        return aceitos
+
+    assert asyncio.run(cenario()) == [True, True, True, True, False]
+
+
+def test_stop_nao_deixa_coroutine_sem_await():
+    async def cenario():
+        # Uma vaga só: o segundo worker é cancelado esperando o semáforo
+        ingestor = UpdateIngestor(AppFalso(demora=10, vagas=1), workers=2)
+        ingestor.start()
+        for n in range(4):
+            ingestor.offer(update(n, chat_id=n % 2))
+        await asyncio.sleep(0.01)
+        await ingestor.stop(timeout=0.05)
+
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter("always")
+        asyncio.run(cenario())
+        gc.collect()
+    assert not [a for a in avisos if "never awaited" in str(a.message)]
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import httpx
+
+from storage import WriteBehind
+
+
+def erro_http(status, headers=None):
+    request = httpx.Request("PATCH", "https://api.github.com/gists/x")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"{status}", request=request, response=response)
+
+
+class FalhaSempre:
+    def __init__(self, erro):
+        self.erro = erro
+        self.chamadas = []
+
+    async def __call__(self):
+        self.chamadas.append(time.monotonic())
+        raise self.erro
+
+
+def test_falha_transitoria_usa_backoff():
+    async def cenario():
+        flush = FalhaSempre(erro_http(502))
+        writer = WriteBehind(flush, window=0.1, max_backoff=0.4)
+        fut = writer.submit()
+        await asyncio.sleep(2)
+        assert fut.done() and fut.result() is False
+        writer._wake.set()
+        await writer._task
+        return flush.chamadas, writer
+
+    chamadas, writer = asyncio.run(cenario())
+    # Sem backoff seriam ~20 PATCHes em 2 s (um por janela de 0,1 s)
+    assert 3 <= len(chamadas) <= 9
+    intervalos = [b - a for a, b in zip(chamadas, chamadas[1:])]
+    assert max(intervalos) <= 0.45
+    assert writer.stopped is None
+    assert writer.pending == 1
+
+
+def test_respeita_retry_after():
+    async def cenario():
+        flush = FalhaSempre(erro_http(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 0.6)}))
+        writer = WriteBehind(flush, window=0.05)
+        writer.submit()
+        await asyncio.sleep(0.9)
+        writer._wake.set()
+        await writer._task
+        return flush.chamadas
+
+    chamadas = asyncio.run(cenario())
+    # A janela é 0,05 s, mas o GitHub pediu para esperar até o reset
+    assert chamadas[1] - chamadas[0] >= 0.5
+
+
+def test_4xx_definitivo_para_as_gravacoes():
+    async def cenario():
+        flush = FalhaSempre(erro_http(422))
+        writer = WriteBehind(flush, window=0.05)
+        primeira = writer.submit()
+        await asyncio.sleep(0.5)
+        segunda = writer.submit()
+        await asyncio.sleep(0.2)
+        await writer.close()
+        return flush.chamadas, writer, primeira.result(), segunda.result()
+
+    chamadas, writer, primeira, segunda = asyncio.run(cenario())
+    assert len(chamadas) == 1
+    assert writer.stopped is not None
+    assert primeira is False and segunda is False
+    assert writer.pending == 2
+
+
+def test_sucesso_depois_de_falha_zera_o_backoff():
+    async def cenario():
+        erros = [erro_http(500)]
+        chamadas = []
+
+        async def flush():
+            chamadas.append(time.monotonic())
+            if erros:
+                raise erros.pop()
+
+        writer = WriteBehind(flush, window=0.05)
+        fut = writer.submit()
+        await asyncio.sleep(0.5)
+        return chamadas, writer, fut.result()
+
+    chamadas, writer, primeira = asyncio.run(cenario())
+    # A future do lote que falhou é resolvida com False; a nova tentativa grava
+    assert primeira is False
+    assert len(chamadas) == 2
+    assert writer.pending == 0
+    assert writer.metrics["consecutive_failures"] == 0
@@ -0,0 +1,238 @@
+# webhook.py
+import asyncio
+import collections
+import hmac
+import json
+import logging
+import signal
+import time
+
+import tornado.httpserver
+import tornado.web
+from telegram import Update
+
+import metrics
+from concurrency import update_key
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateIngestor:
+    """Fila limitada entre o webhook e os handlers, drenada por um pool de workers.
+
+    O webhook só enfileira e responde; os workers passam cada update pelo
+    update processor do Application. Um chat fica com um worker só: o update
+    de um chat que já está sendo atendido vai para a fila desse chat e o
+    worker que o atende processa em seguida, em ordem. Assim nenhum worker
+    fica parado esperando o lock de outro chat. Updates
+    repetidos (retries do Telegram) são descartados pelo ``update_id``. Com a
+    fila cheia, ``offer`` recusa e o webhook responde 503: o Telegram reenvia
+    depois, o que serve de backpressure.
+
+    ``metrics``: ``received``, ``accepted``, ``duplicates``, ``rejected``,
+    ``processed`` e ``failed`` são contadores; ``max_depth`` é o maior tamanho
+    de fila visto e ``wait_total`` a soma do tempo em fila (s).
+    """
+
+    def __init__(self, app, maxsize=1000, workers=8, dedupe_window=10000):
+        self.app = app
+        self.queue = asyncio.Queue(maxsize)
+        self.workers = workers
+        self.dedupe_window = dedupe_window
+        # update_ids aceitos recentemente, do mais antigo ao mais novo
+        self._seen = collections.OrderedDict()
+        self._tasks = []
+        # chave do chat -> updates esperando o worker que já está com o chat
+        self._por_chat = {}
+        self._adiados = 0
+        self.metrics = {
+            "received": 0, "accepted": 0, "duplicates": 0, "rejected": 0,
+            "processed": 0, "failed": 0, "max_depth": 0, "wait_total": 0.0,
+        }
+
+    @property
+    def depth(self):
+        return self.queue.qsize() + self._adiados
+
+    def offer(self, update):
+        """Enfileira sem esperar; devolve False se a fila estiver cheia."""
+        m = self.metrics
+        m["received"] += 1
+        if update.update_id in self._seen:
+            m["duplicates"] += 1
+            return True
+        try:
+            if self.queue.maxsize and self.depth >= self.queue.maxsize:
+                raise asyncio.QueueFull
+            self.queue.put_nowait((update, time.perf_counter()))
+        except asyncio.QueueFull:
+            # Não marca como visto: o reenvio do Telegram deve ser aceito
+            m["rejected"] += 1
+            return False
+        self._seen[update.update_id] = None
+        if len(self._seen) > self.dedupe_window:
+            self._seen.popitem(last=False)
+        m["accepted"] += 1
+        m["max_depth"] = max(m["max_depth"], self.depth)
+        return True
+
+    async def _worker(self):
+        while True:
+            update, enfileirado = await self.queue.get()
+            key = update_key(update)
+            if key is not None:
+                pendentes = self._por_chat.get(key)
+                if pendentes is not None:
+                    # Outro worker está com o chat: ele processa este na sequência
+                    pendentes.append((update, enfileirado))
+                    self._adiados += 1
+                    continue
+                pendentes = self._por_chat[key] = collections.deque()
+            try:
+                await self._processar(update, enfileirado)
+                self.queue.task_done()
+                while key is not None and pendentes:
+                    self._adiados -= 1
+                    await self._processar(*pendentes.popleft())
+                    self.queue.task_done()
+            finally:
+                if key is not None:
+                    del self._por_chat[key]
+                    if pendentes:
+                        self._adiados -= len(pendentes)
+                        logger.warning("%d updates do chat %s descartados no encerramento", len(pendentes), key[1])
+
+    async def _processar(self, update, enfileirado):
+        m = self.metrics
+        m["wait_total"] += time.perf_counter() - enfileirado
+        coroutine = self.app.process_update(update)
+        try:
+            await self.app.update_processor.process_update(update, coroutine)
+            m["processed"] += 1
+        except asyncio.CancelledError:
+            # Cancelado antes de o processor aguardar a coroutine
+            coroutine.close()
+            raise
+        except Exception as e:
+            m["failed"] += 1
+            logger.error("Erro ao processar update %s: %s", update.update_id, e)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout=10.0):
+        """Drena a fila (até ``timeout``) e encerra os workers."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%d updates ainda na fila no encerramento", self.depth)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Métricas da fila de updates: %s", self.metrics)
+
+
+class WebhookHandler(tornado.web.RequestHandler):
+    """Recebe o POST do Telegram, enfileira e responde na hora."""
+
+    SUPPORTED_METHODS = ("POST",)
+
+    def initialize(self, ingestor, bot, secret_token=None):
+        self.ingestor = ingestor
+        self.bot = bot
+        self.secret_token = secret_token
+
+    def post(self):
+        if self.secret_token:
+            recebido = self.request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(recebido, self.secret_token):
+                raise tornado.web.HTTPError(403)
+        try:
+            update = Update.de_json(json.loads(self.request.body), self.bot)
+        except Exception as e:
+            logger.error("Update inválido recebido no webhook: %s", e)
+            raise tornado.web.HTTPError(400)
+        if update is not None and not self.ingestor.offer(update):
+            raise tornado.web.HTTPError(503, reason="Fila de updates cheia")
+        self.set_status(200)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    """``GET /metrics`` no formato de texto do Prometheus."""
+
+    SUPPORTED_METHODS = ("GET",)
+
+    def initialize(self, token=None):
+        self.token = token
+
+    def get(self):
+        if self.token:
+            recebido = self.request.headers.get("Authorization", "")
+            if not hmac.compare_digest(recebido, f"Bearer {self.token}"):
+                raise tornado.web.HTTPError(403)
+        self.set_header("Content-Type", metrics.CONTENT_TYPE)
+        self.write(metrics.render())
+
+
+def build_webhook_app(ingestor, bot, url_path, secret_token=None, metrics_token=None):
+    """App do servidor público do webhook; ``/metrics`` só é montado com ``metrics_token``."""
+    rotas = [
+        (f"/{url_path.strip('/')}", WebhookHandler, {"ingestor": ingestor, "bot": bot, "secret_token": secret_token}),
+    ]
+    if metrics_token:
+        rotas.append((r"/metrics", MetricsHandler, {"token": metrics_token}))
+    else:
+        logger.info("METRICS_TOKEN não definido: /metrics não é exposto no servidor do webhook")
+    return tornado.web.Application(rotas)
+
+
+def serve_metrics(port, listen="0.0.0.0", token=None):
+    """Servidor só com ``/metrics`` (modo polling, sem servidor de webhook).
+
+    Numa porta interna o ``token`` é opcional.
+    """
+    server = tornado.httpserver.HTTPServer(tornado.web.Application([
+        (r"/metrics", MetricsHandler, {"token": token}),
+    ]))
+    server.listen(port, address=listen)
+    logger.info("Métricas em http://%s:%d/metrics", listen, port)
+    return server
+
+
+async def run_webhook(app, ingestor, listen, port, url_path, webhook_url=None, secret_token=None, metrics_token=None):
+    """Ciclo de vida completo (como ``Application.run_webhook``) com a fila própria."""
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, parar.set)
+        except NotImplementedError:  # pragma: no cover - Windows
+            pass
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    server = None
+    try:
+        if webhook_url:
+            await app.bot.set_webhook(webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+        await app.start()
+        ingestor.start()
+        server = tornado.httpserver.HTTPServer(build_webhook_app(
+            ingestor, app.bot, url_path, secret_token, metrics_token
+        ))
+        server.listen(port, address=listen)
+        logger.info("Webhook ouvindo em %s:%d (%d workers, fila de %d)", listen, port, ingestor.workers, ingestor.queue.maxsize)
+        await parar.wait()
+    finally:
+        if server is not None:
+            server.stop()
+        await ingestor.stop()
+        if app.running:
+            await app.stop()
+            if app.post_stop:
+                await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)